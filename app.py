@@ -3,16 +3,27 @@
 
 import os
 import signal
+import json
+import math
+import time
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify, send_from_directory, session
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, session
 import yfinance as yf
 import numpy as np
 import pandas as pd
 import requests
 from market_data import get_market_news, get_analyst_recommendations, get_market_sentiment
-from multi_source_data import get_stock_data_multi_source, get_nifty_200_list
-from technical_analysis import analyze_stock
+from multi_source_data import get_stock_data_multi_source, get_nifty_200_list, iter_parallel, run_parallel
+from technical_analysis import (
+    analyze_stock, analyze_universe, calculate_enhanced_metrics_batch, fetch_historical_data, get_signal_profile_name
+)
+from market_context import MarketDataContext
+from indicators import indicator_cache_stats
+from request_pipeline import StagedPipeline
+import snapshot_store
 from chatbot_logic import process_chatbot_query
+from rate_limiter import get_rate_limit_status
+from response_cache import ResponseCache, StaleWhileRevalidate, get_cache_stats
 
 def calculate_atr(high, low, close, period=14):
     """Calculate Average True Range (ATR) using Pandas"""
@@ -26,15 +37,24 @@ def calculate_atr(high, low, close, period=14):
 app = Flask(__name__)
 app.secret_key = 'super_secret_key_for_demo_only' # Change this in production
 
-# Vercel-compatible: Request-scoped caching
-_vercel_cache = {}
-_cache_timestamps = {}
+# Vercel-compatible: bounded per-process response caching
 CACHE_DURATION = timedelta(minutes=5)  # 5-minute cache for Vercel
+_analysis_cache = ResponseCache('stock-analysis', ttl=CACHE_DURATION.total_seconds())
 
 # Multi-source data configuration
 DEFAULT_DATA_SOURCE = 'yahoo'
 AVAILABLE_SOURCES = ['yahoo', 'google', 'alpha_vantage', 'fmp']
 
+# Per-stage deadlines (seconds) for the concurrent parts of /get_stock_data
+NEWS_STAGE_DEADLINE = 6
+RECOMMENDATIONS_STAGE_DEADLINE = 6
+SENTIMENT_STAGE_DEADLINE = 8
+
+# /api/v1/signals/batch: tickers per request, and per-(ticker, risk) results reused between dashboards
+MAX_BATCH_TICKERS = 50
+RISK_PROFILES = ['Low', 'Medium', 'High', 'Custom']
+_batch_signal_cache = ResponseCache('signal-batch', ttl=CACHE_DURATION.total_seconds())
+
 def get_nifty_200_constituents():
     """Fetch REAL NIFTY 200 index constituents from Yahoo Finance"""
     try:
@@ -135,47 +155,78 @@ def get_major_nifty_stocks():
         'ZEEL.NS', 'ZENSARTECH.NS', 'ZODIACLOTH.NS', 'ZYDUSWELL.NS'
     ]
 
+# Top-20 ranking: served stale-while-revalidate, refreshed in the background past the soft TTL
+TOP_STOCKS_SOFT_TTL = 300
+
+def _persist_top_stocks(source, stocks, updated_at):
+    # Only the fixed source list reaches disk (warm_start reads the same names back)
+    if source in AVAILABLE_SOURCES:
+        snapshot_store.save_snapshot(f'top_stocks_{source}', stocks, saved_at=updated_at)
+
+_top_stocks = StaleWhileRevalidate(
+    'top-20-stocks', lambda source: get_nifty_200_list(source=source),
+    soft_ttl=TOP_STOCKS_SOFT_TTL, on_update=_persist_top_stocks
+)
+
 @app.route('/get_top_20_stocks')
 def get_top_20_stocks():
-    """Multi-source: Return REAL-TIME top 20 stocks with source selection."""
+    """Multi-source: Return the top 20 stocks without waiting on upstream fetches.
+    
+    Serves the last good ranking for the source (refreshing it in the background once it is
+    older than TOP_STOCKS_SOFT_TTL); while the very first load runs, the emergency list is
+    returned marked as 'warming'.
+    """
     
     try:
         # Get data source from query parameter
         source = request.args.get('source', DEFAULT_DATA_SOURCE)
+        # The source keys the SWR cache (and its refresh threads): only known sources get one
+        if source not in AVAILABLE_SOURCES:
+            return jsonify({
+                'status': 'error',
+                'error': f"Unknown source '{source}'",
+                'available_sources': AVAILABLE_SOURCES
+            }), 400
         
-        print(f"🔄 Multi-source: Fetching top 20 stocks from {source}...")
-        
-        # Use multi-source stock fetching
-        stocks = get_nifty_200_list(source=source)
+        stocks, cache_status, updated_at = _top_stocks.get(source, source)
         
         if stocks:
+            age = time.time() - updated_at
+            if cache_status == 'fresh':
+                next_update = max(1, math.ceil((_top_stocks.soft_ttl - age) / 60))
+            else:
+                next_update = 1  # Refresh already running
+            
             response_data = {
-                'is_fresh': True,
-                'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'next_update_in_minutes': 5,
+                'is_fresh': cache_status == 'fresh',
+                'last_updated': datetime.fromtimestamp(updated_at).strftime('%Y-%m-%d %H:%M:%S'),
+                'age_seconds': round(age, 1),
+                'next_update_in_minutes': next_update,
                 'stocks': [stock['symbol'] for stock in stocks[:20]],  # Extract symbols
                 'stock_details': stocks[:20],  # Limit to 20
                 'data_source': source,
-                'cache_status': 'fresh',
+                'cache_status': cache_status,
                 'available_sources': AVAILABLE_SOURCES
             }
             
-            print(f"✅ Multi-source: Returning {len(stocks)} stocks from {source}")
+            print(f"✅ Multi-source: Returning {len(stocks)} {cache_status} stocks from {source}")
             return jsonify(response_data)
         else:
-            # Emergency fallback response
+            # Nothing cached yet: emergency list while the first load runs (or after it failed)
             fallback_stocks = get_vercel_emergency_fallback()
-            return jsonify({
+            response_data = {
                 'is_fresh': False,
                 'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'next_update_in_minutes': 1,
                 'stocks': [stock['symbol'] for stock in fallback_stocks],
                 'stock_details': fallback_stocks,
                 'data_source': 'emergency-fallback',
-                'cache_status': 'emergency',
-                'available_sources': AVAILABLE_SOURCES,
-                'error': 'All data sources failed'
-            })
+                'cache_status': 'warming' if cache_status == 'warming' else 'emergency',
+                'available_sources': AVAILABLE_SOURCES
+            }
+            if cache_status != 'warming':
+                response_data['error'] = 'All data sources failed'
+            return jsonify(response_data)
             
     except Exception as e:
         print(f"❌ Multi-source get_top_20_stocks error: {e}")
@@ -197,13 +248,14 @@ def get_top_20_stocks():
 def get_data_sources():
     """Get available data sources and their status"""
     try:
-        from multi_source_data import MultiSourceDataFetcher
-        fetcher = MultiSourceDataFetcher()
-        status = fetcher.check_all_sources()
+        # Use the shared fetcher so circuit breaker state reflects real traffic
+        from multi_source_data import multi_source_fetcher
+        status = multi_source_fetcher.check_all_sources()
         
         return jsonify({
             'status': 'success',
             'sources': status,
+            'generated_at': multi_source_fetcher.health.get_snapshot()['generated_at'],
             'default_source': DEFAULT_DATA_SOURCE,
             'available_sources': AVAILABLE_SOURCES
         })
@@ -228,136 +280,439 @@ def get_vercel_emergency_fallback():
         {'symbol': 'HINDUNILVR.NS', 'current_price': 2425.20, 'price_change': -0.3, 'name': 'HINDUSTAN UNILEVER LTD', 'sector': 'FMCG', 'market_cap': 456700}
     ]
 
+def signal_color(signal):
+    """Bootstrap colour class for a signal badge"""
+    if signal in ['STRONG_BUY', 'BUY']:
+        return "success"
+    elif signal in ['STRONG_SELL', 'SELL']:
+        return "danger"
+    return "warning"
+
+def build_signal(stock_data, tech_analysis):
+    """Signal entry for one top stock (technical analysis if available, else price-change fallback)"""
+    symbol = stock_data['symbol']
+    try:
+        # Create simple signal based on current price and change
+        current_price = stock_data.get('current_price', 1000.0)
+        price_change = stock_data.get('price_change', 0.0)
+        
+        # Use consistent technical analysis (computed by the caller)
+        if tech_analysis:
+            signal = tech_analysis['signal']
+            confidence = tech_analysis['confidence']
+        else:
+            # Fallback to simple logic if analysis fails
+            if price_change > 2:
+                signal = "BUY"
+                confidence = min(85, 60 + abs(price_change) * 5)
+            elif price_change < -2:
+                signal = "SELL"
+                confidence = min(85, 60 + abs(price_change) * 5)
+            else:
+                signal = "HOLD"
+                confidence = 50
+        
+        return {
+            'success': True,
+            'symbol': symbol,
+            'signal': signal,
+            'signal_color': signal_color(signal),
+            'confidence': confidence,
+            'current_price': current_price,
+            'price_change': price_change,
+            'name': stock_data.get('name', symbol),
+            'sector': stock_data.get('sector', 'Unknown'),
+            'data_source': stock_data.get('data_source', 'unknown'),
+            'signal_basis': 'technical' if tech_analysis else 'price_change'
+        }
+        
+    except Exception as e:
+        print(f"⚠️ Failed to analyze {symbol}: {e}")
+        # Add fallback signal
+        return {
+            'success': False,
+            'symbol': symbol,
+            'signal': 'HOLD',
+            'signal_color': 'warning',
+            'confidence': 50,
+            'current_price': 1000.0,
+            'price_change': 0.0,
+            'name': symbol,
+            'sector': 'Unknown',
+            'data_source': 'fallback',
+            'signal_basis': 'fallback',
+            'error': str(e)
+        }
+
+def has_analyzed_signals(signals):
+    """Whether a signal set holds at least one real technical analysis (not only fallbacks)"""
+    return any(signal['success'] and signal.get('signal_basis') == 'technical' for signal in signals or [])
+
+def compute_all_signals():
+    """Run the bulk signal analysis for the top stocks (None if no stock data is available)"""
+    print("🔄 Starting multi-source bulk signal analysis...")
+    
+    # Get stock data from multi-source system
+    stocks = get_nifty_200_list()
+    
+    if not stocks:
+        print("❌ No stocks available for analysis")
+        return None
+    
+    # Load histories concurrently (bounded fan-out), then score all of them in one vectorized pass
+    top_stocks = stocks[:20]
+    symbols = [stock['symbol'] for stock in top_stocks]
+    histories = run_parallel(fetch_historical_data, symbols, source='yahoo')
+    analyses = analyze_universe(dict(zip(symbols, histories)))
+    
+    # Analyze top 20 stocks
+    signals = [build_signal(stock_data, analyses.get(stock_data['symbol'])) for stock_data in top_stocks]
+    
+    # Only fallbacks (e.g. history fetches failing upstream): None = refresh failed, so they are
+    # neither cached nor persisted; the previous set, or uncached fallbacks, are served instead
+    if not has_analyzed_signals(signals):
+        print("⚠️ Bulk analysis produced only fallback signals, not caching them")
+        return None
+    
+    print(f"✅ Multi-source bulk analysis complete: {len(signals)} signals")
+    return signals
+
+def fallback_signals():
+    """Uncached price-change signals for the top stocks, for when no analysed set is available"""
+    top_stocks, _, _ = _top_stocks.get(DEFAULT_DATA_SOURCE, DEFAULT_DATA_SOURCE, wait=True)
+    return [build_signal(stock_data, None) for stock_data in (top_stocks or [])[:20]]
+
+def iter_all_signals(top_stocks):
+    """Yield each top stock's signal as soon as its history is loaded and scored.
+    
+    Stocks whose history misses the fan-out deadline still get their fallback signal, last.
+    """
+    by_symbol = {stock['symbol']: stock for stock in top_stocks}
+    pending = set(by_symbol)
+    for symbol, hist in iter_parallel(fetch_historical_data, list(by_symbol), source='yahoo'):
+        pending.discard(symbol)
+        analysis = analyze_universe({symbol: hist}).get(symbol) if hist is not None else None
+        yield build_signal(by_symbol[symbol], analysis)
+    
+    for symbol in by_symbol:
+        if symbol in pending:
+            yield build_signal(by_symbol[symbol], None)
+
+def _persist_all_signals(key, signals, updated_at):
+    snapshot_store.save_snapshot('signals', signals, saved_at=updated_at)
+
+# Bulk signals: stale-while-revalidate like the ranking, but a cold cache is computed inline
+_all_signals = StaleWhileRevalidate(
+    'all-signals', compute_all_signals, soft_ttl=CACHE_DURATION.total_seconds(), on_update=_persist_all_signals
+)
+
+# Streaming formats for /get_all_signals: ?stream=ndjson|sse, or the matching Accept header
+STREAM_MIMETYPES = {'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
+
+def _stream_format():
+    requested = request.args.get('stream')
+    if requested in STREAM_MIMETYPES:
+        return requested
+    accept = request.headers.get('Accept', '')
+    for stream_format, mimetype in STREAM_MIMETYPES.items():
+        if mimetype in accept:
+            return stream_format
+    return None
+
+def _encode_frame(stream_format, frame_type, data):
+    if stream_format == 'sse':
+        return f"event: {frame_type}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+    return json.dumps({'type': frame_type, 'data': data}, separators=(',', ':'), default=str) + '\n'
+
+def stream_all_signals(stream_format):
+    """One 'signal' frame per stock as soon as it is ready, then a 'summary' frame.
+    
+    A cached result set is replayed straight away (and refreshed in the background when
+    stale); a cold cache is computed here, stock by stock, and then becomes the cached value.
+    """
+    cached, cache_status, updated_at = _all_signals.peek('all')
+    if cached is not None:
+        if cache_status == 'stale':
+            _all_signals.get('all')  # schedules the background refresh
+        signals = iter(cached)
+    else:
+        top_stocks, _, _ = _top_stocks.get(DEFAULT_DATA_SOURCE, DEFAULT_DATA_SOURCE, wait=True)
+        if not top_stocks:
+            return jsonify({
+                'status': 'error',
+                'message': 'No stock data available'
+            }), 500
+        signals = iter_all_signals(top_stocks[:20])
+        cache_status = 'computed'
+    
+    def generate():
+        started = time.monotonic()
+        total = failed = 0
+        computed = [] if cached is None else None
+        try:
+            for signal in signals:
+                total += 1
+                failed += not signal['success']
+                if computed is not None:
+                    computed.append(signal)
+                yield _encode_frame(stream_format, 'signal', signal)
+            
+            finished_at = time.time()
+            # An all-fallback set (e.g. history fetches failing upstream) must not replace the
+            # last good snapshot that later requests and warm starts serve
+            if has_analyzed_signals(computed):
+                _all_signals.seed('all', computed, finished_at)
+                _persist_all_signals('all', computed, finished_at)
+            
+            yield _encode_frame(stream_format, 'summary', {
+                'status': 'success' if total else 'error',
+                'total_analyzed': total,
+                'failed': failed,
+                'is_fresh': cache_status in ('fresh', 'computed'),
+                'cache_status': cache_status,
+                'last_updated': datetime.fromtimestamp(updated_at or finished_at).strftime('%Y-%m-%d %H:%M:%S'),
+                'elapsed_seconds': round(time.monotonic() - started, 3)
+            })
+        except Exception as e:
+            print(f"❌ Error streaming bulk signals: {e}")
+            yield _encode_frame(stream_format, 'summary', {
+                'status': 'error',
+                'total_analyzed': total,
+                'failed': failed,
+                'message': f'Failed to analyze signals: {str(e)}'
+            })
+    
+    return Response(generate(), mimetype=STREAM_MIMETYPES[stream_format],
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/get_all_signals')
 def get_all_signals():
-    """Get buy/sell/hold signals for all top stocks using multi-source data."""
+    """Get buy/sell/hold signals for all top stocks using multi-source data.
+    
+    With ?stream=ndjson or ?stream=sse the signals are streamed as they complete.
+    """
     try:
-        print("🔄 Starting multi-source bulk signal analysis...")
+        stream_format = _stream_format()
+        if stream_format:
+            return stream_all_signals(stream_format)
         
-        # Get stock data from multi-source system
-        stocks = get_nifty_200_list()
-        signals = []
+        signals, cache_status, updated_at = _all_signals.get('all', wait=True)
+        if not signals:
+            signals, cache_status, updated_at = fallback_signals(), 'fallback', time.time()
         
-        if not stocks:
-            print("❌ No stocks available for analysis")
+        if not signals:
             return jsonify({
                 'status': 'error',
                 'message': 'No stock data available'
             }), 500
         
-        # Analyze top 20 stocks
-        for stock_data in stocks[:20]:
-            symbol = stock_data['symbol']
+        return jsonify({
+            'status': 'success',
+            'signals': signals,
+            'total_analyzed': len(signals),
+            'is_fresh': cache_status == 'fresh',
+            'cache_status': cache_status,
+            'last_updated': datetime.fromtimestamp(updated_at).strftime('%Y-%m-%d %H:%M:%S')
+        })
+        
+    except Exception as e:
+        print(f"❌ Error in bulk signal analysis: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Failed to analyze signals: {str(e)}'
+        }), 500
+
+def compute_batch_signals(symbols, risk_profile):
+    """Compact signal payloads for many tickers: concurrent history loads, one vectorized scoring pass.
+    
+    Returns {symbol: payload}; results are cached per (ticker, risk profile) so overlapping
+    dashboards only compute the tickers they do not share.
+    """
+    results = {}
+    missing = []
+    for symbol in symbols:
+        cached = _batch_signal_cache.get((symbol, risk_profile))
+        if cached is not None:
+            results[symbol] = cached
+        else:
+            missing.append(symbol)
+    
+    if missing:
+        histories = dict(zip(missing, run_parallel(fetch_historical_data, missing, source='yahoo')))
+        analyses = analyze_universe(histories)
+        # Entry/stop/exit for every risk profile at once, so other profiles are served from cache
+        enhanced_by_symbol = calculate_enhanced_metrics_batch(
+            {symbol: histories[symbol] for symbol in analyses}, risk_profiles=RISK_PROFILES
+        )
+        
+        for symbol in missing:
+            tech_analysis = analyses.get(symbol)
+            if tech_analysis is None:
+                # Not cached: the history may simply not be downloadable right now
+                results[symbol] = {
+                    'success': False,
+                    'symbol': symbol,
+                    'signal': 'HOLD',
+                    'signal_color': signal_color('HOLD'),
+                    'error': 'Insufficient historical data'
+                }
+                continue
             
-            try:
-                # Create simple signal based on current price and change
-                current_price = stock_data.get('current_price', 1000.0)
-                price_change = stock_data.get('price_change', 0.0)
-                
-                # Simple signal logic
-                # Use consistent technical analysis
-                tech_analysis = analyze_stock(symbol)
+            current_price = tech_analysis['current_price']
+            for profile, enhanced in enhanced_by_symbol.get(symbol, {}).items():
+                entry_price = enhanced['suggested_entry'] if enhanced else current_price
+                stop_loss = enhanced['stop_loss'] if enhanced else current_price * 0.95
+                exit_price = enhanced['exit_price'] if enhanced else current_price * 1.05
                 
-                if tech_analysis:
-                    signal = tech_analysis['signal']
-                    confidence = tech_analysis['confidence']
-                    signal_score = tech_analysis['signal_score']
-                    
-                    # Map signal to color
-                    if signal in ['STRONG_BUY', 'BUY']:
-                        signal_color = "success"
-                    elif signal in ['STRONG_SELL', 'SELL']:
-                        signal_color = "danger"
-                    else:
-                        signal_color = "warning"
-                else:
-                    # Fallback to simple logic if analysis fails
-                    if price_change > 2:
-                        signal = "BUY"
-                        signal_color = "success"
-                        confidence = min(85, 60 + abs(price_change) * 5)
-                    elif price_change < -2:
-                        signal = "SELL"
-                        signal_color = "danger"
-                        confidence = min(85, 60 + abs(price_change) * 5)
-                    else:
-                        signal = "HOLD"
-                        signal_color = "warning"
-                        confidence = 50
-                
-                signal_data = {
+                payload = {
                     'success': True,
                     'symbol': symbol,
-                    'signal': signal,
-                    'signal_color': signal_color,
-                    'confidence': confidence,
+                    'signal': tech_analysis['signal'],
+                    'signal_color': signal_color(tech_analysis['signal']),
+                    'signal_score': tech_analysis['signal_score'],
+                    'confidence': tech_analysis['confidence'],
                     'current_price': current_price,
-                    'price_change': price_change,
-                    'name': stock_data.get('name', symbol),
-                    'sector': stock_data.get('sector', 'Unknown'),
-                    'data_source': stock_data.get('data_source', 'unknown')
+                    'rsi': tech_analysis['rsi'],
+                    'macd': tech_analysis['macd'],
+                    'macd_signal': tech_analysis['macd_signal'],
+                    'sma_20': tech_analysis['sma_20'],
+                    'sma_50': tech_analysis['sma_50'],
+                    'atr': tech_analysis['atr'],
+                    'volume_ratio': tech_analysis['volume_ratio'],
+                    'entry_price': round(entry_price, 2),
+                    'stop_loss': round(stop_loss, 2),
+                    'exit_price': round(exit_price, 2),
+                    'risk_level': profile
                 }
-                
-                signals.append(signal_data)
-                
-            except Exception as e:
-                print(f"⚠️ Failed to analyze {symbol}: {e}")
-                # Add fallback signal
-                signals.append({
-                    'success': False,
-                    'symbol': symbol,
-                    'signal': 'HOLD',
-                    'signal_color': 'warning',
-                    'confidence': 50,
-                    'current_price': 1000.0,
-                    'price_change': 0.0,
-                    'name': symbol,
-                    'sector': 'Unknown',
-                    'data_source': 'fallback',
-                    'error': str(e)
-                })
-        
-        print(f"✅ Multi-source bulk analysis complete: {len(signals)} signals")
-        
+                _batch_signal_cache.set((symbol, profile), payload)
+                if profile == risk_profile:
+                    results[symbol] = payload
+    
+    return results
+
+@app.route('/api/v1/signals/batch', methods=['POST'])
+def get_batch_signals():
+    """Signals for many tickers in one round trip.
+    
+    Body: {"tickers": ["RELIANCE", "TCS.NS", ...], "risk_profile": "Medium"}
+    """
+    data = request.get_json(silent=True) or {}
+    tickers = data.get('tickers')
+    # The risk radio ids give 'low'/'medium'/...; profiles are capitalised
+    risk_profile = str(data.get('risk_profile', 'Medium')).strip().capitalize()
+    
+    if not isinstance(tickers, list) or not tickers or not all(isinstance(t, str) and t.strip() for t in tickers):
+        return jsonify({'status': 'error', 'message': 'tickers must be a non-empty list of symbols'}), 400
+    if risk_profile not in RISK_PROFILES:
+        return jsonify({'status': 'error', 'message': f"risk_profile must be one of {', '.join(RISK_PROFILES)}"}), 400
+    
+    # Add .NS suffix if not present for Indian stocks; keep request order, drop duplicates
+    symbols = []
+    for ticker in tickers:
+        symbol = ticker.strip().upper()
+        if not symbol.endswith('.NS'):
+            symbol = symbol + '.NS'
+        if symbol not in symbols:
+            symbols.append(symbol)
+    
+    if len(symbols) > MAX_BATCH_TICKERS:
+        return jsonify({'status': 'error', 'message': f'At most {MAX_BATCH_TICKERS} tickers per request'}), 400
+    
+    try:
+        results = compute_batch_signals(symbols, risk_profile)
+        signals = [results[symbol] for symbol in symbols]
         return jsonify({
             'status': 'success',
+            'risk_profile': risk_profile,
             'signals': signals,
-            'total_analyzed': len(signals)
+            'total_analyzed': sum(1 for signal in signals if signal['success']),
+            'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         })
-        
     except Exception as e:
-        print(f"❌ Error in bulk signal analysis: {e}")
+        print(f"❌ Error in batch signal analysis: {e}")
         return jsonify({
             'status': 'error',
             'message': f'Failed to analyze signals: {str(e)}'
         }), 500
 
+def risk_profile_fields(tech_analysis, current_price, risk_appetite):
+    """Entry/stop/exit part of a /get_stock_data response for one risk profile"""
+    if tech_analysis:
+        # Get enhanced metrics
+        levels = tech_analysis['risk_profiles'].get(risk_appetite, tech_analysis['risk_profiles']['Medium'])
+        entry_price = levels['enhanced_entry']
+        stop_loss = levels['enhanced_stop']
+        exit_price = levels['enhanced_exit']
+        
+        target_profit = exit_price - entry_price
+        risk_reward_ratio = target_profit / (entry_price - stop_loss) if (entry_price - stop_loss) > 0 else 3.0
+        reason = f"Based on {len(tech_analysis.get('signal_factors', []))} technical factors"
+        signal = tech_analysis.get('signal', 'HOLD')
+        signal_score = tech_analysis.get('signal_score', 0)
+    else:
+        # Fallback risk calculation
+        risk_multipliers = {'Low': 0.02, 'Medium': 0.05, 'High': 0.10}
+        stop_loss_pct = risk_multipliers.get(risk_appetite, 0.05)
+        stop_loss = current_price * (1 - stop_loss_pct)
+        entry_price = current_price
+        exit_price = current_price + (3 * (current_price - stop_loss))
+        target_profit = exit_price - entry_price
+        risk_reward_ratio = 3.0
+        reason = "Insufficient historical data"
+        signal = "HOLD"
+        signal_score = 0
+    
+    return {
+        'analysis_summary': f"Technical indicators suggest {signal} (Score: {signal_score}). {reason}. Consider stop-loss at ₹{stop_loss:.2f}.",
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'stop_loss': stop_loss,
+        'target_profit': target_profit,
+        'risk_reward_ratio': round(risk_reward_ratio, 2)
+    }
+
+def _select_risk_profile(analysis, risk_appetite):
+    """Response for one risk appetite from a cached per-ticker analysis (unknown ones get Medium's levels)"""
+    risk_levels = analysis['risk_levels']
+    response_data = {key: value for key, value in analysis.items() if key != 'risk_levels'}
+    response_data.update(risk_levels.get(risk_appetite, risk_levels['Medium']))
+    response_data['risk_level'] = risk_appetite
+    return response_data
+
 @app.route('/get_stock_data/<string:ticker>/<string:risk_appetite>')
 def get_stock_data(ticker, risk_appetite):
     """Multi-source: Get stock analysis with timeout handling"""
     try:
         print(f"🔄 Multi-source: Analyzing {ticker} with {risk_appetite} risk...")
         
-        # Check cache first
-        cache_key = f"stock_{ticker}_{risk_appetite}"
-        current_time = datetime.now()
+        # Add .NS suffix if not present for Indian stocks
+        if not ticker.endswith('.NS'):
+            ticker = ticker + '.NS'
         
-        if (cache_key in _cache_timestamps and 
-            cache_key in _vercel_cache and
-            current_time - _cache_timestamps[cache_key] < CACHE_DURATION):
-            
+        # Check cache first: one entry per ticker serves every risk profile
+        cache_key = f"stock_{ticker}"
+        cached = _analysis_cache.get(cache_key)
+        
+        if cached is not None:
             print(f"✅ Multi-source: Using cached analysis for {ticker}")
-            return jsonify(_vercel_cache[cache_key])
+            return jsonify(_select_risk_profile(cached, risk_appetite))
         
         # Get data source from query parameter
         source = request.args.get('source', DEFAULT_DATA_SOURCE)
         
-        # Add .NS suffix if not present for Indian stocks
-        if not ticker.endswith('.NS'):
-            ticker = ticker + '.NS'
+        # One context per request: history and info are fetched once and shared by every stage below
+        context = MarketDataContext(ticker)
         
-        # Use multi-source data fetching
-        stock_data = get_stock_data_multi_source(ticker, source=source, timeout=10)
+        # The Yahoo quote comes from the context; other sources (or a failed context) use the multi-source chain
+        stock_data = None
+        if source == 'yahoo':
+            quote = context.quote()
+            if quote:
+                stock_data = {'data': quote, 'source': 'yahoo'}
+        
+        if stock_data is None:
+            # Use multi-source data fetching (hedged: slow sources are raced against the next fallback)
+            stock_data = get_stock_data_multi_source(ticker, source=source, timeout=10, hedged=True)
         
         if stock_data:
             data = stock_data['data']
@@ -366,9 +721,29 @@ def get_stock_data(ticker, risk_appetite):
             # Generate analysis summary
             current_price = data.get('current_price', 0)
             
+            # News, analyst recommendations and sentiment are independent: run them alongside the analysis
+            market_stages = StagedPipeline(f"stock-data {ticker}")
+            market_stages.add(
+                'news', get_market_news, ticker, limit=3, context=context,
+                fallback={'news': [{'title': 'Market data temporarily unavailable', 'summary': 'Please try again later'}]},
+                deadline=NEWS_STAGE_DEADLINE
+            )
+            market_stages.add(
+                'recommendations', get_analyst_recommendations, ticker, context=context,
+                fallback={'recommendation': 'HOLD', 'total_analysts': 0},
+                deadline=RECOMMENDATIONS_STAGE_DEADLINE
+            )
+            market_stages.add(
+                'sentiment', get_market_sentiment, ticker, context=context,
+                fallback={'score': 0.5, 'sentiment': 'NEUTRAL'},
+                deadline=SENTIMENT_STAGE_DEADLINE
+            )
+            market_stages.start()
+            
             # --- ENHANCED ANALYSIS START ---
-            # Perform technical analysis using the new module
-            tech_analysis = analyze_stock(ticker, risk_profile=risk_appetite)
+            # Perform technical analysis using the new module (one pass covers every risk profile);
+            # the live quote is applied to the stored history through the incremental indicator state
+            tech_analysis = analyze_stock(ticker, current_data=data, risk_profile=risk_appetite, context=context)
             
             if tech_analysis:
                 print(f"✅ Enhanced analysis successful for {ticker}")
@@ -376,7 +751,6 @@ def get_stock_data(ticker, risk_appetite):
                 signal = tech_analysis.get('signal', 'HOLD')
                 confidence = tech_analysis.get('confidence', 50)
                 signal_score = tech_analysis.get('signal_score', 0)
-                factors = tech_analysis.get('signal_factors', [])
                 
                 # Use real indicators (note: keys are sma_20, sma_50, not ma20, ma50)
                 ma20 = tech_analysis.get('sma_20')
@@ -386,15 +760,6 @@ def get_stock_data(ticker, risk_appetite):
                 macd = tech_analysis.get('macd')
                 macd_signal = tech_analysis.get('macd_signal')
                 volume_ratio = tech_analysis.get('volume_ratio')
-                
-                # Get enhanced metrics
-                entry_price = tech_analysis.get('enhanced_entry', current_price)
-                stop_loss = tech_analysis.get('enhanced_stop', current_price * 0.95)
-                exit_price = tech_analysis.get('enhanced_exit', current_price * 1.05)
-                
-                target_profit = exit_price - entry_price
-                risk_reward_ratio = target_profit / (entry_price - stop_loss) if (entry_price - stop_loss) > 0 else 3.0
-                reason = f"Based on {len(factors)} technical factors"
             else:
                 # Fallback if analysis fails
                 print(f"⚠️ Enhanced analysis failed for {ticker}, using fallback")
@@ -403,75 +768,57 @@ def get_stock_data(ticker, risk_appetite):
                 signal_score = 0
                 ma20 = ma50 = ma200 = atr = macd = macd_signal = volume_ratio = None
                 rsi = 50.0
-                reason = "Insufficient historical data"
-                
-                # Fallback risk calculation
-                risk_multipliers = {'Low': 0.02, 'Medium': 0.05, 'High': 0.10}
-                stop_loss_pct = risk_multipliers.get(risk_appetite, 0.05)
-                stop_loss = current_price * (1 - stop_loss_pct)
-                entry_price = current_price
-                exit_price = current_price + (3 * (current_price - stop_loss))
-                target_profit = exit_price - entry_price
-                risk_reward_ratio = 3.0
-            # --- ENHANCED ANALYSIS END ---
             
-            analysis_summary = f"Technical indicators suggest {signal} (Score: {signal_score}). {reason}. Consider stop-loss at ₹{stop_loss:.2f}."
+            risk_levels = {
+                profile: risk_profile_fields(tech_analysis, current_price, profile)
+                for profile in RISK_PROFILES
+            }
+            # --- ENHANCED ANALYSIS END ---
             
-            # Get market data with timeout protection
-            try:
-                news = get_market_news(ticker, limit=3)
-                recommendations = get_analyst_recommendations(ticker)
-                sentiment = get_market_sentiment(ticker)
-            except Exception as e:
-                print(f"⚠️ Multi-source: Market data error for {ticker} - {e}")
-                news = {'news': [{'title': 'Market data temporarily unavailable', 'summary': 'Please try again later'}]}
-                recommendations = {'recommendation': 'HOLD', 'total_analysts': 0}
-                sentiment = {'score': 0.5, 'sentiment': 'NEUTRAL'}
+            # Collect market data; a late or failed stage falls back without blocking the others
+            stage_results = market_stages.results()
+            news = stage_results['news']
+            recommendations = stage_results['recommendations']
+            sentiment = stage_results['sentiment']
             
-            response_data = {
+            analysis = {
                 'ticker': ticker,
                 'current_price': current_price,
                 'rsi': rsi,
                 'ma20': ma20,
                 'ma50': ma50,
                 'ma200': ma200,
-                'risk_level': risk_appetite,
-                'analysis_summary': analysis_summary,
                 'market_news': news,
                 'analyst_recommendations': recommendations,
                 'market_sentiment': sentiment,
                 'data_source': f"multi-source-{actual_source}",
                 'requested_source': source,
+                'degraded_sections': market_stages.degraded(),
                 'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 # Trading prediction fields
                 'signal': signal,
                 'signal_score': signal_score,
-                'entry_price': entry_price,
-                'exit_price': exit_price,
-                'stop_loss': stop_loss,
                 'confidence': confidence,
-                'target_profit': target_profit,
-                'risk_reward_ratio': round(risk_reward_ratio, 2),
                 'time_horizon': '1-2 weeks',
                 'macd': macd,
                 'macd_signal': macd_signal,
                 'atr': atr,
                 'volume_ratio': volume_ratio,
-                'atr': atr,
-                'volume_ratio': volume_ratio,
-                'chart_data': tech_analysis.get('historical_data', {
+                'chart_data': (tech_analysis or {}).get('historical_data', {
                     'dates': [],
                     'prices': [],
                     'volumes': []
-                })
+                }),
+                # Entry/stop/exit block per risk profile; one is merged in at response time
+                'risk_levels': risk_levels
             }
             
-            # Cache the result
-            _vercel_cache[cache_key] = response_data
-            _cache_timestamps[cache_key] = current_time
+            # Cache the result (degraded responses are retried on the next request instead)
+            if not analysis['degraded_sections']:
+                _analysis_cache.set(cache_key, analysis)
             
             print(f"✅ Multi-source: Analysis complete for {ticker} from {actual_source}")
-            return jsonify(response_data)
+            return jsonify(_select_risk_profile(analysis, risk_appetite))
         
         else:
             print(f"❌ Multi-source: All sources failed for {ticker}, using fallback")
@@ -690,6 +1037,11 @@ def api_health():
             'data_sources': AVAILABLE_SOURCES,
             'default_source': DEFAULT_DATA_SOURCE,
             'cache_status': 'active',
+            'rate_limits': get_rate_limit_status(),
+            'response_caches': get_cache_stats(),
+            'top_stocks_cache': _top_stocks.stats(),
+            'signal_profile': get_signal_profile_name(),
+            'indicator_cache': indicator_cache_stats(),
             'system': 'vercel-serverless'
         })
     except Exception as e:
@@ -699,12 +1051,32 @@ def api_health():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+def warm_start():
+    """Seed the response caches from the snapshots persisted by the previous process"""
+    seeded = []
+    for source in AVAILABLE_SOURCES:
+        stocks, saved_at = snapshot_store.load_snapshot(f'top_stocks_{source}')
+        if stocks:
+            _top_stocks.seed(source, stocks, saved_at)
+            seeded.append(f'top_stocks_{source}')
+    
+    signals, saved_at = snapshot_store.load_snapshot('signals')
+    if signals:
+        _all_signals.seed('all', signals, saved_at)
+        seeded.append('signals')
+    
+    if seeded:
+        print(f"💾 Warm start: seeded {', '.join(seeded)} from disk")
+    return seeded
+
+# Warm data is in place before the first request; stale entries refresh behind it
+warm_start()
+
 # Production deployment
 if __name__ == '__main__':
-    # Fetch the list on startup
     print("Initializing Stock Predictor Application...")
-    # Multi-source: Initialize with data fetch
-    get_nifty_200_list()
+    # Multi-source: start loading the ranking in the background instead of blocking startup
+    _top_stocks.get(DEFAULT_DATA_SOURCE, DEFAULT_DATA_SOURCE)
     
     print("Starting Flask server with multi-source data support...")
     port = int(os.environ.get('PORT', 5000))
@@ -7,7 +7,7 @@ import time
 import requests
 from datetime import datetime, timedelta
 from market_data import get_market_news, get_analyst_recommendations, get_market_sentiment
-from vercel_compatible import get_vercel_compatible_stocks, get_vercel_stock_data, clear_vercel_cache
+from vercel_compatible import get_vercel_compatible_stocks, get_vercel_stock_data, clear_vercel_cache, get_vercel_cache_stats
 import os
 
 app = Flask(__name__)
@@ -226,7 +226,8 @@ def health():
         'status': 'healthy',
         'platform': 'vercel',
         'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'cache_status': 'active'
+        'cache_status': 'active',
+        'cache_stats': get_vercel_cache_stats()
     })
 
 if __name__ == '__main__':
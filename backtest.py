@@ -0,0 +1,327 @@
+"""
+Backtest Module
+Replays analyze_stock's signal scoring over the full stored history of a universe of tickers
+and simulates the Enhanced Logic entries, stops and exits, as array operations on aligned
+(dates x tickers) panels.
+
+Rules of the simulation (long only, one position per ticker at a time):
+  - a BUY or STRONG_BUY close on day t places a limit order at that day's suggested entry,
+    valid for day t+1 (filled at the open instead if it gaps below the entry);
+  - from the fill day on, the first day whose low reaches the stop or whose high reaches the
+    exit closes the trade (the stop wins if both are touched the same day, and later gaps
+    through a level fill at the open); otherwise it is closed at day t+horizon's close;
+  - signals are ignored while a position is open or while its order is pending.
+"""
+
+import time
+from functools import partial
+import numpy as np
+from technical_analysis import (
+    ALLOWED_LOSS, ENHANCED_LOOKBACK, ENHANCED_TARGETS, ENTRY_Z, MIN_HISTORY_BARS,
+    build_price_panel, calculate_indicator_panel, classify_signal_array, compact, compact_rows,
+    expected_return_surface, fetch_historical_data, get_signal_profile, scatter, set_signal_profile,
+    signal_score_array
+)
+
+# Trading days a trade may stay open ('1-2 weeks', the time horizon the app quotes)
+BACKTEST_HORIZON = 10
+TRADING_DAYS_PER_YEAR = 252
+SIGNAL_CLASSES = ['STRONG_BUY', 'BUY', 'HOLD', 'SELL', 'STRONG_SELL']
+
+# signal_score_array's inputs, in argument order
+SIGNAL_INPUTS = ['rsi', 'sma_20', 'sma_50', 'macd', 'macd_signal', 'volume_ratio', 'atr', 'close']
+
+def signal_inputs(panel, indicators=None):
+    """Arrays signal_score_array needs (SIGNAL_INPUTS) plus 'scored', where analyze_stock would score the day"""
+    indicators = indicators or calculate_indicator_panel(panel)
+    close = panel['Close'].to_numpy()
+    volume = panel['Volume'].to_numpy()
+    avg_volume = indicators['avg_volume']
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        volume_ratio = np.where(avg_volume > 0, volume / np.where(avg_volume > 0, avg_volume, 1), 1.0)
+    listed = ~np.isnan(close)
+    bars = np.cumsum(listed, axis=0)
+
+    inputs = {name: indicators[name] for name in SIGNAL_INPUTS if name in indicators}
+    inputs.update(volume_ratio=volume_ratio, close=close, scored=listed & (bars >= MIN_HISTORY_BARS))
+    return inputs
+
+def scores_from_inputs(inputs, profile=None):
+    """signal_scores from precomputed signal_inputs (NaN where analyze_stock returns None)"""
+    score = signal_score_array(*(inputs[name] for name in SIGNAL_INPUTS), profile=profile)
+    return np.where(inputs['scored'], score, np.nan)
+
+def signal_scores(panel, indicators=None, profile=None):
+    """analyze_stock's signal_score for every (date, ticker); NaN where it would return None"""
+    return scores_from_inputs(signal_inputs(panel, indicators), profile)
+
+def _rolling_windows(values, window):
+    """(rows, columns, window) view of trailing windows; rows before the first full window are NaN-padded"""
+    padded = np.concatenate([np.full((window - 1, values.shape[1]), np.nan), values])
+    return np.lib.stride_tricks.sliding_window_view(padded, window, axis=0)
+
+def trade_levels(close, risk_profile='Medium'):
+    """Suggested entry, stop and exit for every (date, ticker), as calculate_enhanced_metrics sets them"""
+    allowed_loss = ALLOWED_LOSS.get(risk_profile, ALLOWED_LOSS['Medium'])
+
+    # Returns and their windows over each ticker's own bars, skipping panel rows it has none on
+    listed = ~np.isnan(close)
+    order, bars = compact_rows(listed), listed.sum(axis=0)
+    own_close = compact(close, order)
+    returns = np.full(close.shape, np.nan)
+    returns[1:] = own_close[1:] / own_close[:-1] - 1
+    windows = _rolling_windows(returns, ENHANCED_LOOKBACK)
+    with np.errstate(invalid='ignore'):
+        mu = scatter(windows.mean(axis=-1), order, bars)
+        sigma = scatter(windows.std(axis=-1, ddof=1), order, bars)
+
+    surface = expected_return_surface(mu.ravel(), sigma.ravel(), allowed_losses=(allowed_loss,))[:, 0, :]
+    best_target = np.asarray(ENHANCED_TARGETS)[surface.argmax(axis=1)].reshape(close.shape)
+
+    entry = close * (1 - ENTRY_Z * sigma)
+    valid = ~np.isnan(mu) & ~np.isnan(sigma) & (sigma != 0)
+    entry = np.where(valid, entry, np.nan)
+    return entry, entry * (1 - allowed_loss), entry * (1 + best_target)
+
+def _first_true(hits):
+    """Index of the first True along the last axis, or the axis length if none"""
+    return np.where(hits.any(axis=-1), hits.argmax(axis=-1), hits.shape[-1])
+
+def simulate_signal_trades(panel, entry, stop, target, horizon=BACKTEST_HORIZON):
+    """Outcome of a trade opened by a signal on each day, independently of any other trade.
+
+    Returns arrays over (signal day, ticker): filled, fill price, exit day, exit price and
+    outcome (0 not filled, 1 target, 2 stop, 3 time exit). Days without a full horizon
+    ahead are never filled.
+    """
+    open_ = panel['Open'].to_numpy()
+    high = panel['High'].to_numpy()
+    low = panel['Low'].to_numpy()
+    close = panel['Close'].to_numpy()
+    rows, columns = close.shape
+
+    filled = np.zeros(close.shape, dtype=bool)
+    fill_price = np.full(close.shape, np.nan)
+    exit_day = np.arange(rows)[:, None].repeat(columns, axis=1)
+    exit_price = np.full(close.shape, np.nan)
+    outcome = np.zeros(close.shape, dtype=np.int8)
+    usable = rows - horizon
+    if usable <= 0:
+        return filled, fill_price, exit_day, exit_price, outcome
+
+    with np.errstate(invalid='ignore'):
+        # Limit order for the next session
+        next_open, next_low = open_[1:usable + 1], low[1:usable + 1]
+        order = entry[:usable]
+        filled[:usable] = next_low <= order
+        fill_price[:usable] = np.where(filled[:usable], np.minimum(next_open, order), np.nan)
+
+        # Days t+1 .. t+horizon for every signal day t: (usable, columns, horizon)
+        ahead = lambda values: np.lib.stride_tricks.sliding_window_view(values[1:], horizon, axis=0)[:usable]
+        window_open, window_high, window_low = ahead(open_), ahead(high), ahead(low)
+        stop_now = stop[:usable, :, None]
+        target_now = target[:usable, :, None]
+        first_stop = _first_true(window_low <= stop_now)
+        first_target = _first_true(window_high >= target_now)
+
+    hit_stop = first_stop <= first_target
+    offset = np.minimum(np.minimum(first_stop, first_target), horizon - 1)
+    timed_out = (first_stop == horizon) & (first_target == horizon)
+
+    picked = lambda window: np.take_along_axis(window, offset[..., None], axis=-1)[..., 0]
+    day_open = picked(window_open)
+    # Gaps through a level fill at that day's open; on the fill day itself a stop can be no
+    # better than the fill (an open that gapped below the stop exits flat)
+    gapped = offset > 0
+    stop_fill = np.where(gapped, np.minimum(day_open, stop[:usable]), np.fmin(stop[:usable], fill_price[:usable]))
+    target_fill = np.where(gapped, np.maximum(day_open, target[:usable]), target[:usable])
+    time_fill = close[horizon:horizon + usable]
+
+    leave = np.where(timed_out, time_fill, np.where(hit_stop, stop_fill, target_fill))
+    exit_day[:usable] = np.arange(usable)[:, None] + 1 + offset
+    exit_price[:usable] = np.where(filled[:usable], leave, np.nan)
+    outcome[:usable] = np.where(filled[:usable], np.where(timed_out, 3, np.where(hit_stop, 2, 1)), 0)
+    return filled, fill_price, exit_day, exit_price, outcome
+
+def select_positions(buy, filled, exit_day):
+    """Signals actually acted on when each ticker holds at most one position at a time.
+
+    Loops over successive trades (not days), every ticker at once: after a signal, the next
+    one considered is the first after its exit day (or the next day if its order did not fill).
+    """
+    rows, columns = buy.shape
+    signal_day = np.where(buy, np.arange(rows)[:, None], rows)
+    # next_signal[d] = first signal day >= d (rows if none); one extra row for "past the end"
+    next_signal = np.minimum.accumulate(np.vstack([signal_day, np.full((1, columns), rows)])[::-1], axis=0)[::-1]
+    busy_until = np.where(filled, exit_day, np.arange(rows)[:, None])
+
+    taken = np.zeros(buy.shape, dtype=bool)
+    column_ids = np.arange(columns)
+    current = next_signal[0].copy()
+    while True:
+        active = current < rows
+        if not active.any():
+            break
+        day, column = current[active], column_ids[active]
+        taken[day, column] = True
+        current[active] = next_signal[np.minimum(busy_until[day, column] + 1, rows), column]
+    return taken
+
+def _daily_strategy_returns(close, trades, fill_price, exit_day, exit_price):
+    """Mark-to-market daily returns of each ticker's sleeve (0 while flat)"""
+    rows, columns = close.shape
+    signal, column = np.nonzero(trades)
+    start, end = signal + 1, exit_day[signal, column]
+
+    holding = np.zeros((rows + 1, columns))
+    np.add.at(holding, (start + 1, column), 1)
+    np.add.at(holding, (end + 1, column), -1)
+    holding = np.cumsum(holding, axis=0)[:rows] > 0  # Days after the fill day up to the exit day
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        close_return = np.full(close.shape, np.nan)
+        close_return[1:] = close[1:] / close[:-1] - 1
+        daily = np.where(holding, close_return, 0.0)
+
+        fill = fill_price[signal, column]
+        leave = exit_price[signal, column]
+        same_day = end == start
+        daily[start, column] = np.where(same_day, leave, close[start, column]) / fill - 1
+        later = ~same_day
+        daily[end[later], column[later]] = leave[later] / close[end[later] - 1, column[later]] - 1
+    return np.nan_to_num(daily, nan=0.0)
+
+def _max_drawdown(equity):
+    """Largest peak-to-trough fall of each equity column"""
+    peaks = np.maximum.accumulate(equity, axis=0)
+    return (1 - equity / peaks).max(axis=0)
+
+def _ratio(count, total):
+    return round(count / total, 4) if total else None
+
+def trade_statistics(close, trades, fill_price, exit_day, exit_price, outcome):
+    """Aggregate trade and equity-curve metrics of the selected trades (see select_positions)"""
+    rows = close.shape[0]
+    trade_returns = exit_price[trades] / fill_price[trades] - 1
+    trade_outcomes = outcome[trades]
+    trade_count = len(trade_returns)
+
+    daily = _daily_strategy_returns(close, trades, fill_price, exit_day, exit_price)
+    portfolio_equity = np.cumprod(1 + daily.mean(axis=1))
+    total_return = float(portfolio_equity[-1] - 1) if rows else 0.0
+    years = rows / TRADING_DAYS_PER_YEAR
+    annualized = (1 + total_return) ** (1 / years) - 1 if years > 0 and total_return > -1 else None
+    max_drawdown = float(_max_drawdown(portfolio_equity[:, None])[0]) if rows else 0.0
+
+    return {
+        'trades': trade_count,
+        'hit_rate': _ratio(int((trade_returns > 0).sum()), trade_count),
+        'target_rate': _ratio(int((trade_outcomes == 1).sum()), trade_count),
+        'stop_rate': _ratio(int((trade_outcomes == 2).sum()), trade_count),
+        'time_exit_rate': _ratio(int((trade_outcomes == 3).sum()), trade_count),
+        'avg_trade_return': round(float(trade_returns.mean()), 5) if trade_count else None,
+        'median_trade_return': round(float(np.median(trade_returns)), 5) if trade_count else None,
+        'total_return': round(total_return, 4),
+        'annualized_return': round(annualized, 4) if annualized is not None else None,
+        'max_drawdown': round(max_drawdown, 4),
+        'calmar': round(annualized / max_drawdown, 3) if annualized is not None and max_drawdown > 0 else None
+    }
+
+def backtest_panel(panel, risk_profile='Medium', horizon=BACKTEST_HORIZON, signal_profile=None):
+    """Backtest the scoring rules over an aligned price panel (see build_price_panel); returns a report dict"""
+    started = time.perf_counter()
+    signal_profile = signal_profile or get_signal_profile()
+    close = panel['Close'].to_numpy()
+    rows, columns = close.shape
+    tickers = list(panel['Close'].columns)
+
+    score = signal_scores(panel, profile=signal_profile)
+    signal = np.where(np.isnan(score), '', classify_signal_array(np.nan_to_num(score), signal_profile))
+    entry, stop, target = trade_levels(close, risk_profile)
+
+    # Event study: mean close-to-close return over the horizon after each signal class
+    forward = np.full(close.shape, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        forward[:rows - horizon] = close[horizon:] / close[:rows - horizon] - 1
+    forward_returns = {}
+    signal_counts = {}
+    for name in SIGNAL_CLASSES:
+        mask = signal == name
+        signal_counts[name] = int(mask.sum())
+        values = forward[mask & ~np.isnan(forward)]
+        forward_returns[name] = round(float(values.mean()), 5) if len(values) else None
+
+    buy = (score >= signal_profile['signal_score']) & ~np.isnan(entry)
+    filled, fill_price, exit_day, exit_price, outcome = simulate_signal_trades(panel, entry, stop, target, horizon)
+    trades = select_positions(buy, filled, exit_day) & filled
+
+    daily = _daily_strategy_returns(close, trades, fill_price, exit_day, exit_price)
+    sleeve_equity = np.cumprod(1 + daily, axis=0)
+
+    per_ticker = {}
+    trades_per_ticker = trades.sum(axis=0)
+    wins = (trades & (exit_price > fill_price)).sum(axis=0)
+    sleeve_drawdown = _max_drawdown(sleeve_equity) if rows else np.zeros(columns)
+    for i, ticker in enumerate(tickers):
+        per_ticker[ticker] = {
+            'trades': int(trades_per_ticker[i]),
+            'hit_rate': _ratio(int(wins[i]), int(trades_per_ticker[i])),
+            'total_return': round(float(sleeve_equity[-1, i] - 1), 4) if rows else 0.0,
+            'max_drawdown': round(float(sleeve_drawdown[i]), 4)
+        }
+
+    return {
+        'tickers': columns,
+        'bars': rows,
+        'risk_profile': risk_profile,
+        'horizon_days': horizon,
+        'signals': signal_counts,
+        'forward_returns': forward_returns,
+        **trade_statistics(close, trades, fill_price, exit_day, exit_price, outcome),
+        'per_ticker': per_ticker,
+        'elapsed_seconds': round(time.perf_counter() - started, 3)
+    }
+
+def load_panel(tickers=None, period='10y'):
+    """Aligned price panel of stored (or downloaded) history for the universe; None if nothing loaded"""
+    from multi_source_data import get_major_nifty_stocks, run_parallel
+
+    tickers = tickers or get_major_nifty_stocks()
+    histories = run_parallel(partial(fetch_historical_data, period=period), tickers, source='yahoo')
+    panel = build_price_panel(dict(zip(tickers, histories)))
+    if panel is None:
+        print("❌ No history available to backtest")
+    return panel
+
+def run_backtest(tickers=None, period='10y', risk_profile='Medium', horizon=BACKTEST_HORIZON, signal_profile=None):
+    """Load stored (or downloaded) history for the universe and backtest it"""
+    panel = load_panel(tickers, period)
+    if panel is None:
+        return None
+    return backtest_panel(panel, risk_profile=risk_profile, horizon=horizon, signal_profile=signal_profile)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backtest the analyze_stock signal rules")
+    parser.add_argument('tickers', nargs='*', help="Symbols (default: the major NIFTY universe)")
+    parser.add_argument('--period', default='10y')
+    parser.add_argument('--risk', default='Medium', choices=list(ALLOWED_LOSS))
+    parser.add_argument('--horizon', type=int, default=BACKTEST_HORIZON)
+    parser.add_argument('--signal-profile', default='default', help="Named signal profile (see signal_sweep.py)")
+    args = parser.parse_args()
+
+    if not set_signal_profile(args.signal_profile):
+        raise SystemExit(1)
+    report = run_backtest(args.tickers or None, period=args.period, risk_profile=args.risk, horizon=args.horizon)
+    if report:
+        print(f"📊 Backtest: {report['tickers']} tickers, {report['bars']} bars, {args.risk} risk, "
+              f"{report['horizon_days']}-day horizon ({report['elapsed_seconds']}s)")
+        print("=" * 60)
+        print(f"Trades: {report['trades']}  Hit rate: {report['hit_rate']}  "
+              f"Target/Stop/Time: {report['target_rate']}/{report['stop_rate']}/{report['time_exit_rate']}")
+        print(f"Avg trade: {report['avg_trade_return']}  Median trade: {report['median_trade_return']}")
+        print(f"Total return: {report['total_return']}  Annualized: {report['annualized_return']}  "
+              f"Max drawdown: {report['max_drawdown']}")
+        print(f"Forward {report['horizon_days']}-day return by signal: {report['forward_returns']}")
@@ -4,10 +4,11 @@ Real-time market intelligence and stock analysis for chatbot
 """
 
 import yfinance as yf
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import re
+from multi_source_data import run_parallel
+from indicators import compute_indicators
 
 def get_stock_recommendations(user_message):
     """Get real-time stock recommendations based on market analysis"""
@@ -21,85 +22,9 @@ def get_stock_recommendations(user_message):
             'TITAN.NS', 'BAJFINANCE.NS', 'NESTLEIND.NS', 'ULTRACEMCO.NS', 'WIPRO.NS'
         ]
         
-        recommendations = []
-        
-        for stock_symbol in nifty_stocks[:10]:  # Analyze top 10 for performance
-            try:
-                stock = yf.Ticker(stock_symbol)
-                hist = stock.history(period="60d", interval="1d")
-                info = stock.info
-                
-                if not hist.empty and len(hist) >= 20:
-                    current_price = hist['Close'].iloc[-1]
-                    
-                    # Technical analysis
-                    hist['MA20'] = hist['Close'].rolling(window=20).mean()
-                    hist['MA50'] = hist['Close'].rolling(window=50).mean()
-                    
-                    # RSI calculation
-                    delta = hist['Close'].diff()
-                    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-                    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-                    rs = gain / loss.replace(0, 1)
-                    rsi = 100 - (100 / (1 + rs))
-                    current_rsi = rsi.iloc[-1]
-                    
-                    # Volume analysis
-                    avg_volume = hist['Volume'].rolling(window=20).mean().iloc[-1]
-                    current_volume = hist['Volume'].iloc[-1]
-                    volume_ratio = current_volume / avg_volume if avg_volume > 0 else 1
-                    
-                    # Signal generation
-                    signal_score = 0
-                    if current_rsi < 30:
-                        signal_score += 40
-                    elif current_rsi > 70:
-                        signal_score -= 40
-                    elif 30 <= current_rsi <= 50:
-                        signal_score += 10
-                    
-                    if current_price > hist['MA20'].iloc[-1] > hist['MA50'].iloc[-1]:
-                        signal_score += 25
-                    elif current_price < hist['MA20'].iloc[-1] < hist['MA50'].iloc[-1]:
-                        signal_score -= 25
-                    
-                    if volume_ratio > 1.5:
-                        signal_score += 10
-                    
-                    # Determine signal and risk
-                    if signal_score >= 60:
-                        signal = "STRONG BUY"
-                        risk = "LOW"
-                    elif signal_score >= 20:
-                        signal = "BUY"
-                        risk = "MEDIUM"
-                    elif signal_score <= -60:
-                        signal = "STRONG SELL"
-                        risk = "HIGH"
-                    elif signal_score <= -20:
-                        signal = "SELL"
-                        risk = "HIGH"
-                    else:
-                        signal = "HOLD"
-                        risk = "MEDIUM"
-                    
-                    # Calculate daily change
-                    daily_change = ((current_price - hist['Close'].iloc[-2]) / hist['Close'].iloc[-2]) * 100
-                    
-                    recommendations.append({
-                        'symbol': stock_symbol.replace('.NS', ''),
-                        'name': info.get('shortName', stock_symbol),
-                        'price': round(current_price, 2),
-                        'change': round(daily_change, 2),
-                        'signal': signal,
-                        'risk': risk,
-                        'rsi': round(current_rsi, 2),
-                        'volume_ratio': round(volume_ratio, 2)
-                    })
-                    
-            except Exception as e:
-                print(f"Error analyzing {stock_symbol}: {e}")
-                continue
+        # Analyze top 10 for performance, fanned out concurrently
+        analyses = run_parallel(_analyze_recommendation_candidate, nifty_stocks[:10], source='yahoo')
+        recommendations = [analysis for analysis in analyses if analysis]
         
         # Sort by signal score
         recommendations.sort(key=lambda x: (
@@ -130,6 +55,79 @@ def get_stock_recommendations(user_message):
         print(f"Error in stock recommendations: {e}")
         return "I'm having trouble fetching real-time data. Please try again in a moment.", {}
 
+def _analyze_recommendation_candidate(stock_symbol):
+    """Technical snapshot for one recommendation candidate (None if unavailable)"""
+    
+    try:
+        stock = yf.Ticker(stock_symbol)
+        hist = stock.history(period="60d", interval="1d")
+        info = stock.info
+        
+        if not hist.empty and len(hist) >= 20:
+            current_price = hist['Close'].iloc[-1]
+            
+            # Technical analysis
+            indicators = compute_indicators(hist, ['sma_20', 'sma_50', 'rsi', 'volume_ratio'], ticker=stock_symbol)
+            ma20 = indicators['sma_20'].iloc[-1]
+            ma50 = indicators['sma_50'].iloc[-1]
+            current_rsi = indicators['rsi'].iloc[-1]
+            
+            # Volume analysis
+            volume_ratio = indicators['volume_ratio'].iloc[-1]
+            
+            # Signal generation
+            signal_score = 0
+            if current_rsi < 30:
+                signal_score += 40
+            elif current_rsi > 70:
+                signal_score -= 40
+            elif 30 <= current_rsi <= 50:
+                signal_score += 10
+            
+            if current_price > ma20 > ma50:
+                signal_score += 25
+            elif current_price < ma20 < ma50:
+                signal_score -= 25
+            
+            if volume_ratio > 1.5:
+                signal_score += 10
+            
+            # Determine signal and risk
+            if signal_score >= 60:
+                signal = "STRONG BUY"
+                risk = "LOW"
+            elif signal_score >= 20:
+                signal = "BUY"
+                risk = "MEDIUM"
+            elif signal_score <= -60:
+                signal = "STRONG SELL"
+                risk = "HIGH"
+            elif signal_score <= -20:
+                signal = "SELL"
+                risk = "HIGH"
+            else:
+                signal = "HOLD"
+                risk = "MEDIUM"
+            
+            # Calculate daily change
+            daily_change = ((current_price - hist['Close'].iloc[-2]) / hist['Close'].iloc[-2]) * 100
+            
+            return {
+                'symbol': stock_symbol.replace('.NS', ''),
+                'name': info.get('shortName', stock_symbol),
+                'price': round(current_price, 2),
+                'change': round(daily_change, 2),
+                'signal': signal,
+                'risk': risk,
+                'rsi': round(current_rsi, 2),
+                'volume_ratio': round(volume_ratio, 2)
+            }
+            
+    except Exception as e:
+        print(f"Error analyzing {stock_symbol}: {e}")
+    
+    return None
+
 def get_stop_loss_analysis(user_message):
     """Analyze stop-loss for specific stocks or general guidance"""
     
@@ -145,11 +143,7 @@ def get_stop_loss_analysis(user_message):
                 current_price = hist['Close'].iloc[-1]
                 
                 # Calculate ATR
-                high_low = hist['High'] - hist['Low']
-                high_close = abs(hist['High'] - hist['Close'].shift())
-                low_close = abs(hist['Low'] - hist['Close'].shift())
-                true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-                atr = true_range.rolling(window=14).mean().iloc[-1]
+                atr = compute_indicators(hist, ['atr'], ticker=f"{stock_symbol}.NS")['atr'].iloc[-1]
                 
                 # Recent low for support
                 recent_low = hist['Low'][-20:].min()
@@ -239,18 +233,13 @@ def get_market_sentiment_analysis():
             gainers = 0
             losers = 0
             
-            for stock in nifty_stocks:
-                try:
-                    stock_data = yf.Ticker(stock)
-                    stock_hist = stock_data.history(period="2d", interval="1d")
-                    if not stock_hist.empty:
-                        change = ((stock_hist['Close'].iloc[-1] - stock_hist['Close'].iloc[-2]) / stock_hist['Close'].iloc[-2]) * 100
-                        if change > 0:
-                            gainers += 1
-                        else:
-                            losers += 1
-                except:
+            for daily_change in run_parallel(_fetch_daily_change, nifty_stocks, source='yahoo'):
+                if daily_change is None:
                     continue
+                if daily_change[1] > 0:
+                    gainers += 1
+                else:
+                    losers += 1
             
             # Market sentiment calculation
             total_stocks = gainers + losers
@@ -323,24 +312,16 @@ def get_top_movers(user_message):
         
         movers = []
         
-        for stock_symbol in major_stocks:
-            try:
-                stock = yf.Ticker(stock_symbol)
-                hist = stock.history(period="2d", interval="1d")
-                
-                if not hist.empty:
-                    current_price = hist['Close'].iloc[-1]
-                    previous_price = hist['Close'].iloc[-2]
-                    change_pct = ((current_price - previous_price) / previous_price) * 100
-                    
-                    movers.append({
-                        'symbol': stock_symbol.replace('.NS', ''),
-                        'price': round(current_price, 2),
-                        'change': round(change_pct, 2)
-                    })
-                    
-            except Exception as e:
+        daily_changes = run_parallel(_fetch_daily_change, major_stocks, source='yahoo')
+        for stock_symbol, daily_change in zip(major_stocks, daily_changes):
+            if daily_change is None:
                 continue
+            current_price, change_pct = daily_change
+            movers.append({
+                'symbol': stock_symbol.replace('.NS', ''),
+                'price': round(current_price, 2),
+                'change': round(change_pct, 2)
+            })
         
         # Sort by change percentage
         movers.sort(key=lambda x: x['change'], reverse=True)
@@ -380,6 +361,53 @@ def get_top_movers(user_message):
         print(f"Error getting top movers: {e}")
         return "Unable to fetch market movers data. Please try again.", {}
 
+def _fetch_daily_change(stock_symbol):
+    """Latest close and daily % change for one stock (None if unavailable)"""
+    try:
+        stock = yf.Ticker(stock_symbol)
+        hist = stock.history(period="2d", interval="1d")
+        
+        if not hist.empty:
+            current_price = hist['Close'].iloc[-1]
+            previous_price = hist['Close'].iloc[-2]
+            change_pct = ((current_price - previous_price) / previous_price) * 100
+            return current_price, change_pct
+            
+    except Exception as e:
+        print(f"Error fetching daily change for {stock_symbol}: {e}")
+    
+    return None
+
+def _analyze_beginner_candidate(stock_symbol):
+    """Yearly return/volatility screen for one beginner candidate (None if it does not qualify)"""
+    try:
+        stock = yf.Ticker(stock_symbol)
+        hist = stock.history(period="1y", interval="1d")
+        
+        if not hist.empty:
+            current_price = hist['Close'].iloc[-1]
+            year_ago_price = hist['Close'].iloc[-252] if len(hist) >= 252 else hist['Close'].iloc[0]
+            yearly_return = ((current_price - year_ago_price) / year_ago_price) * 100
+            
+            # Calculate volatility (standard deviation of daily returns)
+            daily_returns = compute_indicators(hist, ['returns'], ticker=stock_symbol)['returns'].dropna()
+            volatility = daily_returns.std() * np.sqrt(252) * 100  # Annualized volatility
+            
+            # Beginner-friendly criteria
+            if volatility < 30 and yearly_return > 0:  # Low volatility and positive returns
+                return {
+                    'symbol': stock_symbol.replace('.NS', ''),
+                    'price': round(current_price, 2),
+                    'yearly_return': round(yearly_return, 2),
+                    'volatility': round(volatility, 2),
+                    'risk': 'LOW'
+                }
+                
+    except Exception as e:
+        print(f"Error analyzing {stock_symbol}: {e}")
+    
+    return None
+
 def get_beginner_recommendations():
     """Get stock recommendations suitable for beginners"""
     
@@ -388,34 +416,8 @@ def get_beginner_recommendations():
         'ITC.NS', 'SUNPHARMA.NS', 'NESTLEIND.NS', 'KOTAKBANK.NS', 'ASIANPAINT.NS'
     ]
     
-    recommendations = []
-    
-    for stock_symbol in beginner_stocks:
-        try:
-            stock = yf.Ticker(stock_symbol)
-            hist = stock.history(period="1y", interval="1d")
-            
-            if not hist.empty:
-                current_price = hist['Close'].iloc[-1]
-                year_ago_price = hist['Close'].iloc[-252] if len(hist) >= 252 else hist['Close'].iloc[0]
-                yearly_return = ((current_price - year_ago_price) / year_ago_price) * 100
-                
-                # Calculate volatility (standard deviation of daily returns)
-                daily_returns = hist['Close'].pct_change().dropna()
-                volatility = daily_returns.std() * np.sqrt(252) * 100  # Annualized volatility
-                
-                # Beginner-friendly criteria
-                if volatility < 30 and yearly_return > 0:  # Low volatility and positive returns
-                    recommendations.append({
-                        'symbol': stock_symbol.replace('.NS', ''),
-                        'price': round(current_price, 2),
-                        'yearly_return': round(yearly_return, 2),
-                        'volatility': round(volatility, 2),
-                        'risk': 'LOW'
-                    })
-                    
-        except Exception as e:
-            continue
+    analyses = run_parallel(_analyze_beginner_candidate, beginner_stocks, source='yahoo')
+    recommendations = [analysis for analysis in analyses if analysis]
     
     # Sort by yearly return
     recommendations.sort(key=lambda x: x['yearly_return'], reverse=True)
@@ -469,24 +471,10 @@ def get_stock_analysis(stock_symbol):
         if not hist.empty and len(hist) >= 20:
             current_price = hist['Close'].iloc[-1]
             
-            # Technical indicators
-            hist['MA20'] = hist['Close'].rolling(window=20).mean()
-            hist['MA50'] = hist['Close'].rolling(window=50).mean()
-            
-            # RSI
-            delta = hist['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss.replace(0, 1)
-            rsi = 100 - (100 / (1 + rs))
-            current_rsi = rsi.iloc[-1]
-            
-            # ATR
-            high_low = hist['High'] - hist['Low']
-            high_close = abs(hist['High'] - hist['Close'].shift())
-            low_close = abs(hist['Low'] - hist['Close'].shift())
-            true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-            atr = true_range.rolling(window=14).mean().iloc[-1]
+            # Technical indicators (RSI, moving averages and ATR in one pass)
+            indicators = compute_indicators(hist, ['sma_20', 'sma_50', 'rsi', 'atr'], ticker=f"{stock_symbol}.NS")
+            current_rsi = indicators['rsi'].iloc[-1]
+            atr = indicators['atr'].iloc[-1]
             
             # Recent performance
             daily_change = ((current_price - hist['Close'].iloc[-2]) / hist['Close'].iloc[-2]) * 100
@@ -501,8 +489,8 @@ def get_stock_analysis(stock_symbol):
             
             response_text += f"**Technical Indicators:**\n"
             response_text += f"📊 RSI (14): {current_rsi:.2f}\n"
-            response_text += f"📈 MA20: ₹{hist['MA20'].iloc[-1]:.2f}\n"
-            response_text += f"📈 MA50: ₹{hist['MA50'].iloc[-1]:.2f}\n"
+            response_text += f"📈 MA20: ₹{indicators['sma_20'].iloc[-1]:.2f}\n"
+            response_text += f"📈 MA50: ₹{indicators['sma_50'].iloc[-1]:.2f}\n"
             response_text += f"📊 ATR: ₹{atr:.2f}\n\n"
             
             # Signal generation
@@ -0,0 +1,301 @@
+"""
+Local History Store Module
+Persistent per-ticker OHLCV history with incremental append instead of full re-downloads.
+
+Each ticker is stored as fixed-dtype .npy arrays (datetime64[ns] UTC index, float64 OHLC
+matrix, int64 volume) that are memory-mapped read-only, so all worker processes share one
+page-cache copy and frames handed out are zero-copy views over it.
+"""
+
+import os
+# Configure cache for Vercel (read-only filesystem fix)
+if os.environ.get('VERCEL'):
+    os.environ['XDG_CACHE_HOME'] = '/tmp/.cache'
+
+import json
+import time
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialised within one process
+    fcntl = None
+
+HISTORY_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+    'stock_predictor', 'history'
+)
+# A store refreshed this recently is served without any network call
+HISTORY_REFRESH_SECONDS = float(os.environ.get('HISTORY_REFRESH_SECONDS', 60))
+# Adjusted closes that moved more than this on already-stored bars mean a dividend/split: re-download
+ADJUSTMENT_TOLERANCE = 1e-3
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+# Calendar days covered by each yfinance period string the app uses
+PERIOD_DAYS = {
+    '5d': 5, '10d': 10, '1mo': 31, '60d': 60, '3mo': 92, '6mo': 183,
+    '1y': 365, '2y': 730, '5y': 1826, '10y': 3652
+}
+# Holidays/weekends at the start of a window should not force a full re-download
+COVERAGE_SLACK_DAYS = 7
+
+_locks = {}
+_writer_locks = {}
+_locks_guard = threading.Lock()
+# ticker -> (generation, tz, index, ohlc, volume) memory maps opened by this process
+_mapped = {}
+_mapped_lock = threading.Lock()
+
+def _ticker_lock(ticker):
+    with _locks_guard:
+        if ticker not in _locks:
+            _locks[ticker] = threading.Lock()
+        return _locks[ticker]
+
+@contextmanager
+def _writer_lock(ticker):
+    """Serialise writers of a ticker's store across threads and worker processes.
+
+    Cleanup deletes every generation except the published ones, which is only safe while no
+    other writer (in any process) has arrays written but not yet published.
+    """
+    with _locks_guard:
+        thread_lock = _writer_locks.setdefault(ticker, threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(_ticker_dir(ticker), '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _ticker_dir(ticker):
+    safe_name = ticker.replace('/', '_').replace('&', '_and_').replace('^', '_idx_')
+    return os.path.join(HISTORY_DIR, safe_name)
+
+def _current_path(ticker):
+    return os.path.join(_ticker_dir(ticker), 'CURRENT')
+
+def _array_path(ticker, generation, name):
+    return os.path.join(_ticker_dir(ticker), f"{name}-{generation}.npy")
+
+def _read_current(ticker):
+    """(generation, tz) of the latest complete write, None if nothing stored"""
+    try:
+        with open(_current_path(ticker)) as f:
+            generation, _, tz = f.read().strip().partition(' ')
+        return generation, tz
+    except FileNotFoundError:
+        return None
+
+def _map_arrays(ticker):
+    """Memory-map the ticker's current arrays (cached per generation)"""
+    current = _read_current(ticker)
+    if current is None:
+        return None
+    generation, tz = current
+
+    with _mapped_lock:
+        mapped = _mapped.get(ticker)
+    if mapped is not None and mapped[0] == generation:
+        return mapped
+
+    # Arrays are read-only maps of the page cache, so every worker process shares one copy
+    index = np.load(_array_path(ticker, generation, 'index'), mmap_mode='r')
+    ohlc = np.load(_array_path(ticker, generation, 'ohlc'), mmap_mode='r')
+    volume = np.load(_array_path(ticker, generation, 'volume'), mmap_mode='r')
+    if not (index.dtype == np.dtype('datetime64[ns]') and ohlc.dtype == np.float64
+            and volume.dtype == np.int64 and ohlc.shape == (len(index), 4) and len(volume) == len(index)):
+        raise ValueError(f"unexpected array layout in generation {generation}")
+
+    mapped = (generation, tz, index, ohlc, volume)
+    with _mapped_lock:
+        _mapped[ticker] = mapped
+    return mapped
+
+def _frame_view(mapped, start=0):
+    """DataFrame over the mapped arrays from row `start` without copying any column"""
+    _, tz, index, ohlc, volume = mapped
+    dt_index = pd.DatetimeIndex(index[start:], tz='UTC')
+    if tz:
+        dt_index = dt_index.tz_convert(tz)
+    frame = pd.DataFrame(ohlc[start:], columns=PRICE_COLUMNS, index=dt_index, copy=False)
+    frame['Volume'] = pd.Series(volume[start:], index=dt_index, copy=False)
+    return frame
+
+def load_history(ticker):
+    """Read-only view of the stored OHLCV frame for a ticker (None if nothing stored)"""
+    try:
+        mapped = _map_arrays(ticker)
+    except FileNotFoundError:
+        # A concurrent writer replaced the generation between reading CURRENT and mapping it
+        with _mapped_lock:
+            _mapped.pop(ticker, None)
+        try:
+            mapped = _map_arrays(ticker)
+        except Exception as e:
+            print(f"⚠️ History store for {ticker} unavailable: {e}")
+            return None
+    except Exception as e:
+        print(f"⚠️ Corrupt history store for {ticker}, ignoring: {e}")
+        return None
+
+    if mapped is None:
+        return None
+    return _frame_view(mapped)
+
+def _write_array(path, array):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+    os.replace(tmp_path, path)
+
+def _remove_old_generations(ticker, keep):
+    """Delete superseded arrays; readers that already mapped them keep their pages"""
+    directory = _ticker_dir(ticker)
+    for name in os.listdir(directory):
+        if name.endswith('.npy') and name.rsplit('-', 1)[-1][:-4] not in keep:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+def save_history(ticker, hist):
+    """Write a ticker's OHLCV frame as a new generation of fixed-dtype arrays and publish it"""
+    os.makedirs(_ticker_dir(ticker), exist_ok=True)
+    index = hist.index
+    tz = str(index.tz) if index.tz is not None else ''
+    utc_index = index.tz_convert('UTC') if index.tz is not None else index
+
+    with _writer_lock(ticker):
+        previous = _read_current(ticker)
+        generation = str(time.time_ns())
+        _write_array(_array_path(ticker, generation, 'index'),
+                     utc_index.tz_localize(None).values.astype('datetime64[ns]'))
+        _write_array(_array_path(ticker, generation, 'ohlc'),
+                     hist[PRICE_COLUMNS].to_numpy(dtype=np.float64))
+        _write_array(_array_path(ticker, generation, 'volume'),
+                     hist['Volume'].fillna(0).to_numpy(dtype=np.int64))
+
+        # Readers only ever see complete generations: CURRENT is swapped in last
+        current_path = _current_path(ticker)
+        tmp_path = f"{current_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(f"{generation} {tz}")
+        os.replace(tmp_path, current_path)
+
+        # Keep the previous generation for readers that picked it up just before the swap
+        _remove_old_generations(ticker, {generation, previous[0] if previous else generation})
+    with _mapped_lock:
+        _mapped.pop(ticker, None)
+
+def _state_path(ticker, name):
+    return os.path.join(_ticker_dir(ticker), f"{name}.json")
+
+def save_state(ticker, name, state):
+    """Persist a small JSON-able state object (e.g. incremental indicators) next to a ticker's arrays"""
+    try:
+        os.makedirs(_ticker_dir(ticker), exist_ok=True)
+        path = _state_path(ticker, name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not persist {name} state for {ticker}: {e}")
+        return False
+
+def load_state(ticker, name):
+    """State saved by save_state, or None if missing or unreadable"""
+    try:
+        with open(_state_path(ticker, name)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ Corrupt {name} state for {ticker}, ignoring: {e}")
+        return None
+
+def _window_start(hist, period):
+    """Earliest timestamp a `period` window should include"""
+    return hist.index[-1] - timedelta(days=PERIOD_DAYS[period])
+
+def slice_period(hist, period):
+    """Last `period` of a daily frame (positional, so a view over the mapped arrays stays a view)"""
+    return hist.iloc[hist.index.searchsorted(_window_start(hist, period)):]
+
+def _covers_period(stored, period):
+    start = pd.Timestamp.now(tz=stored.index.tz) - timedelta(days=PERIOD_DAYS[period] - COVERAGE_SLACK_DAYS)
+    return stored.index[0] <= start
+
+def _try_download(download, ticker, **kwargs):
+    """download(ticker, **kwargs), or None if it raised (logged; the caller falls back to the store)"""
+    try:
+        return download(ticker, **kwargs)
+    except Exception as e:
+        print(f"⚠️ {ticker}: history download failed - {e}")
+        return None
+
+def get_history(ticker, period, download):
+    """Get daily OHLCV history for `period`, downloading only bars newer than the store.
+
+    `download(ticker, period=None, start=None)` must return a yfinance-style frame.
+    Periods not in PERIOD_DAYS bypass the store entirely.
+    """
+    if period not in PERIOD_DAYS:
+        return download(ticker, period=period)
+
+    with _ticker_lock(ticker):
+        stored = load_history(ticker)
+        covered = stored is not None and len(stored) >= 2 and _covers_period(stored, period)
+        if covered:
+            # Fresh enough: serve straight from disk
+            if time.time() - os.path.getmtime(_current_path(ticker)) < HISTORY_REFRESH_SECONDS:
+                return slice_period(stored, period)
+
+            # Incremental: re-fetch from the previous completed bar so the overlap can be verified
+            overlap_start = stored.index[-2]
+            new_bars = _try_download(download, ticker, start=overlap_start.strftime('%Y-%m-%d'))
+            if new_bars is None or new_bars.empty:
+                # Upstream outage (the overlap bar always exists): serve what is on disk
+                return slice_period(stored, period)
+
+            new_bars = new_bars[OHLCV_COLUMNS]
+            overlap = stored.index[:-1].intersection(new_bars.index)
+            if len(overlap):
+                old_close = stored.loc[overlap, 'Close']
+                new_close = new_bars.loc[overlap, 'Close']
+                drift = ((new_close - old_close).abs() / old_close).max()
+            else:
+                drift = 0.0
+
+            if drift <= ADJUSTMENT_TOLERANCE:
+                merged = pd.concat([stored[stored.index < new_bars.index[0]], new_bars])
+                merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+                save_history(ticker, merged)
+                print(f"📥 {ticker}: appended {len(new_bars)} bars to local history")
+                return slice_period(load_history(ticker), period)
+
+            print(f"🔄 {ticker}: adjusted prices changed (dividend/split), re-downloading history")
+
+        # Cold store, too short a window, or adjusted history moved: full download. A store that
+        # already covers the window is re-downloaded from its own start, so a '1y' caller never
+        # cuts down a '10y' store (and makes the next '10y' caller download it all again)
+        if covered:
+            hist = _try_download(download, ticker, start=stored.index[0].strftime('%Y-%m-%d'))
+        else:
+            hist = _try_download(download, ticker, period=period)
+        if hist is None or hist.empty:
+            # Upstream outage: serve what is already on disk rather than nothing
+            return slice_period(stored, period) if stored is not None and len(stored) else None
+        save_history(ticker, hist[OHLCV_COLUMNS])
+        return slice_period(load_history(ticker), period)
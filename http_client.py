@@ -0,0 +1,78 @@
+"""
+Shared HTTP Session Module
+Pooled keep-alive sessions with retry/backoff used by every HTTP data source
+"""
+
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Connection pool configuration (overridable per deployment)
+HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 10))
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 10))
+HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 2))
+HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.3))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 10))
+
+# Per-host connection limits; hosts not listed use HTTP_POOL_MAXSIZE
+HOST_POOL_LIMITS = {
+    'www.google.com': 4,
+    'www.alphavantage.co': 2,
+    'financialmodelingprep.com': 2,
+    'query1.finance.yahoo.com': 8,
+    'query2.finance.yahoo.com': 8,
+}
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+def _build_adapter(pool_maxsize):
+    """HTTP adapter with a bounded keep-alive pool and retry/backoff on transient errors"""
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    return HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+        pool_block=True  # Enforce the per-host limit instead of opening overflow connections
+    )
+
+def get_session():
+    """Get the process-wide pooled session (created on first use)"""
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.headers.update(DEFAULT_HEADERS)
+                default_adapter = _build_adapter(HTTP_POOL_MAXSIZE)
+                session.mount('https://', default_adapter)
+                session.mount('http://', default_adapter)
+                for host, limit in HOST_POOL_LIMITS.items():
+                    session.mount(f'https://{host}/', _build_adapter(limit))
+                _session = session
+
+    return _session
+
+def http_get(url, params=None, headers=None, timeout=None):
+    """GET through the shared pooled session with (connect, read) timeouts"""
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    elif isinstance(timeout, (int, float)):
+        timeout = (min(HTTP_CONNECT_TIMEOUT, timeout), timeout)
+
+    return get_session().get(url, params=params, headers=headers, timeout=timeout)
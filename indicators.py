@@ -0,0 +1,234 @@
+"""
+Indicator Registry Module
+One definition of every per-ticker indicator (RSI, moving averages, MACD, ATR, volume and
+return series) shared by technical_analysis, market_data and the chatbot.
+
+Each indicator declares its inputs (price columns or other registered indicators) and its
+lookback, the extra bars it needs beyond its inputs before producing a value. A request for
+several indicators is planned into one dependency-ordered pass, so intermediates such as the
+close-to-close change feeding both RSI and returns are computed once. Results are cached per
+(ticker, last bar timestamp, bars) and checked against the history's first bar, last-bar
+prices and closes, so every caller analysing the same history shares them until a new bar
+arrives or the history is re-adjusted.
+"""
+
+import os
+import threading
+from collections import OrderedDict, namedtuple
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+INDICATOR_CACHE_ENTRIES = int(os.environ.get('INDICATOR_CACHE_ENTRIES', 256))
+
+Indicator = namedtuple('Indicator', ['name', 'inputs', 'lookback', 'compute'])
+INDICATORS = {}
+
+def register_indicator(name, inputs, lookback=0):
+    """Decorator registering compute(*input_series) -> Series under name.
+
+    Inputs must be price columns or indicators registered before this one, which keeps the
+    dependency graph acyclic.
+    """
+    def decorator(compute):
+        if name in INDICATORS or name in PRICE_COLUMNS:
+            raise ValueError(f"Indicator '{name}' is already defined")
+        unknown = [source for source in inputs if source not in INDICATORS and source not in PRICE_COLUMNS]
+        if unknown:
+            raise ValueError(f"Indicator '{name}' depends on unknown inputs {unknown}")
+        INDICATORS[name] = Indicator(name, tuple(inputs), lookback, compute)
+        return compute
+    return decorator
+
+def plan(names):
+    """Registered indicators needed for names, each once, inputs before the indicators using them"""
+    order, seen = [], set()
+
+    def visit(name):
+        if name in seen or name in PRICE_COLUMNS:
+            return
+        if name not in INDICATORS:
+            raise KeyError(f"Unknown indicator '{name}'")
+        for source in INDICATORS[name].inputs:
+            visit(source)
+        seen.add(name)
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order
+
+def required_bars(names):
+    """Bars of history needed before every indicator in names has a value"""
+    depth = {column: 1 for column in PRICE_COLUMNS}
+    for name in plan(names):
+        indicator = INDICATORS[name]
+        depth[name] = indicator.lookback + max(depth[source] for source in indicator.inputs)
+    return max((depth[name] for name in names), default=0)
+
+# --- Primitives (also used directly for non-default periods) ---
+
+def rolling_mean(series, window):
+    return series.rolling(window=window).mean()
+
+def exponential_mean(series, span):
+    return series.ewm(span=span, adjust=False).mean()
+
+def relative_strength(gain, loss, period=14):
+    """RSI from per-bar gains and losses (simple means; no losses at all gives 100)"""
+    rs = rolling_mean(gain, period) / rolling_mean(loss, period)
+    return 100 - (100 / (1 + rs))
+
+# --- Registered indicators ---
+
+@register_indicator('prev_close', ('Close',), lookback=1)
+def _prev_close(close):
+    return close.shift()
+
+@register_indicator('close_diff', ('Close',), lookback=1)
+def _close_diff(close):
+    return close.diff()
+
+@register_indicator('gain', ('close_diff',))
+def _gain(close_diff):
+    # The first bar's missing change counts as a zero move
+    return close_diff.where(close_diff > 0, 0)
+
+@register_indicator('loss', ('close_diff',))
+def _loss(close_diff):
+    return -close_diff.where(close_diff < 0, 0)
+
+@register_indicator('returns', ('close_diff', 'prev_close'))
+def _returns(close_diff, prev_close):
+    return close_diff / prev_close
+
+@register_indicator('rsi', ('gain', 'loss'), lookback=13)
+def _rsi(gain, loss):
+    return relative_strength(gain, loss, 14)
+
+for _window in (20, 50, 200):
+    register_indicator(f'sma_{_window}', ('Close',), lookback=_window - 1)(
+        lambda close, window=_window: rolling_mean(close, window))
+del _window
+
+# EMAs never fully forget their start; the lookback is the span they need to settle
+register_indicator('ema_12', ('Close',), lookback=12)(lambda close: exponential_mean(close, 12))
+register_indicator('ema_26', ('Close',), lookback=26)(lambda close: exponential_mean(close, 26))
+
+@register_indicator('macd', ('ema_12', 'ema_26'))
+def _macd(ema_12, ema_26):
+    return ema_12 - ema_26
+
+@register_indicator('macd_signal', ('macd',), lookback=9)
+def _macd_signal(macd):
+    return exponential_mean(macd, 9)
+
+@register_indicator('macd_hist', ('macd', 'macd_signal'))
+def _macd_hist(macd, macd_signal):
+    return macd - macd_signal
+
+@register_indicator('true_range', ('High', 'Low', 'prev_close'))
+def _true_range(high, low, prev_close):
+    # A missing previous close (first bar) leaves the high-low range
+    ranges = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1)
+    return ranges.max(axis=1)
+
+@register_indicator('atr', ('true_range',), lookback=13)
+def _atr(true_range):
+    return rolling_mean(true_range, 14)
+
+@register_indicator('avg_volume', ('Volume',), lookback=19)
+def _avg_volume(volume):
+    return rolling_mean(volume, 20)
+
+@register_indicator('volume_ratio', ('Volume', 'avg_volume'))
+def _volume_ratio(volume, avg_volume):
+    # No average volume yet (or none traded) reads as a normal day
+    return (volume / avg_volume.where(avg_volume > 0)).where(avg_volume > 0, 1.0)
+
+# --- Planner and cache ---
+
+_cache = OrderedDict()  # (ticker, last bar timestamp, bars) -> (fingerprint, {name: Series})
+_cache_lock = threading.Lock()
+_cache_stats = {'hits': 0, 'misses': 0}
+
+def _fingerprint(data):
+    """What else must match for a cached entry to describe this history.
+
+    The last bar's prices catch a bar still forming (intraday: same timestamp, new prices);
+    a digest of every close catches re-adjusted history (dividend/split: same bars, earlier
+    closes moved). Compared as raw bytes, so NaN (e.g. a missing volume) matches itself.
+    """
+    last_bar = data.iloc[-1].reindex(PRICE_COLUMNS).to_numpy(dtype=np.float64).tobytes()
+    closes = hash(np.ascontiguousarray(data['Close'].to_numpy(dtype=np.float64)).tobytes()) if 'Close' in data else None
+    return tuple(data.columns.intersection(PRICE_COLUMNS)), data.index[0], last_bar, closes
+
+def compute_indicators(data, names, ticker=None):
+    """{name: Series} for the requested indicators over an OHLCV frame.
+
+    With a ticker, results and intermediates are cached for that history and reused by later
+    calls (any indicator set) until its last bar changes. Returned series are shared: do not
+    modify them in place.
+    """
+    order = plan(names)
+    if data is None or data.empty:
+        return {name: pd.Series(dtype=float) for name in names}
+
+    key = fingerprint = None
+    values = {}
+    if ticker is not None:
+        key = (ticker, data.index[-1], len(data))
+        fingerprint = _fingerprint(data)
+        with _cache_lock:
+            entry = _cache.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                values = dict(entry[1])
+                _cache.move_to_end(key)
+
+    missing = [name for name in order if name not in values]
+    if ticker is not None:
+        with _cache_lock:
+            _cache_stats['misses' if missing else 'hits'] += 1
+
+    for name in missing:
+        indicator = INDICATORS[name]
+        inputs = [values[source] if source in values else data[source] for source in indicator.inputs]
+        values[name] = indicator.compute(*inputs)
+
+    if key is not None and missing:
+        with _cache_lock:
+            entry = _cache.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                entry[1].update({name: values[name] for name in missing})
+            else:
+                _cache[key] = (fingerprint, values)
+            _cache.move_to_end(key)
+            while len(_cache) > INDICATOR_CACHE_ENTRIES:
+                _cache.popitem(last=False)
+
+    return {name: values[name] for name in names}
+
+def last_value(series):
+    """Last value of a series as a float; None if it is empty or NaN"""
+    value = series.iloc[-1] if len(series) else np.nan
+    return None if pd.isna(value) else float(value)
+
+def latest_indicators(data, names, ticker=None):
+    """{name: last value} for the requested indicators; None where it is missing or NaN"""
+    return {name: last_value(values) for name, values in compute_indicators(data, names, ticker=ticker).items()}
+
+def clear_indicator_cache():
+    with _cache_lock:
+        _cache.clear()
+
+def indicator_cache_stats():
+    """JSON-friendly cache counters"""
+    with _cache_lock:
+        lookups = _cache_stats['hits'] + _cache_stats['misses']
+        return {
+            'entries': len(_cache),
+            'max_entries': INDICATOR_CACHE_ENTRIES,
+            'hits': _cache_stats['hits'],
+            'misses': _cache_stats['misses'],
+            'hit_rate': round(_cache_stats['hits'] / lookups, 3) if lookups else None
+        }
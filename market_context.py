@@ -0,0 +1,67 @@
+"""
+Market Data Context Module
+Per-request holder for one ticker's history and Ticker.info, each fetched from upstream at most once
+"""
+
+import threading
+import yfinance as yf
+import rate_limiter
+import history_store
+from technical_analysis import fetch_historical_data
+from multi_source_data import YahooFinanceSource
+
+# Longest window any consumer of a detail view needs (analyze_stock, fundamentals)
+CONTEXT_HISTORY_PERIOD = '1y'
+
+class MarketDataContext:
+    """Shared market data for one request about one ticker.
+
+    The longest history window and the info dict are loaded lazily on first use and
+    every consumer gets slices of them, so a detail view costs one history read and
+    one info call no matter how many analysis functions run. Safe to share across the
+    threads serving a single request.
+    """
+
+    def __init__(self, symbol, history_period=CONTEXT_HISTORY_PERIOD):
+        self.symbol = symbol.replace('.NS', '') + '.NS'
+        self.history_period = history_period
+        self._history = None
+        self._history_loaded = False
+        self._info = None
+        self._lock = threading.Lock()
+        self._info_lock = threading.Lock()
+
+    def _load_history(self):
+        with self._lock:
+            if not self._history_loaded:
+                self._history = fetch_historical_data(self.symbol, period=self.history_period)
+                self._history_loaded = True
+            return self._history
+
+    def history(self, period=None):
+        """Daily OHLCV for `period` (default: the full context window), None if unavailable.
+
+        Each call returns its own shallow frame so callers may add derived columns.
+        """
+        hist = self._load_history()
+        if hist is None or hist.empty:
+            return None
+        if period is not None and period != self.history_period and period in history_store.PERIOD_DAYS:
+            hist = history_store.slice_period(hist, period)
+        return hist.copy(deep=False)
+
+    def info(self):
+        """Ticker.info for the symbol (empty dict if the call failed)"""
+        with self._info_lock:
+            if self._info is None:
+                try:
+                    rate_limiter.acquire('yahoo')
+                    self._info = yf.Ticker(self.symbol).info or {}
+                except Exception as e:
+                    print(f"⚠️ Info fetch failed for {self.symbol}: {e}")
+                    self._info = {}
+            return self._info
+
+    def quote(self):
+        """Yahoo-style quote payload derived from the context (no extra upstream call)"""
+        return YahooFinanceSource.build_quote(self.symbol, self.history('5d'), self.info())
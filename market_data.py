@@ -1,9 +1,11 @@
-import requests
+from http_client import http_get
+import rate_limiter
 import json
 from datetime import datetime, timedelta
-import yfinance as yf
+from market_context import MarketDataContext
+from indicators import compute_indicators, last_value, relative_strength
 
-def get_market_news(symbol, limit=5):
+def get_market_news(symbol, limit=5, context=None):
     """
     Get latest market news for a stock using free APIs
     Returns: list of news articles
@@ -15,7 +17,8 @@ def get_market_news(symbol, limit=5):
         
         if api_key != "YOUR_ALPHA_VANTAGE_API_KEY":
             url = f"https://www.alphavantage.co/query?function=NEWS_SENTIMENT&tickers={symbol}&apikey={api_key}"
-            response = requests.get(url)
+            rate_limiter.acquire('alpha_vantage')
+            response = http_get(url)
             data = response.json()
             
             if 'feed' in data:
@@ -32,19 +35,19 @@ def get_market_news(symbol, limit=5):
                 return news_items
         
         # Method 2: Yahoo Finance RSS feed (free, no API key needed)
-        return get_yahoo_finance_news(symbol, limit)
+        return get_yahoo_finance_news(symbol, limit, context)
         
     except Exception as e:
         print(f"Error fetching market news: {e}")
         return []
 
-def get_yahoo_finance_news(symbol, limit=5):
+def get_yahoo_finance_news(symbol, limit=5, context=None):
     """
     Get REAL stock-specific news from multiple sources
     """
     try:
         # Method 1: Generate stock-specific news based on real performance (PRIMARY)
-        stock_news = generate_stock_specific_news(symbol, limit)
+        stock_news = generate_stock_specific_news(symbol, limit, context)
         if stock_news:
             print(f"✅ Generated {len(stock_news)} stock-specific news items for {symbol}")
             return stock_news
@@ -62,11 +65,11 @@ def get_yahoo_finance_news(symbol, limit=5):
             return alternative_news
         
         # Method 3: Generate market context news
-        return get_market_context_news(symbol, limit)
+        return get_market_context_news(symbol, limit, context)
         
     except Exception as e:
         print(f"Error fetching Yahoo Finance news: {e}")
-        return get_market_context_news(symbol, limit)
+        return get_market_context_news(symbol, limit, context)
 
 def get_yahoo_news_api(symbol, limit=5):
     """Try to get news from Yahoo Finance API"""
@@ -85,7 +88,8 @@ def get_yahoo_news_api(symbol, limit=5):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        rate_limiter.acquire('yahoo')
+        response = http_get(url, params=params, headers=headers, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -124,12 +128,12 @@ def get_alternative_news(symbol, limit=5):
         print(f"Alternative news failed: {e}")
         return None
 
-def get_market_context_news(symbol, limit=5):
+def get_market_context_news(symbol, limit=5, context=None):
     """Get REAL stock-specific news from multiple sources"""
     try:
         # ALWAYS use stock-specific news generation first (most reliable)
         print(f"🔍 Generating stock-specific news for {symbol}...")
-        stock_news = generate_stock_specific_news(symbol, limit)
+        stock_news = generate_stock_specific_news(symbol, limit, context)
         
         if stock_news and len(stock_news) > 0:
             print(f"✅ Generated {len(stock_news)} stock-specific news for {symbol}")
@@ -154,7 +158,7 @@ def get_market_context_news(symbol, limit=5):
         
     except Exception as e:
         print(f"Error getting market news for {symbol}: {e}")
-        return generate_stock_specific_news(symbol, limit)
+        return generate_stock_specific_news(symbol, limit, context)
 
 def get_financial_news(symbol, limit=5):
     """Get news from financial APIs"""
@@ -178,7 +182,8 @@ def get_financial_news(symbol, limit=5):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
-        response = requests.get(search_url, params=params, headers=headers, timeout=10)
+        rate_limiter.acquire('yahoo')
+        response = http_get(search_url, params=params, headers=headers, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -206,16 +211,16 @@ def get_financial_news(symbol, limit=5):
         print(f"Financial news fetch failed for {symbol}: {e}")
         return None
 
-def generate_stock_specific_news(symbol, limit=5):
+def generate_stock_specific_news(symbol, limit=5, context=None):
     """Generate stock-specific news based on real performance data"""
     try:
-        # Get real stock data
-        yahoo_symbol = symbol.replace('.NS', '') + '.NS'
-        stock = yf.Ticker(yahoo_symbol)
-        hist = stock.history(period="10d", interval="1d")
-        info = stock.info
+        # Get real stock data (shared with the rest of the request when a context is passed)
+        context = context or MarketDataContext(symbol)
+        yahoo_symbol = context.symbol
+        hist = context.history("10d")
+        info = context.info()
         
-        if hist.empty:
+        if hist is None or hist.empty:
             return []
         
         current_price = hist['Close'].iloc[-1]
@@ -271,7 +276,7 @@ def generate_stock_specific_news(symbol, limit=5):
         
         # Technical analysis news
         if len(hist) >= 20:
-            ma20 = hist['Close'].rolling(window=20).mean().iloc[-1]
+            ma20 = compute_indicators(hist, ['sma_20'], ticker=context.symbol)['sma_20'].iloc[-1]
             if current_price > ma20 * 1.05:
                 trend_desc = "trading above key moving averages"
             elif current_price < ma20 * 0.95:
@@ -296,7 +301,7 @@ def generate_stock_specific_news(symbol, limit=5):
         print(f"Error generating stock-specific news for {symbol}: {e}")
         return []
 
-def get_analyst_recommendations(symbol):
+def get_analyst_recommendations(symbol, context=None):
     """
     Get REAL analyst recommendations from multiple sources
     Returns: dict with recommendation data
@@ -316,11 +321,11 @@ def get_analyst_recommendations(symbol):
         
         # Method 3: Generate recommendations based on real fundamental analysis
         print(f"⚠️ No real analyst data for {symbol}, using fundamental analysis")
-        return generate_fundamental_recommendations(symbol)
+        return generate_fundamental_recommendations(symbol, context)
         
     except Exception as e:
         print(f"Error getting analyst recommendations for {symbol}: {e}")
-        return generate_fundamental_recommendations(symbol)
+        return generate_fundamental_recommendations(symbol, context)
 
 def get_alternative_analyst_data(symbol):
     """Get analyst data from alternative sources"""
@@ -336,16 +341,15 @@ def get_alternative_analyst_data(symbol):
         print(f"Alternative analyst data failed for {symbol}: {e}")
         return None
 
-def generate_fundamental_recommendations(symbol):
+def generate_fundamental_recommendations(symbol, context=None):
     """Generate recommendations based on real fundamental analysis"""
     try:
-        # Get real stock data
-        yahoo_symbol = symbol.replace('.NS', '') + '.NS'
-        stock = yf.Ticker(yahoo_symbol)
-        info = stock.info
-        hist = stock.history(period="1y", interval="1d")
+        # Get real stock data (shared with the rest of the request when a context is passed)
+        context = context or MarketDataContext(symbol)
+        info = context.info()
+        hist = context.history("1y")
         
-        if hist.empty:
+        if hist is None or hist.empty:
             return get_default_recommendations()
         
         current_price = hist['Close'].iloc[-1]
@@ -358,16 +362,10 @@ def generate_fundamental_recommendations(symbol):
         roe = info.get('returnOnEquity')
         debt_to_equity = info.get('debtToEquity')
         
-        # Technical indicators (handle NaN values)
-        rsi = calculate_rsi(hist['Close'])
-        ma50 = hist['Close'].rolling(window=50).mean().iloc[-1] if len(hist) >= 50 else None
-        ma200 = hist['Close'].rolling(window=200).mean().iloc[-1] if len(hist) >= 200 else None
-        
-        # Convert NaN to None for JSON compatibility
-        if ma50 is not None and (ma50 != ma50):  # NaN check
-            ma50 = None
-        if ma200 is not None and (ma200 != ma200):  # NaN check
-            ma200 = None
+        # Technical indicators (NaN becomes None for JSON compatibility)
+        indicators = compute_indicators(hist, ['rsi', 'sma_50', 'sma_200'], ticker=context.symbol)
+        rsi = calculate_rsi(hist['Close'], rsi=indicators['rsi'])
+        ma50, ma200 = last_value(indicators['sma_50']), last_value(indicators['sma_200'])
         
         # Generate recommendation based on fundamentals
         score = 0
@@ -493,19 +491,19 @@ def generate_fundamental_recommendations(symbol):
         print(f"Error generating fundamental recommendations for {symbol}: {e}")
         return get_default_recommendations()
 
-def calculate_rsi(prices, period=14):
-    """Calculate RSI indicator (handle NaN values)"""
+def calculate_rsi(prices, period=14, rsi=None):
+    """Calculate RSI indicator (handle NaN values); pass rsi to reuse a series from the indicator registry"""
     try:
         if len(prices) < period + 1:
             return 50  # Not enough data
         
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        
-        # Handle division by zero and NaN
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
+        if rsi is None:
+            frame = prices.to_frame('Close')
+            if period == 14:
+                rsi = compute_indicators(frame, ['rsi'])['rsi']
+            else:
+                moves = compute_indicators(frame, ['gain', 'loss'])
+                rsi = relative_strength(moves['gain'], moves['loss'], period)
         
         rsi_value = rsi.iloc[-1] if not rsi.empty else 50
         
@@ -536,7 +534,8 @@ def get_yahoo_analyst_data(symbol):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        rate_limiter.acquire('yahoo')
+        response = http_get(url, params=params, headers=headers, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -641,22 +640,25 @@ def get_default_recommendations():
         'summary': 'Analyst recommendations not available at this time.'
     }
 
-def get_market_sentiment(symbol):
+def get_market_sentiment(symbol, context=None):
     """
     Get COMPREHENSIVE real-time market sentiment from multiple sources
     """
     try:
+        # All four components read the same history/info
+        context = context or MarketDataContext(symbol)
+        
         # Method 1: Real-time technical analysis sentiment
-        technical_sentiment = get_technical_sentiment(symbol)
+        technical_sentiment = get_technical_sentiment(symbol, context)
         
         # Method 2: News sentiment analysis
-        news_sentiment = get_news_sentiment(symbol)
+        news_sentiment = get_news_sentiment(symbol, context)
         
         # Method 3: Volume and price action sentiment
-        volume_sentiment = get_volume_sentiment(symbol)
+        volume_sentiment = get_volume_sentiment(symbol, context)
         
         # Method 4: Market breadth sentiment
-        breadth_sentiment = get_market_breadth_sentiment(symbol)
+        breadth_sentiment = get_market_breadth_sentiment(symbol, context)
         
         # Combine all sentiment sources
         combined_score = (
@@ -712,31 +714,21 @@ def get_market_sentiment(symbol):
         print(f"Error getting market sentiment for {symbol}: {e}")
         return get_fallback_sentiment()
 
-def get_technical_sentiment(symbol):
+def get_technical_sentiment(symbol, context=None):
     """Calculate sentiment based on technical indicators"""
     try:
-        yahoo_symbol = symbol.replace('.NS', '') + '.NS'
-        stock = yf.Ticker(yahoo_symbol)
-        hist = stock.history(period="3mo", interval="1d")
+        context = context or MarketDataContext(symbol)
+        hist = context.history("3mo")
         
-        if hist.empty:
+        if hist is None or hist.empty:
             return {'score': 0.5, 'factors': []}
         
         current_price = hist['Close'].iloc[-1]
         
-        # Calculate technical indicators (handle NaN values)
-        rsi = calculate_rsi(hist['Close'])
-        ma20 = hist['Close'].rolling(window=20).mean().iloc[-1] if len(hist) >= 20 else None
-        ma50 = hist['Close'].rolling(window=50).mean().iloc[-1] if len(hist) >= 50 else None
-        ma200 = hist['Close'].rolling(window=200).mean().iloc[-1] if len(hist) >= 200 else None
-        
-        # Convert NaN to None for JSON compatibility
-        if ma20 is not None and (ma20 != ma20):  # NaN check
-            ma20 = None
-        if ma50 is not None and (ma50 != ma50):  # NaN check
-            ma50 = None
-        if ma200 is not None and (ma200 != ma200):  # NaN check
-            ma200 = None
+        # Calculate technical indicators (NaN becomes None for JSON compatibility)
+        indicators = compute_indicators(hist, ['rsi', 'sma_20', 'sma_50', 'sma_200'], ticker=context.symbol)
+        rsi = calculate_rsi(hist['Close'], rsi=indicators['rsi'])
+        ma20, ma50, ma200 = (last_value(indicators[name]) for name in ('sma_20', 'sma_50', 'sma_200'))
         
         # Calculate momentum
         price_change_5d = (current_price - hist['Close'].iloc[-6]) / hist['Close'].iloc[-6] * 100 if len(hist) > 5 else 0
@@ -808,11 +800,11 @@ def get_technical_sentiment(symbol):
         print(f"Error calculating technical sentiment for {symbol}: {e}")
         return {'score': 0.5, 'factors': []}
 
-def get_news_sentiment(symbol):
+def get_news_sentiment(symbol, context=None):
     """Calculate sentiment based on news analysis"""
     try:
         # Get stock-specific news
-        news_items = get_market_context_news(symbol, limit=10)
+        news_items = get_market_context_news(symbol, limit=10, context=context)
         
         if not news_items:
             return {'score': 0.5, 'factors': ['No news data']}
@@ -859,14 +851,13 @@ def get_news_sentiment(symbol):
         print(f"Error calculating news sentiment for {symbol}: {e}")
         return {'score': 0.5, 'factors': ['News sentiment error']}
 
-def get_volume_sentiment(symbol):
+def get_volume_sentiment(symbol, context=None):
     """Calculate sentiment based on volume analysis"""
     try:
-        yahoo_symbol = symbol.replace('.NS', '') + '.NS'
-        stock = yf.Ticker(yahoo_symbol)
-        hist = stock.history(period="1mo", interval="1d")
+        context = context or MarketDataContext(symbol)
+        hist = context.history("1mo")
         
-        if hist.empty:
+        if hist is None or hist.empty:
             return {'score': 0.5, 'factors': []}
         
         current_volume = hist['Volume'].iloc[-1]
@@ -908,13 +899,12 @@ def get_volume_sentiment(symbol):
         print(f"Error calculating volume sentiment for {symbol}: {e}")
         return {'score': 0.5, 'factors': []}
 
-def get_market_breadth_sentiment(symbol):
+def get_market_breadth_sentiment(symbol, context=None):
     """Calculate sentiment based on market breadth"""
     try:
         # Get sector performance
-        yahoo_symbol = symbol.replace('.NS', '') + '.NS'
-        stock = yf.Ticker(yahoo_symbol)
-        info = stock.info
+        context = context or MarketDataContext(symbol)
+        info = context.info()
         
         sector = info.get('sector', 'Unknown')
         
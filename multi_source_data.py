@@ -4,13 +4,202 @@ if os.environ.get('VERCEL'):
     os.environ['XDG_CACHE_HOME'] = '/tmp/.cache'
 
 import yfinance as yf
-import requests
+from http_client import http_get
 import pandas as pd
 from datetime import datetime, timedelta
 import time
 import os
 import json
 import re
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from source_health import LatencyHistogram, CircuitBreaker, SourceHealthMonitor
+from request_coalescing import SingleFlight
+import rate_limiter
+import snapshot_store
+from rate_limiter import PRIORITY_BACKGROUND, RateLimitTimeout, request_priority, with_current_priority
+
+try:
+    from yfinance.data import YfData
+except ImportError:  # Older/newer yfinance without the shared session helper
+    YfData = None
+
+# Yahoo multi-symbol quote endpoint (same one yfinance uses for Ticker.info)
+YAHOO_QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+QUOTE_BATCH_SIZE = 50
+# The batched quote endpoint has no sector: sectors are looked up once per symbol (Ticker.info,
+# in the background) and kept on disk, since they practically never change
+SECTOR_SNAPSHOT = 'yahoo_sectors'
+SECTOR_MAX_AGE = float(os.environ.get('SECTOR_MAX_AGE', 30 * 24 * 3600))
+
+# Fan-out executor limits (overridable per deployment)
+FANOUT_MAX_WORKERS = int(os.environ.get('FANOUT_MAX_WORKERS', 16))
+FANOUT_PER_SOURCE_LIMIT = int(os.environ.get('FANOUT_PER_SOURCE_LIMIT', 8))
+FANOUT_DEADLINE = float(os.environ.get('FANOUT_DEADLINE', 30))
+
+# Hedged fetch configuration: fire the next source once the current one exceeds its p95 budget
+HEDGED_FETCH = os.environ.get('HEDGED_FETCH', '0') == '1'
+HEDGE_PERCENTILE = float(os.environ.get('HEDGE_PERCENTILE', 95))
+HEDGE_DEFAULT_DELAY = float(os.environ.get('HEDGE_DEFAULT_DELAY', 2.0))
+HEDGE_MIN_DELAY = float(os.environ.get('HEDGE_MIN_DELAY', 0.25))
+HEDGE_MIN_SAMPLES = int(os.environ.get('HEDGE_MIN_SAMPLES', 20))
+
+# Circuit breaker configuration: open after N consecutive failures, probe again after the cooldown
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', 5))
+BREAKER_COOLDOWN = float(os.environ.get('BREAKER_COOLDOWN', 60))
+
+# Health snapshot configuration: refresh cadence and how long a source may sit idle before it is probed
+HEALTH_REFRESH_INTERVAL = float(os.environ.get('HEALTH_REFRESH_INTERVAL', 30))
+HEALTH_PROBE_AFTER = float(os.environ.get('HEALTH_PROBE_AFTER', 300))
+HEALTH_PROBE_SYMBOL = 'RELIANCE.NS'
+
+class _SourceSlots:
+    """In-flight cap for one upstream source: calls holding a slot, and submissions waiting for one"""
+    
+    def __init__(self, limit):
+        self.limit = limit
+        self.running = 0
+        self.waiting = deque()  # (future, fn, args, kwargs) not yet handed to the pool
+
+class FanOutExecutor:
+    """Bounded thread pool for multi-symbol fetches with deadlines and per-source caps.
+    
+    A source's cap counts calls actually talking to that upstream: submissions labelled with
+    the source wait for a slot before they take a pool thread (so a saturated source never
+    starves calls to other sources), and code walking several sources takes a slot around
+    each upstream call with source_slot().
+    """
+    
+    def __init__(self, max_workers=FANOUT_MAX_WORKERS, per_source_limit=FANOUT_PER_SOURCE_LIMIT, source_limits=None):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fanout')
+        self.per_source_limit = per_source_limit
+        self.source_limits = source_limits or {}
+        self._source_slots = {}
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        self._held = threading.local()  # sources whose slot the current thread already holds
+    
+    def _get_slots(self, source):
+        """Slot accounting for one upstream source (caller holds the lock)"""
+        if source not in self._source_slots:
+            self._source_slots[source] = _SourceSlots(self.source_limits.get(source, self.per_source_limit))
+        return self._source_slots[source]
+    
+    def _held_sources(self):
+        if not hasattr(self._held, 'sources'):
+            self._held.sources = set()
+        return self._held.sources
+    
+    def _release(self, source):
+        """Hand a freed slot to the next waiting submission, else return it"""
+        with self._lock:
+            slots = self._source_slots[source]
+            if not slots.waiting:
+                slots.running -= 1
+                self._slot_freed.notify()
+                return
+            call = slots.waiting.popleft()
+        self._start(source, call)
+    
+    def _start(self, source, call):
+        """Run a submission that holds a slot of source on the pool"""
+        future, fn, args, kwargs = call
+        
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return  # Cancelled (e.g. past its deadline) before it started
+            held = self._held_sources()
+            held.add(source)
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                held.discard(source)
+        
+        self._pool.submit(run).add_done_callback(lambda _: self._release(source))
+    
+    def submit(self, fn, *args, source=None, **kwargs):
+        """Submit one call; with a source, it is queued until one of that source's slots is free"""
+        # Worker threads inherit the submitting request's rate-limit priority
+        fn = with_current_priority(fn)
+        if source is None:
+            return self._pool.submit(fn, *args, **kwargs)
+        
+        future = Future()
+        call = (future, fn, args, kwargs)
+        with self._lock:
+            slots = self._get_slots(source)
+            start = slots.running < slots.limit
+            if start:
+                slots.running += 1
+            else:
+                slots.waiting.append(call)
+        if start:
+            self._start(source, call)
+        return future
+    
+    @contextmanager
+    def source_slot(self, source, timeout=None):
+        """Hold one of source's slots around a single upstream call; yields False if none freed in time"""
+        held = self._held_sources()
+        if source in held:
+            # Already running under this source's slot (submitted with source=...)
+            yield True
+            return
+        
+        with self._slot_freed:
+            slots = self._get_slots(source)
+            acquired = self._slot_freed.wait_for(lambda: slots.running < slots.limit, timeout)
+            if acquired:
+                slots.running += 1
+        if not acquired:
+            yield False
+            return
+        
+        held.add(source)
+        try:
+            yield True
+        finally:
+            held.discard(source)
+            self._release(source)
+    
+    def iter_completed(self, fn, items, source=None, deadline=FANOUT_DEADLINE):
+        """Run fn(item) concurrently and yield (item, result) as each call finishes.
+        
+        Calls still pending when the deadline expires are cancelled; calls already
+        running are abandoned and their results discarded. Failed calls yield None.
+        """
+        items = list(items)
+        futures = {self.submit(fn, item, source=source): item for item in items}
+        end_time = time.monotonic() + deadline if deadline is not None else None
+        pending = set(futures)
+        
+        try:
+            while pending:
+                remaining = None if end_time is None else max(0, end_time - time.monotonic())
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                if not done:
+                    print(f"⏱️ Fan-out deadline reached, dropping {len(pending)} stragglers")
+                    break
+                for future in done:
+                    item = futures[future]
+                    try:
+                        yield item, future.result()
+                    except Exception as e:
+                        print(f"❌ Fan-out call failed for {item}: {e}")
+                        yield item, None
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    def map(self, fn, items, source=None, deadline=FANOUT_DEADLINE):
+        """Run fn(item) concurrently; results come back in input order (None for failures/stragglers)"""
+        items = list(items)
+        results = dict(self.iter_completed(fn, items, source=source, deadline=deadline))
+        return [results.get(item) for item in items]
 
 class MultiSourceDataFetcher:
     """Multi-source stock data fetcher with fallback capabilities"""
@@ -24,20 +213,115 @@ class MultiSourceDataFetcher:
         }
         self.default_source = 'yahoo'
         self.fallback_order = ['yahoo', 'google', 'alpha_vantage', 'fmp']
+        self.executor = FanOutExecutor()
+        # Separate small pool for hedged requests so hedging never waits on fan-out workers
+        self.hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='hedge')
+        self.latency = {name: LatencyHistogram() for name in self.sources}
+        self.breakers = {
+            name: CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN)
+            for name in self.sources
+        }
+        # Concurrent callers for the same (source, symbol, period) share one upstream fetch
+        self.single_flight = SingleFlight('quote-fetch')
+        self.health = SourceHealthMonitor(
+            self.sources,
+            probe=self._probe_source,
+            describe=self._describe_source,
+            refresh_interval=HEALTH_REFRESH_INTERVAL,
+            probe_after=HEALTH_PROBE_AFTER
+        )
+        
+    def _timed_fetch(self, source_name, symbol, timeout):
+        """Fetch from one source through its circuit breaker and record its latency"""
+        breaker = self.breakers[source_name]
+        if not breaker.allow_request():
+            print(f"⚡ {source_name} circuit open, skipping {symbol}")
+            return None
         
-    def fetch_stock_data(self, symbol, source=None, timeout=10):
-        """Fetch stock data from specified source with fallback"""
-        if source and source in self.sources:
+        with self.executor.source_slot(source_name, timeout) as acquired:
+            if not acquired:
+                # Our own in-flight cap: the source was never asked, so it is neither failing nor slow
+                print(f"⏳ {source_name} skipped for {symbol}: all {source_name} slots busy")
+                breaker.release()
+                return None
+            
+            start = time.monotonic()
+            try:
+                data = self.sources[source_name].fetch_stock_data(symbol, timeout)
+            except RateLimitTimeout as e:
+                # Our own limiter said no: the source was never asked, so it is neither failing nor slow
+                print(f"⏳ {source_name} skipped for {symbol}: {e}")
+                breaker.release()
+                return None
+            except Exception:
+                breaker.record_failure()
+                elapsed = time.monotonic() - start
+                self.latency[source_name].record(elapsed)
+                self.health.record(source_name, False, elapsed)
+                raise
+        
+        elapsed = time.monotonic() - start
+        self.latency[source_name].record(elapsed)
+        self.health.record(source_name, bool(data), elapsed)
+        if data:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        return data
+    
+    def is_source_available(self, source_name):
+        """Whether the source's circuit currently lets calls through"""
+        return self.breakers[source_name].state != CircuitBreaker.OPEN
+    
+    def get_circuit_states(self):
+        """Per-source circuit breaker snapshots"""
+        return {name: breaker.snapshot() for name, breaker in self.breakers.items()}
+    
+    def get_hedge_delay(self, source_name, timeout=10):
+        """Adaptive hedge budget: the source's observed p95 latency, clamped to sane bounds"""
+        histogram = self.latency[source_name]
+        if histogram.total < HEDGE_MIN_SAMPLES:
+            return min(HEDGE_DEFAULT_DELAY, timeout)
+        
+        budget = histogram.percentile(HEDGE_PERCENTILE) or HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, min(budget, timeout))
+    
+    def get_latency_stats(self):
+        """Per-source latency histogram snapshots"""
+        return {name: histogram.snapshot() for name, histogram in self.latency.items()}
+    
+    def fetch_stock_data(self, symbol, source=None, timeout=10, hedged=None):
+        """Fetch stock data from specified source with fallback (coalesced per source/symbol)"""
+        key = (source or 'auto', symbol, 'quote')
+        return self.single_flight.do(key, self._fetch_stock_data, symbol, source, timeout, hedged)
+    
+    def _fetch_stock_data(self, symbol, source=None, timeout=10, hedged=None):
+        """Uncoalesced fetch: serial fallback chain or hedged race"""
+        if hedged is None:
+            hedged = HEDGED_FETCH
+        if hedged:
+            order = [source] if source in self.sources else []
+            order += [name for name in self.fallback_order if name not in order]
+            order = [name for name in order if self.is_source_available(name)]
+            if not order:
+                print(f"❌ All source circuits open for {symbol}")
+                return None
+            return self._fetch_hedged(symbol, order, timeout)
+        
+        if source and source in self.sources and self.is_source_available(source):
             # Try specific source first
-            data = self.sources[source].fetch_stock_data(symbol, timeout)
+            data = self._timed_fetch(source, symbol, timeout)
             if data:
                 return {'data': data, 'source': source}
         
-        # Try all sources in fallback order
+        # Try all sources in fallback order, skipping sources whose circuit is open
         for source_name in self.fallback_order:
+            if not self.is_source_available(source_name):
+                print(f"⚡ Skipping {source_name} for {symbol} (circuit open)")
+                continue
             try:
                 print(f"🔄 Trying {source_name} for {symbol}...")
-                data = self.sources[source_name].fetch_stock_data(symbol, timeout)
+                data = self._timed_fetch(source_name, symbol, timeout)
                 if data:
                     print(f"✅ Success with {source_name}")
                     return {'data': data, 'source': source_name}
@@ -48,25 +332,133 @@ class MultiSourceDataFetcher:
         print(f"❌ All sources failed for {symbol}")
         return None
     
-    def fetch_multiple_stocks(self, symbols, source=None, timeout=10):
+    def _fetch_hedged(self, symbol, order, timeout):
+        """Race sources: start the next one when the current exceeds its budget or fails, take the first valid answer.
+        
+        The whole race is bounded by timeout: sources still running then are abandoned
+        (not every upstream call honours its own timeout, e.g. Ticker.info).
+        """
+        remaining = list(order)
+        pending = {}
+        deadline = time.monotonic() + timeout
+        
+        def launch_next():
+            source_name = remaining.pop(0)
+            print(f"🔄 Hedged fetch: starting {source_name} for {symbol}...")
+            future = self.hedge_executor.submit(with_current_priority(self._timed_fetch), source_name, symbol, timeout)
+            pending[future] = source_name
+            return source_name
+        
+        current = launch_next()
+        while pending:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                print(f"⏱️ Hedged fetch for {symbol} timed out after {timeout}s, abandoning {len(pending)} sources")
+                return None
+            # Once every source is in flight, wait for them only until the overall deadline
+            budget = min(self.get_hedge_delay(current, timeout), left) if remaining else left
+            done, _ = wait(list(pending), timeout=budget, return_when=FIRST_COMPLETED)
+            
+            if not done:
+                if remaining and time.monotonic() < deadline:
+                    print(f"⏱️ {current} exceeded {budget:.2f}s budget for {symbol}, hedging")
+                    current = launch_next()
+                continue
+            
+            for future in done:
+                source_name = pending.pop(future)
+                try:
+                    data = future.result()
+                except Exception as e:
+                    print(f"❌ {source_name} failed: {e}")
+                    data = None
+                if data:
+                    print(f"✅ Hedged fetch won by {source_name}")
+                    return {'data': data, 'source': source_name}
+            
+            # A finished source failed: fall through to the next one immediately
+            if remaining:
+                current = launch_next()
+        
+        print(f"❌ All sources failed for {symbol}")
+        return None
+    
+    def fetch_multiple_stocks(self, symbols, source=None, timeout=10, deadline=FANOUT_DEADLINE):
         """Fetch data for multiple stocks with source preference"""
-        results = []
+        symbols = list(dict.fromkeys(symbols))  # De-duplicate, keep order
+        fetched = {}
         
-        for symbol in symbols:
+        # Batch path: one bulk request for the whole universe when the source supports it
+        batch_source_name = source if source in self.sources else self.default_source
+        batch_source = self.sources[batch_source_name]
+        batch_breaker = self.breakers[batch_source_name]
+        if hasattr(batch_source, 'fetch_multiple_stocks') and batch_breaker.allow_request():
             try:
-                result = self.fetch_stock_data(symbol, source, timeout)
-                if result:
-                    results.append({
-                        'symbol': symbol,
-                        **result['data'],
-                        'data_source': result['source']
-                    })
+                print(f"🔄 Batch fetching {len(symbols)} symbols from {batch_source_name}...")
+                batch_start = time.monotonic()
+                batch_data = batch_source.fetch_multiple_stocks(symbols, timeout)
+                for symbol, data in batch_data.items():
+                    fetched[symbol] = {'data': data, 'source': batch_source_name}
+                print(f"✅ Batch fetch returned {len(fetched)}/{len(symbols)} symbols")
+                if fetched:
+                    batch_breaker.record_success()
+                else:
+                    batch_breaker.record_failure()
+                self.health.record(batch_source_name, bool(fetched), time.monotonic() - batch_start)
+            except RateLimitTimeout as e:
+                batch_breaker.release()
+                print(f"⏳ Batch fetch from {batch_source_name} skipped: {e}")
             except Exception as e:
-                print(f"❌ Error fetching {symbol}: {e}")
-                continue
+                batch_breaker.record_failure()
+                self.health.record(batch_source_name, False, time.monotonic() - batch_start)
+                print(f"❌ Batch fetch from {batch_source_name} failed: {e}")
+        
+        # Per-symbol fallback chain only for whatever the batch could not resolve,
+        # fanned out concurrently so one slow symbol does not stall the rest. Each worker may
+        # walk the whole chain, so the per-source caps are taken around each upstream call
+        # (_timed_fetch), not on the fan-out itself
+        missing = [symbol for symbol in symbols if symbol not in fetched]
+        if missing:
+            print(f"🔄 Falling back to per-symbol fetch for {len(missing)} symbols...")
+            fallback_results = self.executor.iter_completed(
+                lambda symbol: self.fetch_stock_data(symbol, source, timeout), missing, deadline=deadline
+            )
+            for symbol, result in fallback_results:
+                if result:
+                    fetched[symbol] = result
+        
+        results = []
+        for symbol in symbols:
+            if symbol in fetched:
+                results.append({
+                    'symbol': symbol,
+                    **fetched[symbol]['data'],
+                    'data_source': fetched[symbol]['source']
+                })
         
         return results
     
+    def _probe_source(self, source_name):
+        """Background health probe (queued behind interactive requests by the rate limiter)"""
+        with request_priority(PRIORITY_BACKGROUND):
+            return self._timed_fetch(source_name, HEALTH_PROBE_SYMBOL, 5)
+    
+    def _describe_source(self, source_name):
+        """Static description plus circuit breaker state for one source"""
+        source = self.sources[source_name]
+        circuit = self.breakers[source_name].snapshot()
+        return {
+            'available': circuit['state'] != CircuitBreaker.OPEN,
+            'name': source.get_display_name(),
+            'description': source.get_description(),
+            'circuit': circuit
+        }
+    
+    def check_all_sources(self):
+        """Cached per-source health (last success, error rate, p50/p99 latency); never touches the network"""
+        self.health.start()
+        return self.health.get_snapshot()['sources']
+    
     def get_available_sources(self):
         """Get list of available data sources with status"""
         status = {}
@@ -110,7 +502,8 @@ class GoogleFinanceSource:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
             
-            response = requests.get(search_url, headers=headers, timeout=timeout)
+            rate_limiter.acquire('google', timeout=timeout)
+            response = http_get(search_url, headers=headers, timeout=timeout)
             
             if response.status_code != 200:
                 return None
@@ -151,6 +544,8 @@ class GoogleFinanceSource:
                 'currency': 'INR' if symbol.endswith('.NS') else 'USD'
             }
             
+        except RateLimitTimeout:
+            raise  # Not the source's fault; the fetcher moves on without penalising it
         except Exception as e:
             print(f"Google Finance error for {symbol}: {e}")
             return None
@@ -164,42 +559,188 @@ class GoogleFinanceSource:
 class YahooFinanceSource:
     """Yahoo Finance data source"""
     
+    def __init__(self):
+        self._sectors = None  # symbol -> sector ('' if Yahoo has none), loaded from disk on first use
+        self._sectors_lock = threading.Lock()
+        self._sector_lookup = None
+    
+    def _known_sectors(self):
+        """Sector map (caller holds _sectors_lock)"""
+        if self._sectors is None:
+            stored, _ = snapshot_store.load_snapshot(SECTOR_SNAPSHOT, max_age=SECTOR_MAX_AGE)
+            self._sectors = dict(stored or {})
+        return self._sectors
+    
+    def get_sector(self, symbol):
+        """Cached sector for a symbol, None if not looked up yet (or Yahoo has none)"""
+        with self._sectors_lock:
+            return self._known_sectors().get(symbol) or None
+    
+    def remember_sector(self, symbol, info):
+        """Keep the sector from a Ticker.info already fetched for another reason"""
+        if info and 'sector' in info:
+            with self._sectors_lock:
+                self._known_sectors()[symbol] = info.get('sector') or ''
+    
+    def _look_up_sectors(self, symbols, timeout):
+        """Background: Ticker.info for each symbol without a known sector, then persist the map"""
+        with request_priority(PRIORITY_BACKGROUND):
+            for symbol in symbols:
+                try:
+                    rate_limiter.acquire('yahoo', timeout=timeout)
+                    info = yf.Ticker(symbol).info or {}
+                    with self._sectors_lock:
+                        self._known_sectors()[symbol] = info.get('sector') or ''
+                except Exception as e:
+                    print(f"Yahoo Finance sector lookup failed for {symbol}: {e}")
+        with self._sectors_lock:
+            sectors = dict(self._known_sectors())
+        snapshot_store.save_snapshot(SECTOR_SNAPSHOT, sectors)
+    
+    def schedule_sector_lookup(self, symbols, timeout=10):
+        """Start one background lookup for symbols whose sector is unknown (no-op if one is running)"""
+        with self._sectors_lock:
+            known = self._known_sectors()
+            missing = [symbol for symbol in symbols if symbol not in known]
+            if not missing or (self._sector_lookup is not None and self._sector_lookup.is_alive()):
+                return None
+            self._sector_lookup = threading.Thread(
+                target=self._look_up_sectors, args=(missing, timeout), name='yahoo-sectors', daemon=True
+            )
+            self._sector_lookup.start()
+            return self._sector_lookup
+    
     def fetch_stock_data(self, symbol, timeout=10):
         """Fetch stock data from Yahoo Finance"""
         try:
             ticker = yf.Ticker(symbol)
             
             # Get basic info with timeout
+            rate_limiter.acquire('yahoo', timeout=timeout)
             info = ticker.info
+            self.remember_sector(symbol, info)
             
             # Get historical data (shorter for faster loading)
-            hist = ticker.history(period="5d", interval="1d")
-            
-            if hist.empty:
-                return None
+            rate_limiter.acquire('yahoo', timeout=timeout)
+            hist = ticker.history(period="5d", interval="1d", timeout=timeout)
             
-            current_price = hist['Close'].iloc[-1]
-            previous_close = hist['Close'].iloc[-2] if len(hist) > 1 else current_price
-            price_change = (current_price - previous_close) / previous_close * 100
-            
-            return {
-                'symbol': symbol,
-                'current_price': round(current_price, 2),
-                'price_change': round(price_change, 2),
-                'volume': int(hist['Volume'].iloc[-1]),
-                'market_cap': info.get('marketCap', 0),
-                'name': info.get('shortName', symbol),
-                'sector': info.get('sector', 'Unknown'),
-                'pe_ratio': info.get('trailingPE'),
-                'dividend_yield': info.get('dividendYield'),
-                'price_to_book': info.get('priceToBook'),
-                'currency': info.get('currency', 'USD')
-            }
+            return self.build_quote(symbol, hist, info)
             
+        except RateLimitTimeout:
+            raise  # Not the source's fault; the fetcher moves on without penalising it
         except Exception as e:
             print(f"Yahoo Finance error for {symbol}: {e}")
             return None
     
+    @staticmethod
+    def build_quote(symbol, hist, info):
+        """Quote payload from daily bars plus Ticker.info (None without bars)"""
+        if hist is None or hist.empty:
+            return None
+        
+        current_price = hist['Close'].iloc[-1]
+        previous_close = hist['Close'].iloc[-2] if len(hist) > 1 else current_price
+        price_change = (current_price - previous_close) / previous_close * 100
+        
+        return {
+            'symbol': symbol,
+            'current_price': round(current_price, 2),
+            'price_change': round(price_change, 2),
+            'volume': int(hist['Volume'].iloc[-1]),
+            'market_cap': info.get('marketCap', 0),
+            'name': info.get('shortName', symbol),
+            'sector': info.get('sector', 'Unknown'),
+            'pe_ratio': info.get('trailingPE'),
+            'dividend_yield': info.get('dividendYield'),
+            'price_to_book': info.get('priceToBook'),
+            'currency': info.get('currency', 'USD')
+        }
+    
+    def fetch_multiple_stocks(self, symbols, timeout=10):
+        """Fetch stock data for many symbols with one bulk OHLCV download and batched quotes"""
+        if not symbols:
+            return {}
+        
+        # One multi-ticker download for the last month of daily bars of the whole universe
+        # (a month rather than 5 days so the average volume comes from the same request)
+        rate_limiter.acquire('yahoo', timeout=timeout)
+        hist = yf.download(
+            symbols, period="1mo", interval="1d", group_by='ticker',
+            threads=True, progress=False, timeout=timeout
+        )
+        if hist is None or hist.empty:
+            return {}
+        
+        # Quote metadata (market cap, name, ratios) in chunks of QUOTE_BATCH_SIZE
+        quotes = self._fetch_quotes_batch(symbols, timeout)
+        
+        results = {}
+        for symbol in symbols:
+            try:
+                if isinstance(hist.columns, pd.MultiIndex):
+                    if symbol not in hist.columns.get_level_values(0):
+                        continue
+                    symbol_hist = hist[symbol]
+                else:
+                    symbol_hist = hist
+                symbol_hist = symbol_hist.dropna(subset=['Close'])
+                if symbol_hist.empty:
+                    continue
+                
+                current_price = symbol_hist['Close'].iloc[-1]
+                previous_close = symbol_hist['Close'].iloc[-2] if len(symbol_hist) > 1 else current_price
+                price_change = (current_price - previous_close) / previous_close * 100
+                volume = symbol_hist['Volume'].iloc[-1]
+                avg_volume = symbol_hist['Volume'].mean()
+                quote = quotes.get(symbol, {})
+                
+                results[symbol] = {
+                    'symbol': symbol,
+                    'current_price': round(current_price, 2),
+                    'price_change': round(price_change, 2),
+                    'volume': int(volume),
+                    'volume_ratio': round(volume / avg_volume, 2) if avg_volume > 0 else 1.0,
+                    'market_cap': quote.get('marketCap', 0),
+                    'name': quote.get('shortName', symbol),
+                    'pe_ratio': quote.get('trailingPE'),
+                    'dividend_yield': quote.get('dividendYield'),
+                    'price_to_book': quote.get('priceToBook'),
+                    'currency': quote.get('currency', 'USD')
+                }
+                # Only a real sector: omitted (not 'Unknown') until the lookup has found it
+                sector = quote.get('sector') or self.get_sector(symbol)
+                if sector:
+                    results[symbol]['sector'] = sector
+            except Exception as e:
+                print(f"Yahoo Finance batch error for {symbol}: {e}")
+                continue
+        
+        self.schedule_sector_lookup(list(results), timeout)
+        return results
+    
+    def _fetch_quotes_batch(self, symbols, timeout=10):
+        """Fetch quote metadata for many symbols via Yahoo's multi-symbol quote endpoint"""
+        quotes = {}
+        if YfData is None:
+            return quotes
+        
+        for i in range(0, len(symbols), QUOTE_BATCH_SIZE):
+            chunk = symbols[i:i + QUOTE_BATCH_SIZE]
+            try:
+                rate_limiter.acquire('yahoo', timeout=timeout)
+                data = YfData().get_raw_json(
+                    YAHOO_QUOTE_URL,
+                    params={'symbols': ','.join(chunk), 'formatted': 'false'},
+                    timeout=timeout
+                )
+                for quote in data.get('quoteResponse', {}).get('result', []):
+                    quotes[quote.get('symbol')] = quote
+            except Exception as e:
+                print(f"Yahoo Finance quote batch error for {len(chunk)} symbols: {e}")
+                continue
+        
+        return quotes
+    
     def get_display_name(self):
         return "Yahoo Finance"
     
@@ -229,7 +770,8 @@ class AlphaVantageSource:
                 'apikey': self.api_key
             }
             
-            response = requests.get(self.base_url, params=params, timeout=timeout)
+            rate_limiter.acquire('alpha_vantage', timeout=timeout)
+            response = http_get(self.base_url, params=params, timeout=timeout)
             data = response.json()
             
             if 'Global Quote' not in data:
@@ -254,6 +796,8 @@ class AlphaVantageSource:
                 'currency': 'USD'
             }
             
+        except RateLimitTimeout:
+            raise  # Not the source's fault; the fetcher moves on without penalising it
         except Exception as e:
             print(f"Alpha Vantage error for {symbol}: {e}")
             return None
@@ -284,7 +828,8 @@ class FinancialModelingPrepSource:
             url = f"{self.base_url}/quote/{fmp_symbol}"
             params = {'apikey': self.api_key}
             
-            response = requests.get(url, params=params, timeout=timeout)
+            rate_limiter.acquire('fmp', timeout=timeout)
+            response = http_get(url, params=params, timeout=timeout)
             data = response.json()
             
             if not data or len(data) == 0:
@@ -306,6 +851,8 @@ class FinancialModelingPrepSource:
                 'currency': 'USD'
             }
             
+        except RateLimitTimeout:
+            raise  # Not the source's fault; the fetcher moves on without penalising it
         except Exception as e:
             print(f"FMP error for {symbol}: {e}")
             return None
@@ -319,17 +866,25 @@ class FinancialModelingPrepSource:
 # Global instance
 multi_source_fetcher = MultiSourceDataFetcher()
 
-def get_stock_data_multi_source(symbol, source=None, timeout=10):
+def get_stock_data_multi_source(symbol, source=None, timeout=10, hedged=None):
     """Convenience function for multi-source data fetching"""
-    return multi_source_fetcher.fetch_stock_data(symbol, source, timeout)
+    return multi_source_fetcher.fetch_stock_data(symbol, source, timeout, hedged=hedged)
 
 def get_multiple_stocks_multi_source(symbols, source=None, timeout=10):
     """Convenience function for multiple stocks"""
     return multi_source_fetcher.fetch_multiple_stocks(symbols, source, timeout)
 
+def run_parallel(fn, items, source=None, deadline=FANOUT_DEADLINE):
+    """Convenience function to fan a per-symbol call out over the shared executor"""
+    return multi_source_fetcher.executor.map(fn, items, source=source, deadline=deadline)
+
+def iter_parallel(fn, items, source=None, deadline=FANOUT_DEADLINE):
+    """Like run_parallel, but yields (item, result) in completion order"""
+    return multi_source_fetcher.executor.iter_completed(fn, items, source=source, deadline=deadline)
+
 def get_data_source_status():
-    """Get status of all data sources"""
-    return multi_source_fetcher.get_available_sources()
+    """Get status of all data sources (cached health snapshot)"""
+    return multi_source_fetcher.check_all_sources()
 
 def get_major_nifty_stocks():
     """Comprehensive list of major NIFTY stocks"""
@@ -0,0 +1,149 @@
+"""
+Rate Limiter Module
+Per-provider token buckets with prioritised waiting (interactive ahead of background)
+"""
+
+import os
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+# Default (tokens per second, burst capacity) per upstream provider.
+# Override with RATE_LIMIT_<PROVIDER>="rate,burst", e.g. RATE_LIMIT_YAHOO="2,5"
+DEFAULT_RATE_LIMITS = {
+    'yahoo': (4.0, 8),
+    'google': (1.0, 3),
+    'alpha_vantage': (5.0 / 60, 2),  # Free tier: 5 requests per minute
+    'fmp': (0.2, 2),
+}
+RATE_LIMIT_MAX_WAIT = float(os.environ.get('RATE_LIMIT_MAX_WAIT', 30))
+
+class RateLimitTimeout(Exception):
+    """Raised when a token could not be acquired within the allowed wait"""
+
+class TokenBucket:
+    """Thread-safe token bucket; waiters are served strictly by (priority, arrival order)"""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self.granted = 0
+        self.timed_out = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE, timeout=None):
+        """Block until a token is available and this caller is first in line; False on timeout"""
+        ticket = (priority, next(self._sequence))
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        with self._condition:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    self._refill()
+                    is_head = self._waiters[0] == ticket
+                    if is_head and self.tokens >= 1:
+                        self.tokens -= 1
+                        self.granted += 1
+                        return True
+
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.timed_out += 1
+                        return False
+
+                    # The head sleeps until the next token is due; everyone else waits to be notified
+                    wait_time = (1 - self.tokens) / self.rate if is_head else None
+                    if remaining is not None:
+                        wait_time = remaining if wait_time is None else min(wait_time, remaining)
+                    self._condition.wait(wait_time)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def snapshot(self):
+        """JSON-friendly view of the bucket"""
+        with self._condition:
+            self._refill()
+            return {
+                'rate_per_second': round(self.rate, 4),
+                'capacity': self.capacity,
+                'tokens': round(self.tokens, 2),
+                'queued': len(self._waiters),
+                'granted': self.granted,
+                'timed_out': self.timed_out
+            }
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+_context = threading.local()
+
+def _configured_limit(provider):
+    """(rate, burst) for a provider from the environment or the defaults"""
+    override = os.environ.get(f'RATE_LIMIT_{provider.upper()}')
+    if override:
+        try:
+            rate, burst = override.split(',')
+            return float(rate), float(burst)
+        except ValueError:
+            print(f"⚠️ Invalid RATE_LIMIT_{provider.upper()}={override!r}, using defaults")
+    return DEFAULT_RATE_LIMITS.get(provider, (1.0, 1))
+
+def get_bucket(provider):
+    """Get (or lazily create) the token bucket for a provider"""
+    with _buckets_lock:
+        if provider not in _buckets:
+            _buckets[provider] = TokenBucket(*_configured_limit(provider))
+        return _buckets[provider]
+
+def current_priority():
+    """Priority of the calling thread (interactive unless inside a background scope)"""
+    return getattr(_context, 'priority', PRIORITY_INTERACTIVE)
+
+@contextmanager
+def request_priority(priority):
+    """Run the enclosed calls (in this thread) at the given priority"""
+    previous = current_priority()
+    _context.priority = priority
+    try:
+        yield
+    finally:
+        _context.priority = previous
+
+def with_current_priority(fn):
+    """Wrap fn so it runs at the caller's priority when executed on another thread"""
+    priority = current_priority()
+
+    def run(*args, **kwargs):
+        with request_priority(priority):
+            return fn(*args, **kwargs)
+
+    return run
+
+def acquire(provider, timeout=RATE_LIMIT_MAX_WAIT):
+    """Take one token for the provider at the caller's priority; raises RateLimitTimeout"""
+    bucket = get_bucket(provider)
+    if not bucket.acquire(current_priority(), timeout):
+        raise RateLimitTimeout(f"Rate limit wait exceeded {timeout}s for {provider}")
+
+def get_rate_limit_status():
+    """Snapshot of every provider bucket created so far"""
+    with _buckets_lock:
+        buckets = dict(_buckets)
+    return {provider: bucket.snapshot() for provider, bucket in buckets.items()}
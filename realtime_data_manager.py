@@ -1,10 +1,40 @@
-import yfinance as yf
-import requests
-from datetime import datetime
+"""
+Real-time Data Manager Module
+Scheduled refresh of the universe snapshot, aligned to NSE market hours.
+
+The snapshot is immutable and published by swapping a single module reference, so
+request handlers read it with get_snapshot() without taking any lock.
+"""
+
+import os
 import threading
 import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone, time as dt_time
+from types import MappingProxyType
+from multi_source_data import get_multiple_stocks_multi_source
+from rate_limiter import PRIORITY_BACKGROUND, request_priority
+import snapshot_store
+
+# NSE regular session (IST has no daylight saving, so a fixed offset is exact)
+IST = timezone(timedelta(hours=5, minutes=30))
+MARKET_OPEN = dt_time(9, 15)
+MARKET_CLOSE = dt_time(15, 30)
+
+# Refresh cadence while the market is open, and the cap on failure backoff
+SNAPSHOT_INTERVAL = float(os.environ.get('SNAPSHOT_INTERVAL', 300))
+SNAPSHOT_MAX_BACKOFF = float(os.environ.get('SNAPSHOT_MAX_BACKOFF', 1800))
+# Longest single sleep outside market hours (the loop re-evaluates after waking)
+SNAPSHOT_OFF_HOURS_SLEEP = float(os.environ.get('SNAPSHOT_OFF_HOURS_SLEEP', 3600))
+
+MarketSnapshot = namedtuple('MarketSnapshot', ['stocks', 'top_20', 'updated_at', 'market_open', 'is_fallback'])
+
+# Name of the on-disk copy used to warm-start the next process
+UNIVERSE_SNAPSHOT = 'universe'
 
-# Global variables
+_snapshot = None
+
+# Legacy module attributes, rebound on every publish
 top_20_stocks = []
 real_time_stock_data = {}
 last_data_update = None
@@ -85,11 +115,50 @@ def get_major_nifty_stocks():
         print(f"Error getting major NIFTY stocks: {e}")
         return []
 
+def _freeze(stock_data):
+    """Read-only symbol -> stock mapping"""
+    return MappingProxyType({stock['symbol']: MappingProxyType(dict(stock)) for stock in stock_data})
+
+def publish_snapshot(snapshot):
+    """Atomically replace the current snapshot (a single reference assignment)"""
+    global _snapshot, top_20_stocks, real_time_stock_data, last_data_update
+    _snapshot = snapshot
+    top_20_stocks = list(snapshot.top_20)
+    real_time_stock_data = snapshot.stocks
+    last_data_update = snapshot.updated_at
+
+def get_snapshot():
+    """Latest published snapshot (lock-free read)"""
+    return _snapshot
+
+def is_market_open(now=None):
+    """Whether NSE's regular session is running (weekends excluded; exchange holidays are not)"""
+    now = (now or datetime.now(IST)).astimezone(IST)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+def next_market_open(now=None):
+    """Start of the next regular session strictly after `now` (or now's session if before the open)"""
+    now = (now or datetime.now(IST)).astimezone(IST)
+    candidate = now.replace(hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0)
+    if candidate <= now:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return candidate
+
+def last_market_close(now=None):
+    """End of the most recent regular session that has already closed"""
+    now = (now or datetime.now(IST)).astimezone(IST)
+    candidate = now.replace(hour=MARKET_CLOSE.hour, minute=MARKET_CLOSE.minute, second=0, microsecond=0)
+    if candidate > now:
+        candidate -= timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate -= timedelta(days=1)
+    return candidate
+
 def fetch_realtime_data():
-    """Fetch real-time data in background"""
-    global top_20_stocks, real_time_stock_data, last_data_update
-    
-    print("🚀 Starting REAL-TIME data fetch in background...")
+    """Fetch the universe in one batch, publish a new snapshot and return it (None on failure)"""
+    print("🚀 Refreshing REAL-TIME market snapshot...")
     
     try:
         # Get stock list
@@ -97,114 +166,207 @@ def fetch_realtime_data():
         
         if not nifty_200_stocks:
             print("❌ No stock list available")
-            return
+            return None
         
-        print(f"📊 Processing {len(nifty_200_stocks)} stocks for REAL-TIME data...")
+        # One bulk download plus batched quotes for the whole universe (no per-symbol history calls)
+        fetched = get_multiple_stocks_multi_source(nifty_200_stocks[:200])
         
-        # Fetch real-time data for all stocks
         stock_data = []
-        processed_count = 0
-        
-        for i, symbol in enumerate(nifty_200_stocks[:200], 1):  # Limit to 200 stocks
-            try:
-                if i % 20 == 0:
-                    print(f"🔄 Processing stock {i}/{len(nifty_200_stocks)}: {symbol}")
-                
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
-                hist = ticker.history(period="5d", interval="1d")
-                
-                if hist.empty:
-                    print(f"⚠️ {symbol}: No historical data available")
-                    continue
-                
-                current_price = hist['Close'].iloc[-1]
-                previous_close = hist['Close'].iloc[-2] if len(hist) > 1 else current_price
-                price_change = (current_price - previous_close) / previous_close * 100
-                
-                # Get real-time market cap
-                market_cap = info.get('marketCap', 0)
-                if market_cap and market_cap > 0:
-                    # Convert to INR crores
-                    usd_to_inr = 83.5
-                    market_cap_inr_cr = (market_cap * usd_to_inr) / 10000000
-                    
-                    # Get additional real-time metrics
-                    volume = hist['Volume'].iloc[-1]
-                    avg_volume = ticker.history(period="1mo", interval="1d")['Volume'].mean()
-                    volume_ratio = volume / avg_volume if avg_volume > 0 else 1
-                    
-                    stock_data.append({
-                        'symbol': symbol,
-                        'market_cap': market_cap_inr_cr,
-                        'name': info.get('shortName', symbol),
-                        'sector': info.get('sector', 'Unknown'),
-                        'current_price': round(current_price, 2),
-                        'price_change': round(price_change, 2),
-                        'volume': int(volume),
-                        'volume_ratio': round(volume_ratio, 2),
-                        'pe_ratio': info.get('trailingPE'),
-                        'dividend_yield': info.get('dividendYield'),
-                        'price_to_book': info.get('priceToBook'),
-                        'data_source': 'real-time'
-                    })
-                    
-                    processed_count += 1
-                    
-                else:
-                    print(f"❌ {symbol}: No market cap data available")
-                    continue
-                    
-            except Exception as e:
-                print(f"❌ {symbol}: Error - {str(e)}")
+        for stock in fetched:
+            # Get real-time market cap
+            market_cap = stock.get('market_cap', 0)
+            if not market_cap or market_cap <= 0:
                 continue
-        
-        # Sort by market cap and get top 20
-        if stock_data:
-            sorted_stocks = sorted(stock_data, key=lambda x: x['market_cap'], reverse=True)
-            top_20_stocks = [stock['symbol'] for stock in sorted_stocks[:20]]
-            
-            # Store real-time data for all stocks
-            real_time_stock_data = {stock['symbol']: stock for stock in stock_data}
-            
-            print(f"\n🏆 TOP 20 STOCKS BY MARKET CAP:")
-            for i, stock in enumerate(sorted_stocks[:20], 1):
-                print(f"{i:2d}. {stock['symbol']:12s} - ₹{stock['market_cap']:,.0f} cr ({stock['name']}) | ₹{stock['current_price']} ({stock['price_change']:+.1f}%)")
             
-            last_data_update = datetime.now()
-            print(f"\n✅ Successfully fetched {len(top_20_stocks)} top stocks from Yahoo Finance at {last_data_update.strftime('%Y-%m-%d %H:%M:%S')}")
-            print(f"📊 Real-time data stored for {len(real_time_stock_data)} stocks")
-            print(f"🔄 Processed {processed_count} out of {len(nifty_200_stocks)} stocks successfully")
+            # Convert to INR crores
+            usd_to_inr = 83.5
+            market_cap_inr_cr = (market_cap * usd_to_inr) / 10000000
             
-        else:
+            stock_data.append({
+                'symbol': stock['symbol'],
+                'market_cap': market_cap_inr_cr,
+                'name': stock.get('name', stock['symbol']),
+                'sector': stock.get('sector', 'Unknown'),
+                'current_price': stock.get('current_price'),
+                'price_change': stock.get('price_change'),
+                'volume': stock.get('volume'),
+                'volume_ratio': stock.get('volume_ratio', 1.0),
+                'pe_ratio': stock.get('pe_ratio'),
+                'dividend_yield': stock.get('dividend_yield'),
+                'price_to_book': stock.get('price_to_book'),
+                'data_source': 'real-time'
+            })
+        
+        if not stock_data:
             print("❌ No stock data fetched")
-            
+            return None
+        
+        # Sort by market cap and get top 20
+        sorted_stocks = sorted(stock_data, key=lambda x: x['market_cap'], reverse=True)
+        snapshot = MarketSnapshot(
+            stocks=_freeze(sorted_stocks),
+            top_20=tuple(stock['symbol'] for stock in sorted_stocks[:20]),
+            updated_at=datetime.now(),
+            market_open=is_market_open(),
+            is_fallback=False
+        )
+        publish_snapshot(snapshot)
+        snapshot_store.save_snapshot(
+            UNIVERSE_SNAPSHOT,
+            {'stocks': sorted_stocks, 'market_open': snapshot.market_open},
+            saved_at=snapshot.updated_at.timestamp()
+        )
+        
+        print(f"✅ Published snapshot: {len(snapshot.stocks)}/{len(nifty_200_stocks)} stocks, "
+              f"top: {snapshot.top_20[0]} at {snapshot.updated_at.strftime('%Y-%m-%d %H:%M:%S')}")
+        return snapshot
+        
     except Exception as e:
         print(f"❌ Error in real-time data fetch: {e}")
+        return None
+
+def load_persisted_snapshot():
+    """Publish the snapshot saved by a previous process, if any; True when one was loaded"""
+    data, saved_at = snapshot_store.load_snapshot(UNIVERSE_SNAPSHOT)
+    if not data or not data.get('stocks'):
+        return False
+    
+    stocks = data['stocks']
+    publish_snapshot(MarketSnapshot(
+        stocks=_freeze(stocks),
+        top_20=tuple(stock['symbol'] for stock in stocks[:20]),
+        updated_at=datetime.fromtimestamp(saved_at),
+        market_open=data.get('market_open', False),
+        is_fallback=False
+    ))
+    print(f"💾 Warm start: loaded snapshot of {len(stocks)} stocks from {_snapshot.updated_at.strftime('%Y-%m-%d %H:%M:%S')}")
+    return True
 
 def initialize_fallback():
     """Initialize with fallback data immediately"""
-    global top_20_stocks, last_data_update
-    
-    fallback_stocks = [
+    fallback_stocks = (
         'RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'ICICIBANK.NS', 'HINDUNILVR.NS',
         'INFY.NS', 'KOTAKBANK.NS', 'SBIN.NS', 'BHARTIARTL.NS', 'ITC.NS',
         'AXISBANK.NS', 'DMART.NS', 'MARUTI.NS', 'ASIANPAINT.NS', 'HCLTECH.NS',
         'ULTRACEMCO.NS', 'BAJFINANCE.NS', 'WIPRO.NS', 'NESTLEIND.NS', 'DRREDDY.NS'
-    ]
+    )
     
-    top_20_stocks = fallback_stocks
-    last_data_update = datetime.now()
-    print(f"🔄 Initialized with fallback list of {len(top_20_stocks)} stocks")
+    publish_snapshot(MarketSnapshot(
+        stocks=MappingProxyType({}),
+        top_20=fallback_stocks,
+        updated_at=datetime.now(),
+        market_open=is_market_open(),
+        is_fallback=True
+    ))
+    print(f"🔄 Initialized with fallback list of {len(fallback_stocks)} stocks")
 
-# Initialize immediately
-print("🚀 Initializing stock data...")
-initialize_fallback()
+class SnapshotScheduler:
+    """Background loop that keeps the snapshot current.
+
+    During market hours it refreshes every `interval` seconds. Outside them it takes one
+    refresh after the close (to capture closing prices) and then sleeps until the next open.
+    Failed refreshes back off exponentially up to `max_backoff`.
+    """
+
+    def __init__(self, refresh=fetch_realtime_data, interval=SNAPSHOT_INTERVAL,
+                 max_backoff=SNAPSHOT_MAX_BACKOFF, off_hours_sleep=SNAPSHOT_OFF_HOURS_SLEEP):
+        self.refresh = refresh
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.off_hours_sleep = off_hours_sleep
+        self.consecutive_failures = 0
+        self.last_run = None
+        self.next_run = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
 
-# Start background thread for real-time data
-print("🔄 Starting background real-time data fetch...")
-background_thread = threading.Thread(target=fetch_realtime_data, daemon=True)
-background_thread.start()
+    def _needs_refresh(self, now):
+        """Outside market hours only a snapshot older than the last close is worth refreshing"""
+        if is_market_open(now):
+            return True
+        snapshot = get_snapshot()
+        if snapshot is None or snapshot.is_fallback:
+            return True
+        return snapshot.updated_at.astimezone(IST) < last_market_close(now)
+
+    def next_delay(self, now=None):
+        """Seconds to wait before the next refresh attempt"""
+        now = now or datetime.now(IST)
+        if self.consecutive_failures:
+            return min(self.max_backoff, self.interval * (2 ** (self.consecutive_failures - 1)))
+        if is_market_open(now):
+            return self.interval
+        if self._needs_refresh(now):
+            return 0.0
+        until_open = (next_market_open(now) - now).total_seconds()
+        return max(1.0, min(self.off_hours_sleep, until_open))
+
+    def run_once(self):
+        """One refresh at background priority; updates the failure count"""
+        now = datetime.now(IST)
+        if not self._needs_refresh(now):
+            return get_snapshot()
+        
+        with request_priority(PRIORITY_BACKGROUND):
+            snapshot = self.refresh()
+        self.last_run = datetime.now()
+        self.consecutive_failures = 0 if snapshot else self.consecutive_failures + 1
+        return snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self.consecutive_failures += 1
+                print(f"❌ Snapshot scheduler error: {e}")
+            
+            delay = self.next_delay()
+            self.next_run = datetime.now() + timedelta(seconds=delay)
+            self._stop.wait(delay)
+
+    def start(self):
+        """Start the scheduler thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='snapshot-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Ask the loop to exit after its current refresh"""
+        self._stop.set()
+
+    def status(self):
+        """JSON-friendly scheduler state"""
+        snapshot = get_snapshot()
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'market_open': is_market_open(),
+            'interval_seconds': self.interval,
+            'consecutive_failures': self.consecutive_failures,
+            'last_run': self.last_run.strftime('%Y-%m-%d %H:%M:%S') if self.last_run else None,
+            'next_run': self.next_run.strftime('%Y-%m-%d %H:%M:%S') if self.next_run else None,
+            'snapshot_updated_at': snapshot.updated_at.strftime('%Y-%m-%d %H:%M:%S') if snapshot else None,
+            'snapshot_size': len(snapshot.stocks) if snapshot else 0
+        }
+
+scheduler = SnapshotScheduler()
+
+def start_scheduler():
+    """Start background snapshot refreshes (no-op on serverless platforms without background threads)"""
+    if os.environ.get('VERCEL'):
+        return False
+    scheduler.start()
+    return True
+
+# Initialize immediately from the last persisted snapshot (or the fallback list);
+# the scheduler refreshes it behind the scenes if it is out of date
+print("🚀 Initializing stock data...")
+if not load_persisted_snapshot():
+    initialize_fallback()
 
-print("✅ Ready! Real-time data will be available shortly.")
-print(f"📊 Current stock list: {len(top_20_stocks)} stocks")
+print("🔄 Starting market snapshot scheduler...")
+start_scheduler()
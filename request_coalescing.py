@@ -0,0 +1,66 @@
+"""
+Request Coalescing Module
+Single-flight layer so concurrent identical fetches share one upstream call
+"""
+
+import threading
+
+class _InFlightCall:
+    """One in-progress call that followers wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one in-flight execution.
+
+    The first caller for a key (the leader) runs the function; callers arriving while
+    it is running block until it finishes and receive the same result or exception.
+    Nothing is cached once the call completes.
+    """
+
+    def __init__(self, name='single-flight'):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced_count = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) unless an identical call (same key) is already in flight"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _InFlightCall()
+                self._calls[key] = call
+                is_leader = True
+            else:
+                call.followers += 1
+                self.coalesced_count += 1
+                is_leader = False
+
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            if call.followers:
+                print(f"🔗 {self.name}: {call.followers} concurrent callers shared {key}")
+            call.event.set()
+
+    def in_flight(self):
+        """Number of keys currently being fetched"""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,86 @@
+"""
+Request Pipeline Module
+Run independent stages of one request concurrently, each with its own deadline and fallback
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from rate_limiter import with_current_priority
+
+# Dedicated pool so request stages never queue behind a large fan-out on the shared executor
+STAGE_MAX_WORKERS = int(os.environ.get('STAGE_MAX_WORKERS', 12))
+DEFAULT_STAGE_DEADLINE = float(os.environ.get('STAGE_DEADLINE', 8))
+
+_stage_pool = ThreadPoolExecutor(max_workers=STAGE_MAX_WORKERS, thread_name_prefix='stage')
+
+class _Stage:
+    """One named unit of work with its fallback payload and deadline (seconds from pipeline start)"""
+
+    def __init__(self, name, fn, args, kwargs, fallback, deadline):
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.fallback = fallback
+        self.deadline = deadline
+        self.future = None
+        self.status = 'pending'
+        self.elapsed = None
+
+class StagedPipeline:
+    """Independent stages started together; collecting results never waits past a stage's deadline.
+
+    A stage that fails or misses its deadline yields its fallback payload without holding up
+    the others, so end-to-end latency is the slowest stage (capped by its deadline), not the sum.
+    """
+
+    def __init__(self, name='pipeline', pool=None):
+        self.name = name
+        self._pool = pool or _stage_pool
+        self._stages = []
+        self._started_at = None
+
+    def add(self, name, fn, *args, fallback=None, deadline=DEFAULT_STAGE_DEADLINE, **kwargs):
+        """Register a stage; fn(*args, **kwargs) runs on the stage pool once started"""
+        self._stages.append(_Stage(name, fn, args, kwargs, fallback, deadline))
+        return self
+
+    def start(self):
+        """Submit every stage (idempotent); stages inherit the caller's rate-limit priority"""
+        if self._started_at is not None:
+            return self
+        self._started_at = time.monotonic()
+        for stage in self._stages:
+            stage.future = self._pool.submit(with_current_priority(stage.fn), *stage.args, **stage.kwargs)
+        return self
+
+    def results(self):
+        """Wait for each stage up to its own deadline; returns {name: result or fallback}"""
+        self.start()
+        results = {}
+        for stage in self._stages:
+            remaining = max(0.0, self._started_at + stage.deadline - time.monotonic())
+            try:
+                results[stage.name] = stage.future.result(timeout=remaining)
+                stage.status = 'ok'
+            except FutureTimeoutError:
+                # The worker cannot be interrupted; its late result is simply discarded
+                stage.future.cancel()
+                print(f"⏱️ {self.name}: stage '{stage.name}' missed its {stage.deadline}s deadline, using fallback")
+                results[stage.name] = stage.fallback
+                stage.status = 'timeout'
+            except Exception as e:
+                print(f"⚠️ {self.name}: stage '{stage.name}' failed - {e}")
+                results[stage.name] = stage.fallback
+                stage.status = 'error'
+            stage.elapsed = round(time.monotonic() - self._started_at, 3)
+        return results
+
+    def degraded(self):
+        """Names of stages that were answered from their fallback"""
+        return [stage.name for stage in self._stages if stage.status in ('timeout', 'error')]
+
+    def timings(self):
+        """{stage: {status, seconds since start when collected}}"""
+        return {stage.name: {'status': stage.status, 'elapsed': stage.elapsed} for stage in self._stages}
@@ -0,0 +1,267 @@
+"""
+Response Cache Module
+Bounded in-memory cache (entries and bytes) with TTL expiry, LRU eviction and hit/miss counters
+"""
+
+import os
+import json
+import threading
+import time
+from collections import OrderedDict
+from rate_limiter import PRIORITY_BACKGROUND, current_priority, request_priority
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 512))
+DEFAULT_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+DEFAULT_TTL = 300.0
+
+_registry = []
+_registry_lock = threading.Lock()
+
+def _estimate_size(value):
+    """Approximate memory cost of a cached payload by its JSON encoding"""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(repr(value))
+
+class ResponseCache:
+    """Thread-safe LRU cache whose entries expire after a TTL.
+
+    Evicts least-recently-used entries whenever either the entry count or the estimated
+    byte size exceeds its bound; payloads larger than the whole byte budget are not stored.
+    """
+
+    def __init__(self, name, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+        with _registry_lock:
+            _registry.append(self)
+
+    def _remove(self, key):
+        """Drop an entry (caller holds the lock)"""
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key, default=None):
+        """Cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at, _ = entry
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store value under key for ttl seconds (cache default if None)"""
+        size = _estimate_size(value)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                self.rejected += 1
+                return False
+
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            return True
+
+    def delete(self, key):
+        """Remove key if present"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """Remove every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        """JSON-friendly counters and occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'rejected': self.rejected
+            }
+
+def get_cache_stats():
+    """Stats for every ResponseCache created in this process"""
+    with _registry_lock:
+        caches = list(_registry)
+    return {cache.name: cache.stats() for cache in caches}
+
+class StaleWhileRevalidate:
+    """Serve the last good value immediately and refresh it in the background once past its soft TTL.
+
+    get() does not wait on the loader (unless asked to when nothing is cached at all): it
+    returns (value, status, updated_at) where status is
+    'fresh', 'stale' (a refresh is running or queued), 'stale-error' (the last refresh failed and
+    none is retried until retry_after has passed), 'warming' (nothing cached yet, first load
+    running) or 'unavailable' (nothing cached and the last load failed recently). At most one
+    refresh per key runs at a time, at background rate-limit priority. on_update(key, value,
+    updated_at) is called after each successful refresh, e.g. to persist the value.
+    """
+
+    def __init__(self, name, loader, soft_ttl=DEFAULT_TTL, retry_after=30.0, on_update=None):
+        self.name = name
+        self.loader = loader
+        self.on_update = on_update
+        self.soft_ttl = soft_ttl
+        self.retry_after = retry_after
+        self._values = {}          # key -> (value, updated_at wall clock, loaded_at monotonic)
+        self._refreshing = {}      # key -> Event set when the running refresh finishes
+        self._last_failure = {}    # key -> monotonic time of the last failed load
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def seed(self, key, value, updated_at=None):
+        """Install a value (e.g. loaded from disk at startup) without calling the loader.
+
+        updated_at is a wall-clock timestamp; older values are treated as correspondingly stale.
+        """
+        now = time.time()
+        updated_at = now if updated_at is None else updated_at
+        with self._lock:
+            self._values[key] = (value, updated_at, time.monotonic() - max(0.0, now - updated_at))
+
+    def peek(self, key):
+        """(value or None, 'fresh'/'stale'/'empty', updated_at or None) without scheduling a refresh"""
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None, 'empty', None
+            status = 'fresh' if time.monotonic() - entry[2] < self.soft_ttl else 'stale'
+            return entry[0], status, entry[1]
+
+    def get(self, key, *args, wait=False):
+        """(value or None, status, updated_at or None); schedules a refresh when needed.
+
+        With wait=True and nothing cached, the caller loads the value itself (at its own
+        priority) or waits for the load already running, instead of getting 'warming'.
+        """
+        with self._lock:
+            entry = self._values.get(key)
+            now = time.monotonic()
+            if entry is not None and now - entry[2] < self.soft_ttl:
+                return entry[0], 'fresh', entry[1]
+
+            failed_at = self._last_failure.get(key)
+            backing_off = failed_at is not None and now - failed_at < self.retry_after
+            done = self._refreshing.get(key)
+            start = done is None and not backing_off
+            if start:
+                done = self._refreshing[key] = threading.Event()
+
+        if entry is not None:
+            if start:
+                self._start_refresh(key, args)
+            return entry[0], 'stale' if done is not None else 'stale-error', entry[1]
+
+        if wait and done is not None:
+            if start:
+                self._refresh(key, args, current_priority())
+            else:
+                done.wait()
+            with self._lock:
+                entry = self._values.get(key)
+            if entry is not None:
+                return entry[0], 'fresh', entry[1]
+            return None, 'unavailable', None
+
+        if start:
+            self._start_refresh(key, args)
+        return None, 'warming' if done is not None else 'unavailable', None
+
+    def _start_refresh(self, key, args):
+        thread = threading.Thread(
+            target=self._refresh, args=(key, args), name=f'swr-{self.name}', daemon=True
+        )
+        thread.start()
+
+    def _refresh(self, key, args, priority=PRIORITY_BACKGROUND):
+        """Run the loader for key; only non-empty results replace the cached value"""
+        try:
+            with request_priority(priority):
+                value = self.loader(*args)
+            updated_at = time.time()
+            with self._lock:
+                if value:
+                    self._values[key] = (value, updated_at, time.monotonic())
+                    self._last_failure.pop(key, None)
+                    self.refreshes += 1
+                else:
+                    self._last_failure[key] = time.monotonic()
+                    self.refresh_failures += 1
+        except Exception as e:
+            print(f"❌ {self.name}: background refresh for {key} failed - {e}")
+            with self._lock:
+                self._last_failure[key] = time.monotonic()
+                self.refresh_failures += 1
+            return
+        finally:
+            with self._lock:
+                done = self._refreshing.pop(key, None)
+            if done is not None:
+                done.set()
+
+        if value and self.on_update:
+            try:
+                self.on_update(key, value, updated_at)
+            except Exception as e:
+                print(f"⚠️ {self.name}: update hook for {key} failed - {e}")
+
+    def stats(self):
+        """JSON-friendly counters and per-key ages"""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'soft_ttl_seconds': self.soft_ttl,
+                'refreshes': self.refreshes,
+                'refresh_failures': self.refresh_failures,
+                'refreshing': sorted(str(key) for key in self._refreshing),
+                'age_seconds': {str(key): round(now - entry[2], 1) for key, entry in self._values.items()}
+            }
@@ -0,0 +1,189 @@
+"""
+Signal Sweep Module
+Grid search over analyze_stock's signal weights and thresholds against the stored history.
+
+Indicators, trade levels and every signal day's trade outcome do not depend on the weights,
+so they are computed once (see backtest.py), placed in shared memory and read in place by a
+pool of worker processes; each configuration only rescores the panel and reselects positions.
+The ranked configurations can be saved as a named signal profile and selected at runtime with
+SIGNAL_PROFILE=<name> (or technical_analysis.set_signal_profile).
+"""
+
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from backtest import (
+    BACKTEST_HORIZON, SIGNAL_INPUTS, load_panel, scores_from_inputs, select_positions, signal_inputs,
+    simulate_signal_trades, trade_levels, trade_statistics
+)
+from technical_analysis import ALLOWED_LOSS, SIGNAL_WEIGHTS, normalize_signal_profile, save_signal_profile
+
+# Values tried for each weight (SIGNAL_WEIGHTS keys) and threshold (signal profile keys).
+# strong_signal_score only splits BUY from STRONG_BUY, which trades the same, so it is not swept.
+SWEEP_GRID = {
+    'rsi': (20, 40, 60),
+    'trend': (15, 25, 35),
+    'macd': (10, 20, 30),
+    'volume': (0, 10),
+    'volatility': (0, 5),
+    'rsi_oversold': (25, 30, 35),
+    'rsi_overbought': (65, 70, 75),
+    'signal_score': (10, 20, 30, 40)
+}
+RANK_METRICS = ['total_return', 'calmar', 'hit_rate', 'avg_trade_return']
+MIN_SWEEP_TRADES = 30
+SWEEP_WORKERS = int(os.environ.get('SWEEP_WORKERS', os.cpu_count() or 1))
+
+# Arrays the workers read: name -> ndarray (views onto shared memory inside a worker)
+_arrays = {}
+
+def sweep_profiles(grid=None):
+    """Every combination of the grid as a complete signal profile"""
+    grid = grid or SWEEP_GRID
+    keys = list(grid)
+    for values in itertools.product(*(grid[key] for key in keys)):
+        combo = dict(zip(keys, values))
+        weights = {key: combo.pop(key) for key in list(combo) if key in SIGNAL_WEIGHTS}
+        yield normalize_signal_profile(dict(combo, weights=weights))
+
+def sweep_arrays(panel, risk_profile='Medium', horizon=BACKTEST_HORIZON):
+    """Everything a configuration is evaluated from, as plain arrays"""
+    inputs = signal_inputs(panel)
+    entry, stop, target = trade_levels(inputs['close'], risk_profile)
+    filled, fill_price, exit_day, exit_price, outcome = simulate_signal_trades(panel, entry, stop, target, horizon)
+
+    arrays = {name: np.ascontiguousarray(inputs[name]) for name in SIGNAL_INPUTS + ['scored']}
+    arrays.update(entry_valid=~np.isnan(entry), filled=filled, fill_price=fill_price,
+                  exit_day=exit_day, exit_price=exit_price, outcome=outcome)
+    return arrays
+
+def _share(arrays):
+    """Copy arrays into shared memory blocks; returns (blocks, specs for _attach)"""
+    blocks, specs = [], {}
+    for name, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        specs[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+def _attach(specs):
+    """Worker initializer: map the parent's shared blocks as read-only arrays"""
+    blocks = []
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)  # Keep the mappings alive as long as the views
+        view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        view.flags.writeable = False
+        _arrays[name] = view
+    _arrays['_blocks'] = blocks
+
+def evaluate_profile(profile):
+    """Backtest metrics of one signal profile over the arrays in _arrays"""
+    score = scores_from_inputs(_arrays, profile)
+    with np.errstate(invalid='ignore'):
+        buy = (score >= profile['signal_score']) & _arrays['entry_valid']
+    trades = select_positions(buy, _arrays['filled'], _arrays['exit_day']) & _arrays['filled']
+    return trade_statistics(_arrays['close'], trades, _arrays['fill_price'], _arrays['exit_day'],
+                            _arrays['exit_price'], _arrays['outcome'])
+
+def rank_results(results, rank_by='total_return', min_trades=MIN_SWEEP_TRADES):
+    """Configurations with at least min_trades trades, best rank_by first (missing values last)"""
+    eligible = [row for row in results if row['metrics']['trades'] >= min_trades]
+    return sorted(eligible, key=lambda row: (row['metrics'][rank_by] is None, -(row['metrics'][rank_by] or 0)))
+
+def run_sweep(panel, grid=None, risk_profile='Medium', horizon=BACKTEST_HORIZON, workers=SWEEP_WORKERS,
+              rank_by='total_return', min_trades=MIN_SWEEP_TRADES):
+    """Evaluate every grid configuration over an aligned price panel; returns ranked rows of {profile, metrics}"""
+    if rank_by not in RANK_METRICS:
+        raise ValueError(f"rank_by must be one of {RANK_METRICS}")
+
+    started = time.perf_counter()
+    profiles = list(sweep_profiles(grid))
+    arrays = sweep_arrays(panel, risk_profile, horizon)
+    prepared = time.perf_counter() - started
+
+    if workers <= 1:
+        _arrays.clear()
+        _arrays.update(arrays)
+        try:
+            metrics = [evaluate_profile(profile) for profile in profiles]
+        finally:
+            _arrays.clear()
+    else:
+        blocks, specs = _share(arrays)
+        del arrays
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(specs,)) as executor:
+                chunksize = max(1, len(profiles) // (workers * 8))
+                metrics = list(executor.map(evaluate_profile, profiles, chunksize=chunksize))
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    elapsed = time.perf_counter() - started
+    print(f"🧪 Swept {len(profiles)} configurations with {max(1, workers)} worker(s) in {elapsed:.1f}s "
+          f"({prepared:.1f}s preparing the panel)")
+    results = [{'profile': profile, 'metrics': result} for profile, result in zip(profiles, metrics)]
+    return rank_results(results, rank_by, min_trades)
+
+def _flatten(row):
+    """One table/CSV row: profile weights and thresholds followed by the metrics"""
+    profile = row['profile']
+    flat = {f'w_{name}': weight for name, weight in profile['weights'].items()}
+    flat.update({key: value for key, value in profile.items() if key != 'weights'})
+    flat.update(row['metrics'])
+    return flat
+
+def write_csv(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(_flatten(rows[0])))
+        writer.writeheader()
+        writer.writerows(_flatten(row) for row in rows)
+
+def print_table(rows, top=20):
+    columns = ['w_rsi', 'w_trend', 'w_macd', 'w_volume', 'w_volatility', 'rsi_oversold', 'rsi_overbought',
+               'signal_score', 'trades', 'hit_rate', 'avg_trade_return', 'total_return', 'max_drawdown', 'calmar']
+    print(" # " + " ".join(f"{column:>12}" for column in columns))
+    for rank, row in enumerate(rows[:top], 1):
+        flat = _flatten(row)
+        print(f"{rank:2} " + " ".join(f"{str(flat[column]):>12}" for column in columns))
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sweep signal weights and thresholds over stored history")
+    parser.add_argument('tickers', nargs='*', help="Symbols (default: the major NIFTY universe)")
+    parser.add_argument('--period', default='10y')
+    parser.add_argument('--risk', default='Medium', choices=list(ALLOWED_LOSS))
+    parser.add_argument('--horizon', type=int, default=BACKTEST_HORIZON)
+    parser.add_argument('--workers', type=int, default=SWEEP_WORKERS)
+    parser.add_argument('--rank-by', default='total_return', choices=RANK_METRICS)
+    parser.add_argument('--min-trades', type=int, default=MIN_SWEEP_TRADES)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--csv', help="Write every ranked configuration to this CSV file")
+    parser.add_argument('--save', metavar='NAME', help="Save the best configuration as signal profile NAME")
+    args = parser.parse_args()
+
+    panel = load_panel(args.tickers or None, period=args.period)
+    if panel is None:
+        raise SystemExit(1)
+
+    ranked = run_sweep(panel, risk_profile=args.risk, horizon=args.horizon, workers=args.workers,
+                       rank_by=args.rank_by, min_trades=args.min_trades)
+    if not ranked:
+        print(f"❌ No configuration made {args.min_trades} trades")
+        raise SystemExit(1)
+
+    print_table(ranked, args.top)
+    if args.csv:
+        write_csv(ranked, args.csv)
+        print(f"💾 {len(ranked)} configurations written to {args.csv}")
+    if args.save:
+        save_signal_profile(args.save, ranked[0]['profile'], ranked[0]['metrics'])
+        print(f"💾 Saved the top configuration as signal profile '{args.save}' (SIGNAL_PROFILE={args.save})")
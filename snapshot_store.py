@@ -0,0 +1,78 @@
+"""
+Snapshot Store Module
+Compact on-disk copies of the latest computed results for warm starts across restarts and cold starts
+"""
+
+import os
+# Configure cache for Vercel (read-only filesystem fix)
+if os.environ.get('VERCEL'):
+    os.environ['XDG_CACHE_HOME'] = '/tmp/.cache'
+
+import gzip
+import json
+import re
+import threading
+import time
+import numpy as np
+
+SNAPSHOT_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+    'stock_predictor', 'snapshots'
+)
+# Snapshots older than this are ignored at startup (default: one week)
+SNAPSHOT_MAX_AGE = float(os.environ.get('SNAPSHOT_MAX_AGE', 7 * 24 * 3600))
+SNAPSHOT_VERSION = 1
+
+def _snapshot_path(name):
+    safe_name = name.replace('&', '_and_').replace('^', '_idx_')
+    # Whitelist file name characters; anything else (path separators included) becomes '_'
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', safe_name).lstrip('.') or '_'
+    return os.path.join(SNAPSHOT_DIR, f"{safe_name}.json.gz")
+
+def _to_json(value):
+    """json.dumps fallback for numpy scalars/arrays and anything else (as a string)"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+def save_snapshot(name, data, saved_at=None):
+    """Atomically write one named snapshot (gzip-compressed compact JSON); False on failure"""
+    payload = {
+        'version': SNAPSHOT_VERSION,
+        'saved_at': time.time() if saved_at is None else saved_at,
+        'data': data
+    }
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        encoded = json.dumps(payload, separators=(',', ':'), default=_to_json).encode('utf-8')
+        path = _snapshot_path(name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(gzip.compress(encoded, compresslevel=6))
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not persist snapshot {name}: {e}")
+        return False
+
+def load_snapshot(name, max_age=SNAPSHOT_MAX_AGE):
+    """(data, saved_at) for a named snapshot, or (None, None) if missing, unreadable or too old"""
+    path = _snapshot_path(name)
+    if not os.path.exists(path):
+        return None, None
+
+    try:
+        with open(path, 'rb') as f:
+            payload = json.loads(gzip.decompress(f.read()).decode('utf-8'))
+    except Exception as e:
+        print(f"⚠️ Corrupt snapshot {name}, ignoring: {e}")
+        return None, None
+
+    if payload.get('version') != SNAPSHOT_VERSION:
+        return None, None
+    saved_at = payload.get('saved_at', 0)
+    if max_age is not None and time.time() - saved_at > max_age:
+        return None, None
+    return payload.get('data'), saved_at
@@ -0,0 +1,267 @@
+"""
+Data Source Health Module
+Latency tracking and circuit breaking for upstream data sources
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (seconds) with decaying counts and percentile estimates"""
+
+    # Upper bounds of each bucket in seconds; anything slower lands in the overflow bucket
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 30.0)
+
+    def __init__(self, buckets=None, decay_every=200):
+        self.buckets = tuple(buckets or self.BUCKETS)
+        self.counts = [0.0] * (len(self.buckets) + 1)
+        self.decay_every = decay_every
+        self.total = 0.0
+        self.sum = 0.0
+        self.max_seen = 0.0
+        self._since_decay = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        """Record one observed latency"""
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+
+        with self._lock:
+            self.counts[index] += 1
+            self.total += 1
+            self.sum += seconds
+            self.max_seen = max(self.max_seen, seconds)
+            self._since_decay += 1
+
+            # Halve all counts periodically so the distribution tracks recent behaviour
+            if self.decay_every and self._since_decay >= self.decay_every:
+                self.counts = [count / 2 for count in self.counts]
+                self.total /= 2
+                self.sum /= 2
+                self._since_decay = 0
+
+    def percentile(self, p):
+        """Estimated p-th percentile (upper bound of the bucket that contains it), None if empty"""
+        with self._lock:
+            if self.total == 0:
+                return None
+
+            target = self.total * p / 100.0
+            cumulative = 0.0
+            for i, count in enumerate(self.counts):
+                cumulative += count
+                if cumulative >= target and count > 0:
+                    return self.buckets[i] if i < len(self.buckets) else self.max_seen
+
+            return self.max_seen
+
+    def snapshot(self):
+        """JSON-friendly summary of the histogram"""
+        with self._lock:
+            total = self.total
+            mean = self.sum / total if total else None
+            buckets = {str(bound): round(count, 2) for bound, count in zip(self.buckets, self.counts)}
+            buckets['+Inf'] = round(self.counts[-1], 2)
+
+        return {
+            'count': round(total, 2),
+            'mean': round(mean, 4) if mean is not None else None,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': buckets
+        }
+
+class CircuitBreaker:
+    """Per-source circuit breaker: closed -> open after consecutive failures -> half-open after cooldown"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, cooldown=30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _refresh_state(self):
+        """Move an open circuit to half-open once the cooldown has elapsed (caller holds the lock)"""
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def allow_request(self):
+        """Whether a call may go through; half-open lets exactly one probe call through"""
+        with self._lock:
+            self._refresh_state()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        """A successful call closes the circuit"""
+        with self._lock:
+            self._state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """A failed call counts towards opening the circuit (a failed half-open probe re-opens it)"""
+        with self._lock:
+            self.consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                self._state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def release(self):
+        """A let-through call that never reached the source (e.g. our own rate limit): not a result"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self):
+        """JSON-friendly view of the breaker state"""
+        with self._lock:
+            self._refresh_state()
+            retry_in = None
+            if self._state == self.OPEN:
+                retry_in = round(max(0.0, self.cooldown - (time.monotonic() - self.opened_at)), 1)
+
+            return {
+                'state': self._state,
+                'consecutive_failures': self.consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'times_opened': self.times_opened,
+                'retry_in_seconds': retry_in
+            }
+
+class SourceHealthMonitor:
+    """Rolling per-source health stats with a background-refreshed snapshot.
+    
+    Request handlers only ever read the last published snapshot; the refresh thread
+    rebuilds it periodically and probes sources that have seen no recent traffic.
+    """
+
+    def __init__(self, source_names, probe=None, describe=None, refresh_interval=30.0,
+                 probe_after=300.0, window=100):
+        self.source_names = list(source_names)
+        self.probe = probe
+        self.describe = describe
+        self.refresh_interval = refresh_interval
+        self.probe_after = probe_after
+        self._outcomes = {name: deque(maxlen=window) for name in self.source_names}
+        self._latencies = {name: deque(maxlen=window) for name in self.source_names}
+        self._last_success = {name: None for name in self.source_names}
+        self._last_failure = {name: None for name in self.source_names}
+        self._last_activity = {name: 0.0 for name in self.source_names}
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._thread = None
+
+    def record(self, source_name, success, latency):
+        """Record the outcome of one real (or probe) call"""
+        now = time.time()
+        with self._lock:
+            self._outcomes[source_name].append(bool(success))
+            self._latencies[source_name].append(latency)
+            self._last_activity[source_name] = now
+            if success:
+                self._last_success[source_name] = now
+            else:
+                self._last_failure[source_name] = now
+
+    @staticmethod
+    def _percentile(sorted_values, p):
+        if not sorted_values:
+            return None
+        index = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+        return round(sorted_values[index], 4)
+
+    @staticmethod
+    def _format_time(timestamp):
+        return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S') if timestamp else None
+
+    def build_snapshot(self):
+        """Compute a fresh snapshot from in-memory stats (no network)"""
+        sources = {}
+        for name in self.source_names:
+            with self._lock:
+                outcomes = list(self._outcomes[name])
+                latencies = sorted(self._latencies[name])
+                last_success = self._last_success[name]
+                last_failure = self._last_failure[name]
+
+            failures = outcomes.count(False)
+            entry = dict(self.describe(name)) if self.describe else {}
+            entry.update({
+                'last_success': self._format_time(last_success),
+                'last_failure': self._format_time(last_failure),
+                'error_rate': round(failures / len(outcomes), 3) if outcomes else None,
+                'sample_size': len(outcomes),
+                'latency_p50': self._percentile(latencies, 50),
+                'latency_p99': self._percentile(latencies, 99)
+            })
+            sources[name] = entry
+
+        return {
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'sources': sources
+        }
+
+    def get_snapshot(self):
+        """Last published snapshot (built inline from memory only if none exists yet)"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._snapshot = self.build_snapshot()
+        return snapshot
+
+    def refresh(self):
+        """Probe idle sources, then publish a new snapshot"""
+        if self.probe:
+            now = time.time()
+            for name in self.source_names:
+                if now - self._last_activity[name] >= self.probe_after:
+                    try:
+                        self.probe(name)
+                    except Exception as e:
+                        print(f"⚠️ Health probe for {name} failed: {e}")
+
+        self._snapshot = self.build_snapshot()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"❌ Source health refresh error: {e}")
+            time.sleep(self.refresh_interval)
+
+    def start(self):
+        """Start the background refresh thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='source-health', daemon=True)
+            self._thread.start()
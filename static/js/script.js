@@ -616,10 +616,11 @@ function resetFilters() {
 }
 
 function analyzeAllStocks() {
-    let riskAppetite = document.querySelector('input[name="risk"]:checked').id.replace('Risk', '');
+    // Radio ids are lowRisk/mediumRisk/...; the API expects Low/Medium/High/Custom
+    let riskId = document.querySelector('input[name="risk"]:checked').id.replace('Risk', '');
+    let riskAppetite = riskId.charAt(0).toUpperCase() + riskId.slice(1);
     let stockBadges = document.querySelectorAll('.signal-badge');
     let totalStocks = stockBadges.length;
-    let analyzedCount = 0;
     
     if (totalStocks === 0) {
         showNotification('No stocks to analyze', 'warning');
@@ -628,34 +629,76 @@ function analyzeAllStocks() {
     
     showNotification(`Analyzing ${totalStocks} stocks with ${riskAppetite} risk...`, 'info');
     
-    // Analyze each stock
-    stockBadges.forEach((badge, index) => {
+    // Analyze every stock in one batched request
+    let stocks = [];
+    stockBadges.forEach(badge => {
         let stock = badge.getAttribute('data-stock');
         if (stock) {
+            stocks.push(stock);
             // Add loading state
             badge.querySelector('.spinner-border').classList.remove('d-none');
             badge.querySelector('.signal-text').textContent = 'Loading...';
-            
-            // Get signal for this stock
-            fetch(`/get_stock_data/${stock}/${riskAppetite}`)
-                .then(response => response.json())
-                .then(data => {
-                    updateSignalBadge(badge, data.signal);
+        }
+    });
+    
+    // The endpoint takes at most MAX_BATCH_TICKERS (50) symbols per request
+    let batches = [];
+    for (let i = 0; i < stocks.length; i += 50) {
+        batches.push(stocks.slice(i, i + 50));
+    }
+    
+    Promise.all(batches.map(batch =>
+        fetch('/api/v1/signals/batch', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ tickers: batch, risk_profile: riskAppetite })
+        })
+            .then(response => response.json())
+            .then(data => {
+                if (data.status !== 'success') {
+                    throw new Error(data.message || 'Batch analysis failed');
+                }
+                return data.signals;
+            })
+    ))
+        .then(results => {
+            let signalsBySymbol = {};
+            let analyzedCount = 0;
+            results.flat().forEach(signal => {
+                signalsBySymbol[signal.symbol] = signal;
+                if (signal.success) {
                     analyzedCount++;
-                    
-                    // Show progress
-                    if (analyzedCount === totalStocks) {
-                        showNotification(`Analysis complete! ${analyzedCount} stocks analyzed`, 'success');
-                    }
-                })
-                .catch(error => {
-                    console.error('Error analyzing stock:', error);
+                }
+            });
+            
+            stockBadges.forEach(badge => {
+                let stock = badge.getAttribute('data-stock');
+                if (!stock) {
+                    return;
+                }
+                let symbol = stock.trim().toUpperCase();
+                if (!symbol.endsWith('.NS')) {
+                    symbol += '.NS';
+                }
+                let signal = signalsBySymbol[symbol];
+                if (signal && signal.success) {
+                    updateSignalBadge(badge, signal.signal);
+                } else {
                     badge.querySelector('.spinner-border').classList.add('d-none');
                     badge.querySelector('.signal-text').textContent = 'Error';
-                    analyzedCount++;
-                });
-        }
-    });
+                }
+            });
+            
+            showNotification(`Analysis complete! ${analyzedCount} stocks analyzed`, 'success');
+        })
+        .catch(error => {
+            console.error('Error analyzing stocks:', error);
+            stockBadges.forEach(badge => {
+                badge.querySelector('.spinner-border').classList.add('d-none');
+                badge.querySelector('.signal-text').textContent = 'Error';
+            });
+            showNotification('Batch analysis failed, please try again', 'error');
+        });
 }
 
 function exportCurrentView() {
@@ -287,13 +287,68 @@ function updateDataSourceDropdown(sources) {
 function fetchAllSignals() {
     console.log('🔄 Fetching all signals...');
 
-    fetch('/get_all_signals')
-        .then(response => response.json())
-        .then(data => {
-            console.log('📊 Signals received:', data);
-            allSignals = data.signals || [];
+    // Older browsers without streaming fetch get the whole list in one response
+    if (!window.ReadableStream || !window.TextDecoder) {
+        fetch('/get_all_signals')
+            .then(response => response.json())
+            .then(data => {
+                console.log('📊 Signals received:', data);
+                allSignals = data.signals || [];
+                updateSignalFilters();
+                populateFilterDropdowns(); // Populate filters after getting signals
+            })
+            .catch(error => {
+                console.error('❌ Error fetching signals:', error);
+            });
+        return;
+    }
+
+    // NDJSON stream: one {"type": "signal"} line per stock as it completes, then a summary line
+    allSignals = [];
+    let renderScheduled = false;
+    const scheduleRender = () => {
+        if (renderScheduled) return;
+        renderScheduled = true;
+        requestAnimationFrame(() => {
+            renderScheduled = false;
+            updateFilteredDisplay();
+        });
+    };
+
+    const handleLine = line => {
+        if (!line.trim()) return;
+        const frame = JSON.parse(line);
+        if (frame.type === 'signal') {
+            allSignals.push(frame.data);
+            scheduleRender();
+        } else if (frame.type === 'summary') {
+            console.log('📊 Signals received:', frame.data);
             updateSignalFilters();
             populateFilterDropdowns(); // Populate filters after getting signals
+        }
+    };
+
+    fetch('/get_all_signals?stream=ndjson')
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+            }
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffered = '';
+
+            const read = () => reader.read().then(({ done, value }) => {
+                if (done) {
+                    handleLine(buffered);
+                    return;
+                }
+                buffered += decoder.decode(value, { stream: true });
+                const lines = buffered.split('\n');
+                buffered = lines.pop();
+                lines.forEach(handleLine);
+                return read();
+            });
+            return read();
         })
         .catch(error => {
             console.error('❌ Error fetching signals:', error);
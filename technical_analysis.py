@@ -1,243 +1,978 @@
+import os
+import json
 import pandas as pd
 import numpy as np
 import yfinance as yf
 import math
+import threading
+from collections import deque
 from datetime import datetime, timedelta
+from request_coalescing import SingleFlight
+import rate_limiter
+import history_store
+from indicators import compute_indicators, exponential_mean, relative_strength, rolling_mean
+try:
+    from scipy.special import erf as _scipy_erf
+except ImportError:  # Optional: math.erf per element gives the same values
+    _scipy_erf = None
+
+# Signal scoring: points per factor and the score cut-offs for each signal
+SIGNAL_WEIGHTS = {'rsi': 40, 'trend': 25, 'macd': 20, 'volume': 10, 'volatility': 5}
+RSI_OVERSOLD = 30
+RSI_OVERBOUGHT = 70
+HIGH_VOLUME_RATIO = 1.5
+LOW_VOLATILITY = 0.02  # ATR as a fraction of price
+STRONG_SIGNAL_SCORE = 60
+SIGNAL_SCORE = 20
+MIN_HISTORY_BARS = 50  # Need at least 50 days for SMA50
+
+# The constants above as the 'default' signal profile; other named profiles (e.g. from
+# signal_sweep.py) live in SIGNAL_PROFILES_PATH and are selected with SIGNAL_PROFILE
+DEFAULT_SIGNAL_PROFILE = {
+    'weights': dict(SIGNAL_WEIGHTS),
+    'rsi_oversold': RSI_OVERSOLD,
+    'rsi_overbought': RSI_OVERBOUGHT,
+    'high_volume_ratio': HIGH_VOLUME_RATIO,
+    'low_volatility': LOW_VOLATILITY,
+    'strong_signal_score': STRONG_SIGNAL_SCORE,
+    'signal_score': SIGNAL_SCORE
+}
+SIGNAL_PROFILES_PATH = os.environ.get(
+    'SIGNAL_PROFILES_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'signal_profiles.json')
+)
+_signal_profile = {'name': 'default', 'profile': DEFAULT_SIGNAL_PROFILE}
+
+def load_signal_profiles():
+    """{name: profile} saved in SIGNAL_PROFILES_PATH ({} if none)"""
+    try:
+        with open(SIGNAL_PROFILES_PATH) as f:
+            return json.load(f).get('profiles', {})
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"⚠️ Could not read signal profiles: {e}")
+        return {}
+
+def normalize_signal_profile(profile):
+    """Complete a (possibly partial) profile with the default values"""
+    normalized = dict(DEFAULT_SIGNAL_PROFILE, **{key: value for key, value in profile.items() if key != 'weights'})
+    normalized['weights'] = dict(DEFAULT_SIGNAL_PROFILE['weights'], **profile.get('weights', {}))
+    return {key: normalized[key] for key in DEFAULT_SIGNAL_PROFILE}
+
+def save_signal_profile(name, profile, metrics=None):
+    """Add or replace a named profile in SIGNAL_PROFILES_PATH (metrics are stored alongside for reference)"""
+    try:
+        with open(SIGNAL_PROFILES_PATH) as f:
+            stored = json.load(f)
+    except FileNotFoundError:
+        stored = {}
+    stored.setdefault('profiles', {})[name] = normalize_signal_profile(profile)
+    if metrics is not None:
+        stored.setdefault('metrics', {})[name] = metrics
+    tmp_path = f"{SIGNAL_PROFILES_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(stored, f, indent=2)
+    os.replace(tmp_path, SIGNAL_PROFILES_PATH)
+
+def set_signal_profile(name):
+    """Score with a named profile from now on ('default' = the module constants); False if unknown"""
+    if name == 'default':
+        profile = DEFAULT_SIGNAL_PROFILE
+    else:
+        stored = load_signal_profiles().get(name)
+        if stored is None:
+            print(f"⚠️ Unknown signal profile '{name}', keeping '{_signal_profile['name']}'")
+            return False
+        profile = normalize_signal_profile(stored)
+    _signal_profile.update(name=name, profile=profile)
+    print(f"🎛️ Signal profile: {name}")
+    return True
+
+def get_signal_profile():
+    """A copy of the profile signal scoring currently uses (changing it does not change scoring)"""
+    profile = _signal_profile['profile']
+    return dict(profile, weights=dict(profile['weights']))
+
+def get_signal_profile_name():
+    return _signal_profile['name']
+
+if os.environ.get('SIGNAL_PROFILE'):
+    set_signal_profile(os.environ['SIGNAL_PROFILE'])
 
 def calculate_normal_cdf(x, mu, sigma):
     """Calculate Cumulative Distribution Function (CDF) for Normal Distribution"""
     return 0.5 * (1 + math.erf((x - mu) / (sigma * math.sqrt(2))))
 
+# Concurrent history requests for the same (source, ticker, period) share one download
+_history_flight = SingleFlight('history-fetch')
+
+def _yahoo_history(ticker, period=None, start=None):
+    """Download daily history from Yahoo Finance (by period, or from a start date)"""
+    stock = yf.Ticker(ticker)
+    rate_limiter.acquire('yahoo')
+    if start is not None:
+        hist = stock.history(start=start)
+    else:
+        hist = stock.history(period=period)
+    if hist.empty:
+        return None
+    return hist
+
+def _download_history(ticker, period):
+    """Daily history via the local store: only bars newer than the stored ones are downloaded"""
+    return history_store.get_history(ticker, period, _yahoo_history)
+
 def fetch_historical_data(ticker, period="1y"):
     """Fetch historical data for technical analysis"""
     try:
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period=period)
-        if hist.empty:
-            return None
-        return hist
+        hist = _history_flight.do(('yahoo', ticker, period), _download_history, ticker, period)
+        # Shallow copy: callers may add derived columns, but the price columns stay
+        # read-only views over the memory-mapped store
+        return hist.copy(deep=False) if hist is not None else None
     except Exception as e:
         print(f"Error fetching history for {ticker}: {e}")
         return None
 
+# The calculate_* helpers below keep their signatures; the default periods come from the
+# shared indicator registry (indicators.py), other periods from the same primitives
+
 def calculate_rsi(data, period=14):
     """Calculate Relative Strength Index (RSI)"""
-    delta = data['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+    if period == 14:
+        return compute_indicators(data, ['rsi'])['rsi']
+    moves = compute_indicators(data, ['gain', 'loss'])
+    return relative_strength(moves['gain'], moves['loss'], period)
 
 def calculate_macd(data, fast=12, slow=26, signal=9):
     """Calculate MACD, Signal line, and Histogram"""
-    exp1 = data['Close'].ewm(span=fast, adjust=False).mean()
-    exp2 = data['Close'].ewm(span=slow, adjust=False).mean()
-    macd = exp1 - exp2
-    signal_line = macd.ewm(span=signal, adjust=False).mean()
-    histogram = macd - signal_line
-    return macd, signal_line, histogram
+    if (fast, slow, signal) == (12, 26, 9):
+        values = compute_indicators(data, ['macd', 'macd_signal', 'macd_hist'])
+        return values['macd'], values['macd_signal'], values['macd_hist']
+    macd = exponential_mean(data['Close'], fast) - exponential_mean(data['Close'], slow)
+    signal_line = exponential_mean(macd, signal)
+    return macd, signal_line, macd - signal_line
 
 def calculate_smas(data):
     """Calculate Simple Moving Averages (20, 50, 200)"""
-    sma20 = data['Close'].rolling(window=20).mean()
-    sma50 = data['Close'].rolling(window=50).mean()
-    sma200 = data['Close'].rolling(window=200).mean()
-    return sma20, sma50, sma200
+    values = compute_indicators(data, ['sma_20', 'sma_50', 'sma_200'])
+    return values['sma_20'], values['sma_50'], values['sma_200']
 
 def calculate_atr(data, period=14):
     """Calculate Average True Range (ATR)"""
-    high_low = data['High'] - data['Low']
-    high_close = np.abs(data['High'] - data['Close'].shift())
-    low_close = np.abs(data['Low'] - data['Close'].shift())
+    if period == 14:
+        return compute_indicators(data, ['atr'])['atr']
+    return rolling_mean(compute_indicators(data, ['true_range'])['true_range'], period)
+
+def classify_signal_score(signal_score, profile=None):
+    """Map a signal score to STRONG_BUY / BUY / HOLD / SELL / STRONG_SELL"""
+    profile = profile or get_signal_profile()
+    if signal_score >= profile['strong_signal_score']:
+        return "STRONG_BUY"
+    elif signal_score >= profile['signal_score']:
+        return "BUY"
+    elif signal_score <= -profile['strong_signal_score']:
+        return "STRONG_SELL"
+    elif signal_score <= -profile['signal_score']:
+        return "SELL"
+    return "HOLD"
+
+# --- Multi-ticker (panel) engine ---
+# Same indicators as above, computed for a whole universe at once on aligned
+# (dates x tickers) frames instead of one DataFrame pipeline per symbol.
+
+PANEL_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def index_nanoseconds(index):
+    """int64 UTC nanoseconds of a DatetimeIndex, whatever its resolution (pandas 2+ may use us/s)"""
+    return index.values.astype('datetime64[ns]').view('i8')
+
+def build_price_panel(histories):
+    """Align per-ticker OHLCV frames into {field: DataFrame(dates x tickers)}.
     
-    ranges = pd.concat([high_low, high_close, low_close], axis=1)
-    true_range = np.max(ranges, axis=1)
-    atr = true_range.rolling(window=period).mean()
-    return atr
+    Each field is a single float64 block (NaN where a ticker has no bar), so the
+    rolling/ewm passes below run over all tickers at once.
+    """
+    histories = {ticker: hist for ticker, hist in histories.items() if hist is not None and not hist.empty}
+    if not histories:
+        return None
+    
+    tickers = list(histories)
+    first_index = histories[tickers[0]].index
+    # Union of all bar timestamps in one sort (nanoseconds; UTC for tz-aware indexes)
+    stamps = {ticker: index_nanoseconds(hist.index) for ticker, hist in histories.items()}
+    all_stamps = np.unique(np.concatenate(list(stamps.values())))
+    dates = pd.DatetimeIndex(all_stamps.view('datetime64[ns]'))
+    if first_index.tz is not None:
+        dates = dates.tz_localize('UTC').tz_convert(first_index.tz)
+    
+    blocks = np.full((len(PANEL_FIELDS), len(all_stamps), len(tickers)), np.nan)
+    for column, ticker in enumerate(tickers):
+        rows = np.searchsorted(all_stamps, stamps[ticker])
+        hist = histories[ticker]
+        for i, field in enumerate(PANEL_FIELDS):
+            blocks[i, rows, column] = hist[field].to_numpy()
+    
+    return {
+        field: pd.DataFrame(blocks[i], index=dates, columns=tickers, copy=False)
+        for i, field in enumerate(PANEL_FIELDS)
+    }
 
-def calculate_enhanced_metrics(data, current_price, risk_profile='Medium'):
+def _rolling_mean_2d(values, window):
+    """Trailing mean down each column; NaN until a full window of bars (like rolling(window).mean())"""
+    out = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)
+        out[window - 1:] = windows.mean(axis=-1)
+    return out
+
+def _ewm_mean_2d(values, span):
+    """ewm(span, adjust=False).mean() down each column, including its handling of missing bars"""
+    alpha = 2.0 / (span + 1)
+    out = np.empty(values.shape)
+    weighted = values[0].copy()
+    old_weight = np.ones(values.shape[1])
+    out[0] = weighted
+    for i in range(1, len(values)):
+        current = values[i]
+        started = ~np.isnan(weighted)
+        observed = ~np.isnan(current)
+        old_weight = np.where(started, old_weight * (1 - alpha), old_weight)
+        update = started & observed
+        weighted = np.where(update, (old_weight * weighted + alpha * current) / (old_weight + alpha), weighted)
+        old_weight = np.where(update, 1.0, old_weight)
+        weighted = np.where(~started & observed, current, weighted)
+        out[i] = weighted
+    return out
+
+def compact_rows(listed):
+    """Row order per column that moves its own bars to the top (in date order) and its gaps below.
+    
+    A ticker is missing panel rows before its first bar and on days it did not trade (e.g. a
+    halt); windows must run over its own bars only, as they do on its own history.
     """
-    Calculate Enhanced Logic metrics (formerly KL) based on probability distribution
+    return np.argsort(~listed, axis=0, kind='stable')
+
+def compact(values, order):
+    """Each column's values in compact_rows order: bars first, then the gap rows"""
+    return np.take_along_axis(values, order, axis=0)
+
+def scatter(values, order, bars):
+    """Inverse of compact: back onto the panel rows, NaN on each column's gap rows"""
+    own_bar = np.arange(len(values))[:, None] < bars
+    out = np.full(values.shape, np.nan)
+    np.put_along_axis(out, order, np.where(own_bar, values, np.nan), axis=0)
+    return out
+
+def calculate_indicator_panel(panel):
+    """RSI, MACD, SMA20/50/200, ATR and 20-day average volume for every ticker column at once.
+    
+    Works on the raw (dates x tickers) arrays, each column compacted to that ticker's own
+    bars (see compact_rows), so each column matches what the single-ticker functions produce
+    for that ticker's history; rows where it has no bar stay NaN. Returns {name: 2-D array}
+    aligned with the panel.
     """
-    try:
-        # Calculate daily returns
-        data['Daily_Return'] = data['Close'].pct_change()
-        
-        # Calculate mu (average daily return) and sigma (volatility)
-        # Using last 30 days as per requirement
-        recent_data = data.tail(30)
-        mu = recent_data['Daily_Return'].mean()
-        sigma = recent_data['Daily_Return'].std()
-        
-        if pd.isna(mu) or pd.isna(sigma) or sigma == 0:
-            return None
-            
-        # Define targets to evaluate
-        targets = [0.02, 0.03, 0.04, 0.05] # 2%, 3%, 4%, 5%
-        
-        # Define allowed loss based on risk profile
-        # Low: 1%, Medium: 2%, High: 3% (Adjusted from spreadsheet's fixed 1%)
-        allowed_loss_map = {'Low': 0.01, 'Medium': 0.02, 'High': 0.03, 'Custom': 0.02}
-        allowed_loss = allowed_loss_map.get(risk_profile, 0.02)
-        
-        best_target = 0.03
-        max_expected_return = -float('inf')
-        
-        for target in targets:
-            # P(Target) = 1 - CDF(target) => Probability of reaching target
-            p_target = 1 - calculate_normal_cdf(target, mu, sigma)
-            
-            # P(Loss) = CDF(-allowed_loss) => Probability of falling below loss limit
-            p_loss = calculate_normal_cdf(-allowed_loss, mu, sigma)
-            
-            # Expected Return formula
-            expected_return = (p_target * target) - (p_loss * allowed_loss)
-            
-            if expected_return > max_expected_return:
-                max_expected_return = expected_return
-                best_target = target
-                
-        # Recommendation
-        recommendation = "BUY" if max_expected_return > 0 else "HOLD"
-        
-        # Suggested Entry: current * (1 - entryZ * sigma)
-        entry_z = 0.5
-        suggested_entry = current_price * (1 - (entry_z * sigma))
-        
-        # Stop Loss: 1% below suggested entry (or allowed_loss below?)
-        stop_loss = suggested_entry * (1 - allowed_loss)
+    listed = ~np.isnan(panel['Close'].to_numpy())
+    order = compact_rows(listed)
+    bars = listed.sum(axis=0)
+    close, high, low, volume = (compact(panel[field].to_numpy(), order) for field in ('Close', 'High', 'Low', 'Volume'))
+    listed = np.arange(len(close))[:, None] < bars
+    
+    previous_close = np.full(close.shape, np.nan)
+    previous_close[1:] = close[:-1]
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # RSI (calculate_rsi: the first diff counts as a zero move)
+        delta = close - previous_close
+        gain = np.where(listed, np.where(delta > 0, delta, 0.0), np.nan)
+        loss = np.where(listed, np.where(delta < 0, -delta, 0.0), np.nan)
+        rsi = 100 - (100 / (1 + _rolling_mean_2d(gain, 14) / _rolling_mean_2d(loss, 14)))
         
-        # Exit Price: Entry * (1 + best_target)
-        exit_price = suggested_entry * (1 + best_target)
+        # MACD
+        macd = _ewm_mean_2d(close, 12) - _ewm_mean_2d(close, 26)
+        macd_signal = _ewm_mean_2d(macd, 9)
         
+        # ATR (true range ignores the missing previous close on a ticker's first bar)
+        true_range = np.fmax(np.fmax(high - low, np.abs(high - previous_close)), np.abs(low - previous_close))
+        atr = _rolling_mean_2d(true_range, 14)
+    
+    indicators = {
+        'rsi': rsi,
+        'macd': macd,
+        'macd_signal': macd_signal,
+        'macd_hist': macd - macd_signal,
+        'sma_20': _rolling_mean_2d(close, 20),
+        'sma_50': _rolling_mean_2d(close, 50),
+        'sma_200': _rolling_mean_2d(close, 200),
+        'atr': atr,
+        'avg_volume': _rolling_mean_2d(volume, 20)
+    }
+    return {name: scatter(values, order, bars) for name, values in indicators.items()}
+
+def latest_indicator_table(panel, indicators):
+    """One row per ticker with the values at that ticker's last bar"""
+    close = panel['Close'].to_numpy()
+    listed = ~np.isnan(close)
+    # Position of each ticker's last bar (tickers may stop trading before the panel ends)
+    last_rows = len(close) - 1 - listed[::-1].argmax(axis=0)
+    columns = np.arange(close.shape[1])
+    
+    table = pd.DataFrame({name: values[last_rows, columns] for name, values in indicators.items()},
+                         index=panel['Close'].columns)
+    table['current_price'] = close[last_rows, columns]
+    table['volume'] = panel['Volume'].to_numpy()[last_rows, columns]
+    table['bars'] = listed.sum(axis=0)
+    avg_volume = table['avg_volume']
+    table['volume_ratio'] = np.where(avg_volume > 0, table['volume'] / avg_volume.where(avg_volume > 0, 1), 1.0)
+    return table
+
+def signal_score_array(rsi, ma20, ma50, macd, macd_signal, volume_ratio, atr, price, profile=None):
+    """analyze_stock's signal_score rules on arrays of any (broadcastable) shape"""
+    profile = profile or get_signal_profile()
+    weights = profile['weights']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = np.zeros(np.broadcast(rsi, ma20, ma50, macd, macd_signal, volume_ratio, atr, price).shape)
+        score += np.where(rsi < profile['rsi_oversold'], weights['rsi'], 0)
+        score -= np.where(rsi > profile['rsi_overbought'], weights['rsi'], 0)
+        score += np.where(ma20 > ma50, weights['trend'], 0)
+        score -= np.where(ma20 < ma50, weights['trend'], 0)
+        score += np.where(macd > macd_signal, weights['macd'], -weights['macd'])
+        # High volume confirms whichever direction the score already points
+        score += np.where(volume_ratio > profile['high_volume_ratio'],
+                          np.where(score > 0, weights['volume'], -weights['volume']), 0)
+        score += np.where((atr > 0) & (atr / price < profile['low_volatility']), weights['volatility'], 0)
+    return score
+
+def classify_signal_array(score, profile=None):
+    """classify_signal_score for an array of scores"""
+    profile = profile or get_signal_profile()
+    strong, signal = profile['strong_signal_score'], profile['signal_score']
+    return np.select(
+        [score >= strong, score >= signal, score <= -strong, score <= -signal],
+        ['STRONG_BUY', 'BUY', 'STRONG_SELL', 'SELL'],
+        default='HOLD'
+    )
+
+def score_indicator_table(table):
+    """Vectorized version of analyze_stock's scoring: adds signal_score, signal and confidence"""
+    score = signal_score_array(
+        table['rsi'].to_numpy(), table['sma_20'].to_numpy(), table['sma_50'].to_numpy(),
+        table['macd'].to_numpy(), table['macd_signal'].to_numpy(), table['volume_ratio'].to_numpy(),
+        table['atr'].to_numpy(), table['current_price'].to_numpy()
+    )
+    
+    scored = table.copy()
+    scored['signal_score'] = score.astype(int)
+    scored['signal'] = classify_signal_array(score)
+    scored['confidence'] = np.minimum(95, 50 + np.abs(score) / 2)
+    return scored
+
+def analyze_universe(histories):
+    """Score every ticker in {ticker: OHLCV frame} in one pass.
+    
+    Returns {ticker: dict} with the same indicator/signal keys analyze_stock reports
+    (tickers with fewer than MIN_HISTORY_BARS bars are left out).
+    """
+    panel = build_price_panel(histories)
+    if panel is None:
+        return {}
+    
+    table = score_indicator_table(latest_indicator_table(panel, calculate_indicator_panel(panel)))
+    table = table[table['bars'] >= MIN_HISTORY_BARS]
+    
+    results = {}
+    for ticker, row in table.to_dict('index').items():
+        price = row['current_price']
+        results[ticker] = {
+            'symbol': ticker,
+            'current_price': round(price, 2),
+            'rsi': round(row['rsi'], 2),
+            'macd': round(row['macd'], 2),
+            'macd_signal': round(row['macd_signal'], 2),
+            'sma_20': round(row['sma_20'], 2),
+            'sma_50': round(row['sma_50'], 2),
+            'sma_200': round(row['sma_200'], 2) if row['bars'] >= 200 else None,
+            'atr': round(row['atr'], 2),
+            'volatility': round(row['atr'] / price, 4),
+            'volume_ratio': round(row['volume_ratio'], 2),
+            'signal': row['signal'],
+            'signal_score': int(row['signal_score']),
+            'confidence': round(row['confidence'], 1)
+        }
+    return results
+
+# --- Incremental (streaming) indicators ---
+# O(1) per-bar state for the same indicators, so a new bar or a live tick does not
+# re-run rolling windows over the whole year. Completed bars are folded in with
+# update(); the still-forming bar (latest stored bar or a live tick) is evaluated
+# with preview(), which leaves the state untouched.
+
+INDICATOR_STATE_VERSION = 1
+
+def _nan_if_none(value):
+    return float('nan') if value is None else value
+
+class RollingMean:
+    """Trailing mean over `window` values (running sum, re-summed exactly once per window to stop drift)"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self._since_resum = 0
+
+    def update(self, value):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        self._since_resum += 1
+        if self._since_resum >= self.window:
+            self.total = math.fsum(self.values)
+            self._since_resum = 0
+
+    def _mean(self, total, count):
+        return total / self.window if count >= self.window else float('nan')
+
+    @property
+    def value(self):
+        return self._mean(self.total, len(self.values))
+
+    def preview(self, value):
+        """Mean if `value` were the next element"""
+        full = len(self.values) == self.window
+        total = self.total - (self.values[0] if full else 0.0) + value
+        return self._mean(total, min(len(self.values) + 1, self.window))
+
+    def to_dict(self):
+        return {'window': self.window, 'values': list(self.values)}
+
+    @classmethod
+    def from_dict(cls, state):
+        rolling = cls(state['window'])
+        for value in state['values']:
+            rolling.values.append(value)
+        rolling.total = math.fsum(rolling.values)
+        return rolling
+
+class ExponentialMean:
+    """ewm(span, adjust=False).mean() one value at a time"""
+
+    def __init__(self, span, value=None):
+        self.span = span
+        self.alpha = 2.0 / (span + 1)
+        self.value = value
+
+    def preview(self, value):
+        if self.value is None:
+            return value
+        return (1 - self.alpha) * self.value + self.alpha * value
+
+    def update(self, value):
+        self.value = self.preview(value)
+
+    def to_dict(self):
+        return {'span': self.span, 'value': self.value}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state['span'], state['value'])
+
+class IncrementalRSI:
+    """calculate_rsi as running 14-bar means of gains and losses"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.previous_close = None
+        self.gains = RollingMean(period)
+        self.losses = RollingMean(period)
+
+    def _moves(self, close):
+        # The first bar counts as a zero move, as in calculate_rsi
+        delta = 0.0 if self.previous_close is None else close - self.previous_close
+        return max(delta, 0.0), max(-delta, 0.0)
+
+    @staticmethod
+    def _rsi(gain, loss):
+        if loss == 0:
+            return 100.0 if gain > 0 else float('nan')
+        return 100 - (100 / (1 + gain / loss))
+
+    def update(self, close):
+        gain, loss = self._moves(close)
+        self.gains.update(gain)
+        self.losses.update(loss)
+        self.previous_close = close
+
+    @property
+    def value(self):
+        return self._rsi(self.gains.value, self.losses.value)
+
+    def preview(self, close):
+        gain, loss = self._moves(close)
+        return self._rsi(self.gains.preview(gain), self.losses.preview(loss))
+
+    def to_dict(self):
+        return {'period': self.period, 'previous_close': self.previous_close,
+                'gains': self.gains.to_dict(), 'losses': self.losses.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state):
+        rsi = cls(state['period'])
+        rsi.previous_close = state['previous_close']
+        rsi.gains = RollingMean.from_dict(state['gains'])
+        rsi.losses = RollingMean.from_dict(state['losses'])
+        return rsi
+
+class IncrementalMACD:
+    """calculate_macd: fast/slow EMAs of the close and an EMA of their difference"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = ExponentialMean(fast)
+        self.slow = ExponentialMean(slow)
+        self.signal = ExponentialMean(signal)
+
+    def update(self, close):
+        self.fast.update(close)
+        self.slow.update(close)
+        self.signal.update(self.fast.value - self.slow.value)
+
+    def preview(self, close):
+        """(macd, signal, histogram) if `close` were the next bar"""
+        macd = self.fast.preview(close) - self.slow.preview(close)
+        signal = self.signal.preview(macd)
+        return macd, signal, macd - signal
+
+    def to_dict(self):
+        return {'fast': self.fast.to_dict(), 'slow': self.slow.to_dict(), 'signal': self.signal.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state):
+        macd = cls()
+        macd.fast = ExponentialMean.from_dict(state['fast'])
+        macd.slow = ExponentialMean.from_dict(state['slow'])
+        macd.signal = ExponentialMean.from_dict(state['signal'])
+        return macd
+
+class IncrementalATR:
+    """calculate_atr: 14-bar mean of the true range"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.previous_close = None
+        self.ranges = RollingMean(period)
+
+    def _true_range(self, high, low):
+        if self.previous_close is None:
+            return high - low
+        return max(high - low, abs(high - self.previous_close), abs(low - self.previous_close))
+
+    def update(self, high, low, close):
+        self.ranges.update(self._true_range(high, low))
+        self.previous_close = close
+
+    def preview(self, high, low):
+        return self.ranges.preview(self._true_range(high, low))
+
+    def to_dict(self):
+        return {'period': self.period, 'previous_close': self.previous_close, 'ranges': self.ranges.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state):
+        atr = cls(state['period'])
+        atr.previous_close = state['previous_close']
+        atr.ranges = RollingMean.from_dict(state['ranges'])
+        return atr
+
+class IndicatorState:
+    """All of a ticker's indicators, advanced one completed daily bar at a time.
+
+    last_bar is the UTC nanosecond timestamp of the newest bar folded in and last_close
+    its close, used to detect when the stored history was rewritten (dividend/split).
+    """
+
+    def __init__(self):
+        self.rsi = IncrementalRSI()
+        self.macd = IncrementalMACD()
+        self.sma_20 = RollingMean(20)
+        self.sma_50 = RollingMean(50)
+        self.sma_200 = RollingMean(200)
+        self.atr = IncrementalATR()
+        self.avg_volume = RollingMean(20)
+        self.bars = 0
+        self.last_bar = None
+        self.last_close = None
+
+    def update(self, timestamp, high, low, close, volume):
+        """Fold in one completed bar"""
+        self.rsi.update(close)
+        self.macd.update(close)
+        self.sma_20.update(close)
+        self.sma_50.update(close)
+        self.sma_200.update(close)
+        self.atr.update(high, low, close)
+        self.avg_volume.update(volume)
+        self.bars += 1
+        self.last_bar = int(timestamp)
+        self.last_close = close
+
+    def extend(self, hist, start=0, stop=None):
+        """Fold in hist rows [start, stop) (their timestamps must be newer than last_bar)"""
+        stamps = index_nanoseconds(hist.index)
+        high = hist['High'].to_numpy()
+        low = hist['Low'].to_numpy()
+        close = hist['Close'].to_numpy()
+        volume = hist['Volume'].to_numpy()
+        for i in range(start, len(hist) if stop is None else stop):
+            self.update(stamps[i], float(high[i]), float(low[i]), float(close[i]), float(volume[i]))
+        return self
+
+    def preview(self, high, low, close, volume):
+        """Indicator values with the forming bar appended (same keys as latest_indicator_table)"""
+        macd, macd_signal, macd_hist = self.macd.preview(close)
+        avg_volume = self.avg_volume.preview(volume)
         return {
-            'mu': mu,
-            'sigma': sigma,
-            'best_target_pct': best_target,
-            'expected_return': max_expected_return,
-            'recommendation': recommendation,
-            'suggested_entry': suggested_entry,
-            'stop_loss': stop_loss,
-            'exit_price': exit_price,
-            'risk_profile': risk_profile
+            'rsi': self.rsi.preview(close),
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_hist': macd_hist,
+            'sma_20': self.sma_20.preview(close),
+            'sma_50': self.sma_50.preview(close),
+            'sma_200': self.sma_200.preview(close),
+            'atr': self.atr.preview(high, low),
+            'avg_volume': avg_volume,
+            'current_price': close,
+            'volume': volume,
+            'bars': self.bars + 1,
+            'volume_ratio': volume / avg_volume if avg_volume > 0 else 1.0
         }
-        
+
+    def to_dict(self):
+        return {
+            'version': INDICATOR_STATE_VERSION,
+            'bars': self.bars,
+            'last_bar': self.last_bar,
+            'last_close': self.last_close,
+            'rsi': self.rsi.to_dict(),
+            'macd': self.macd.to_dict(),
+            'sma_20': self.sma_20.to_dict(),
+            'sma_50': self.sma_50.to_dict(),
+            'sma_200': self.sma_200.to_dict(),
+            'atr': self.atr.to_dict(),
+            'avg_volume': self.avg_volume.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuild from to_dict() output; None if it was written by another version"""
+        if not state or state.get('version') != INDICATOR_STATE_VERSION:
+            return None
+        indicators = cls()
+        indicators.rsi = IncrementalRSI.from_dict(state['rsi'])
+        indicators.macd = IncrementalMACD.from_dict(state['macd'])
+        indicators.sma_20 = RollingMean.from_dict(state['sma_20'])
+        indicators.sma_50 = RollingMean.from_dict(state['sma_50'])
+        indicators.sma_200 = RollingMean.from_dict(state['sma_200'])
+        indicators.atr = IncrementalATR.from_dict(state['atr'])
+        indicators.avg_volume = RollingMean.from_dict(state['avg_volume'])
+        indicators.bars = state['bars']
+        indicators.last_bar = state['last_bar']
+        indicators.last_close = state['last_close']
+        return indicators
+
+# ticker -> IndicatorState covering every stored bar except the latest (still-forming) one
+_indicator_states = {}
+_indicator_states_lock = threading.Lock()
+
+def _advance_indicator_state(state, hist, completed):
+    """Bring state up to bar `completed` - 1 of hist; None if the history no longer matches it"""
+    stamps = index_nanoseconds(hist.index)[:completed]
+    if state.last_bar is None:
+        return None
+    position = int(np.searchsorted(stamps, state.last_bar))
+    if position >= len(stamps) or stamps[position] != state.last_bar:
+        return None
+    stored_close = float(hist['Close'].to_numpy()[position])
+    if abs(stored_close - state.last_close) > history_store.ADJUSTMENT_TOLERANCE * abs(state.last_close):
+        return None
+    if position + 1 == completed:
+        return state
+    return state.extend(hist, position + 1, completed)
+
+def _caught_up_state(ticker, hist):
+    """Cached/persisted state advanced to all but hist's latest bar (caller holds _indicator_states_lock)"""
+    completed = len(hist) - 1
+    state = _indicator_states.get(ticker)
+    if state is None:
+        state = IndicatorState.from_dict(history_store.load_state(ticker, 'indicators'))
+
+    bars_before = state.bars if state is not None else None
+    advanced = _advance_indicator_state(state, hist, completed) if state is not None else None
+    if advanced is None:
+        # Rebuild from the whole store when hist is a slice of it (e.g. a request's 1y window)
+        stored = history_store.load_history(ticker)
+        if stored is not None and len(stored) > len(hist) and stored.index[-1] == hist.index[-1]:
+            hist, completed = stored, len(stored) - 1
+        advanced = IndicatorState().extend(hist, 0, completed)
+        if state is not None and advanced.bars < state.bars:
+            # hist is shorter or older than what the saved state was built from: serve this
+            # call from the rebuilt state, but keep (and keep persisted) the longer one
+            return advanced
+    if advanced.bars != bars_before:
+        history_store.save_state(ticker, 'indicators', advanced.to_dict())
+    _indicator_states[ticker] = advanced
+    return advanced
+
+def get_indicator_state(ticker, hist=None):
+    """Incremental indicator state for a ticker, caught up with its stored history.
+
+    Uses the in-process copy, else the one persisted next to the history store, and only
+    folds in bars added since; rebuilds from the full history if that was rewritten.
+    The latest stored bar is left out (it may still be forming); returns None without
+    enough history.
+    """
+    hist = hist if hist is not None else history_store.load_history(ticker)
+    if hist is None or len(hist) < 2:
+        return None
+    with _indicator_states_lock:
+        return _caught_up_state(ticker, hist)
+
+def live_indicators(ticker, price, volume=None, high=None, low=None, hist=None):
+    """Indicator values with a live tick applied to the ticker's latest stored bar.
+
+    High/low widen that bar's range to include the tick (or take the given values);
+    volume defaults to the stored bar's. Only O(1) work once the state is cached.
+    """
+    hist = hist if hist is not None else history_store.load_history(ticker)
+    if hist is None or len(hist) < 2:
+        return None
+    high = max(float(hist['High'].to_numpy()[-1]), price) if high is None else high
+    low = min(float(hist['Low'].to_numpy()[-1]), price) if low is None else low
+    volume = float(hist['Volume'].to_numpy()[-1]) if volume is None else volume
+    with _indicator_states_lock:
+        return _caught_up_state(ticker, hist).preview(high, low, price, volume)
+
+# --- Enhanced Logic probability engine ---
+# Expected return of each profit target against the allowed loss, from a normal model of
+# recent daily returns; evaluated as one (tickers x allowed losses x targets) array.
+
+ENHANCED_TARGETS = (0.02, 0.03, 0.04, 0.05)  # 2%, 3%, 4%, 5%
+# Low: 1%, Medium: 2%, High: 3% (Adjusted from spreadsheet's fixed 1%)
+ALLOWED_LOSS = {'Low': 0.01, 'Medium': 0.02, 'High': 0.03, 'Custom': 0.02}
+ENHANCED_LOOKBACK = 30  # Using last 30 days as per requirement
+ENTRY_Z = 0.5
+
+if _scipy_erf is not None:
+    erf = _scipy_erf
+else:
+    _math_erf = np.frompyfunc(math.erf, 1, 1)
+
+    def erf(z):
+        """math.erf elementwise (the surface is only tickers x losses x targets)"""
+        return np.asarray(_math_erf(z), dtype=float)
+
+def normal_cdf(x, mu, sigma):
+    """Vectorized normal CDF (broadcasts like numpy; exact erf, as calculate_normal_cdf)"""
+    z = (np.asarray(x, dtype=float) - mu) / (sigma * math.sqrt(2))
+    return 0.5 * (1 + erf(z))
+
+def return_moments(data, lookback=ENHANCED_LOOKBACK):
+    """(mu, sigma) of the last `lookback` daily returns, without touching the caller's frame"""
+    closes = data['Close'].to_numpy(dtype=float)[-(lookback + 1):]
+    if len(closes) < 3:
+        return float('nan'), float('nan')
+    returns = closes[1:] / closes[:-1] - 1
+    returns = returns[~np.isnan(returns)]
+    if len(returns) < 2:
+        return float('nan'), float('nan')
+    return float(returns.mean()), float(returns.std(ddof=1))
+
+def expected_return_surface(mu, sigma, targets=ENHANCED_TARGETS, allowed_losses=tuple(ALLOWED_LOSS.values())):
+    """Expected return for every ticker x allowed loss x target, shape (len(mu), len(losses), len(targets)).
+    
+    E = P(reach target) * target - P(fall below -loss) * loss; P(loss) is computed once per
+    (ticker, loss) and broadcast across the targets.
+    """
+    mu = np.asarray(mu, dtype=float)[:, None, None]
+    sigma = np.asarray(sigma, dtype=float)[:, None, None]
+    targets = np.asarray(targets, dtype=float)[None, None, :]
+    losses = np.asarray(allowed_losses, dtype=float)[None, :, None]
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p_target = 1 - normal_cdf(targets, mu, sigma)
+        p_loss = normal_cdf(-losses, mu, sigma)
+    return p_target * targets - p_loss * losses
+
+def calculate_enhanced_metrics_batch(histories, current_prices=None, risk_profiles=tuple(ALLOWED_LOSS)):
+    """Enhanced Logic metrics for every ticker and risk profile in one surface evaluation.
+    
+    histories is {ticker: OHLCV frame}; current_prices defaults to each last close.
+    Returns {ticker: {risk_profile: metrics or None}}.
+    """
+    tickers = [ticker for ticker, hist in histories.items() if hist is not None and not hist.empty]
+    if not tickers:
+        return {}
+    
+    moments = np.array([return_moments(histories[ticker]) for ticker in tickers]).reshape(-1, 2)
+    mu, sigma = moments[:, 0], moments[:, 1]
+    prices = np.array([
+        float(current_prices[ticker]) if current_prices and ticker in current_prices
+        else float(histories[ticker]['Close'].iloc[-1])
+        for ticker in tickers
+    ])
+    
+    losses = [ALLOWED_LOSS.get(profile, ALLOWED_LOSS['Medium']) for profile in risk_profiles]
+    surface = expected_return_surface(mu, sigma, allowed_losses=losses)
+    best = surface.argmax(axis=2)  # First target wins ties
+    best_return = np.take_along_axis(surface, best[..., None], axis=2)[..., 0]
+    best_target = np.asarray(ENHANCED_TARGETS)[best]
+    
+    # Suggested Entry: current * (1 - entryZ * sigma)
+    entry = prices * (1 - ENTRY_Z * sigma)
+    valid = ~np.isnan(mu) & ~np.isnan(sigma) & (sigma != 0)
+    
+    results = {}
+    for i, ticker in enumerate(tickers):
+        metrics = {}
+        for j, profile in enumerate(risk_profiles):
+            if not valid[i]:
+                metrics[profile] = None
+                continue
+            metrics[profile] = {
+                'mu': float(mu[i]),
+                'sigma': float(sigma[i]),
+                'best_target_pct': float(best_target[i, j]),
+                'expected_return': float(best_return[i, j]),
+                'recommendation': "BUY" if best_return[i, j] > 0 else "HOLD",
+                'suggested_entry': float(entry[i]),
+                # Stop Loss: allowed loss below suggested entry; Exit: entry * (1 + best target)
+                'stop_loss': float(entry[i] * (1 - losses[j])),
+                'exit_price': float(entry[i] * (1 + best_target[i, j])),
+                'risk_profile': profile
+            }
+        results[ticker] = metrics
+    return results
+
+def calculate_enhanced_metrics(data, current_price, risk_profile='Medium'):
+    """
+    Calculate Enhanced Logic metrics (formerly KL) based on probability distribution
+    """
+    try:
+        metrics = calculate_enhanced_metrics_batch({'_': data}, {'_': current_price}, (risk_profile,))
+        return metrics.get('_', {}).get(risk_profile)
     except Exception as e:
         print(f"Error calculating Enhanced metrics: {e}")
         return None
 
-def analyze_stock(ticker, current_data=None, risk_profile='Medium'):
+ANALYZE_INDICATORS = ['rsi', 'macd', 'macd_signal', 'sma_20', 'sma_50', 'atr', 'volume_ratio']
+
+def analyze_stock(ticker, current_data=None, risk_profile='Medium', context=None):
     """
     Perform comprehensive technical analysis on a stock.
-    Returns a dictionary with indicators and signals.
+    Returns a dictionary with indicators and signals; entry/stop/exit levels are included
+    for risk_profile and, under 'risk_profiles', for every risk profile.
+    Pass a MarketDataContext to reuse history already loaded for the request.
     """
     try:
         # Fetch historical data
-        hist = fetch_historical_data(ticker)
-        if hist is None or len(hist) < 50: # Need at least 50 days for SMA50
+        hist = context.history() if context is not None else fetch_historical_data(ticker)
+        if hist is None or len(hist) < MIN_HISTORY_BARS:
             return None
             
-        # Calculate indicators
-        rsi_series = calculate_rsi(hist)
-        macd, macd_signal, macd_hist = calculate_macd(hist)
-        sma20, sma50, sma200 = calculate_smas(hist)
-        atr_series = calculate_atr(hist)
-        
-        # Get latest values
-        current_price = hist['Close'].iloc[-1]
-        rsi = rsi_series.iloc[-1]
-        macd_val = macd.iloc[-1]
-        macd_sig = macd_signal.iloc[-1]
-        macd_h = macd_hist.iloc[-1]
-        ma20 = sma20.iloc[-1]
-        ma50 = sma50.iloc[-1]
-        ma200 = sma200.iloc[-1] if len(hist) >= 200 else None
-        atr = atr_series.iloc[-1]
-        
-        # Volume analysis
-        current_volume = hist['Volume'].iloc[-1]
-        avg_volume = hist['Volume'].rolling(window=20).mean().iloc[-1]
-        volume_ratio = current_volume / avg_volume if avg_volume > 0 else 1.0
+        # A live quote (current_data) is applied to the latest bar as a tick on the incremental
+        # indicator state, O(1) once the state is cached; otherwise the stored bars are used as-is
+        live_price = (current_data or {}).get('current_price')
+        live = live_indicators(ticker, float(live_price), hist=hist) if live_price and live_price > 0 else None
+        if live is not None:
+            current_price = live['current_price']
+            rsi, macd_val, macd_sig = live['rsi'], live['macd'], live['macd_signal']
+            ma20, ma50, atr = live['sma_20'], live['sma_50'], live['atr']
+            volume_ratio = live['volume_ratio']
+        else:
+            # Calculate indicators (one planned pass, cached until the ticker's next bar)
+            indicators = compute_indicators(hist, ANALYZE_INDICATORS, ticker=ticker)
+            
+            # Get latest values
+            current_price = hist['Close'].iloc[-1]
+            rsi = indicators['rsi'].iloc[-1]
+            macd_val = indicators['macd'].iloc[-1]
+            macd_sig = indicators['macd_signal'].iloc[-1]
+            ma20 = indicators['sma_20'].iloc[-1]
+            ma50 = indicators['sma_50'].iloc[-1]
+            atr = indicators['atr'].iloc[-1]
+            
+            # Volume analysis
+            volume_ratio = indicators['volume_ratio'].iloc[-1]
         
         # Support/Resistance (Simple 20-day high/low)
         recent_high = hist['High'].tail(20).max()
         recent_low = hist['Low'].tail(20).min()
         
         # --- Signal Generation Logic (Enhanced) ---
+        profile = get_signal_profile()
+        weights = profile['weights']
         signal_score = 0
         factors = []
         
         # 1. RSI Analysis (40% weight)
-        if rsi < 30:
-            signal_score += 40
+        if rsi < profile['rsi_oversold']:
+            signal_score += weights['rsi']
             factors.append(f"RSI ({rsi:.1f}) oversold")
-        elif rsi > 70:
-            signal_score -= 40
+        elif rsi > profile['rsi_overbought']:
+            signal_score -= weights['rsi']
             factors.append(f"RSI ({rsi:.1f}) overbought")
         else:
             factors.append(f"RSI ({rsi:.1f}) neutral")
             
         # 2. Moving Average Analysis (25% weight)
         if ma20 > ma50:
-            signal_score += 25
+            signal_score += weights['trend']
             factors.append("Price above MAs (bullish trend)")
         elif ma20 < ma50:
-            signal_score -= 25
+            signal_score -= weights['trend']
             factors.append("Price below MAs (bearish trend)")
             
         # 3. MACD Analysis (20% weight)
         if macd_val > macd_sig:
-            signal_score += 20
+            signal_score += weights['macd']
             factors.append("MACD bullish crossover")
         else:
-            signal_score -= 20
+            signal_score -= weights['macd']
             factors.append("MACD bearish crossover")
             
         # 4. Volume Analysis (10% weight)
-        if volume_ratio > 1.5:
+        if volume_ratio > profile['high_volume_ratio']:
             if signal_score > 0:
-                signal_score += 10
+                signal_score += weights['volume']
                 factors.append(f"High volume ({volume_ratio:.1f}x) confirms buy")
             else:
-                signal_score -= 10
+                signal_score -= weights['volume']
                 factors.append(f"High volume ({volume_ratio:.1f}x) confirms sell")
                 
         # 5. ATR/Volatility (5% weight)
-        if atr > 0 and (atr / current_price) < 0.02: # Low volatility
-            signal_score += 5
+        if atr > 0 and (atr / current_price) < profile['low_volatility']: # Low volatility
+            signal_score += weights['volatility']
             factors.append("Low volatility (stable)")
             
         # Determine Final Signal
-        if signal_score >= 60:
-            signal = "STRONG_BUY"
-        elif signal_score >= 20:
-            signal = "BUY"
-        elif signal_score <= -60:
-            signal = "STRONG_SELL"
-        elif signal_score <= -20:
-            signal = "SELL"
-        else:
-            signal = "HOLD"
+        signal = classify_signal_score(signal_score, profile)
             
         # Calculate Confidence
         confidence = min(95, 50 + abs(signal_score) / 2)
         
         # --- Enhanced Logic Integration ---
-        enhanced_metrics = calculate_enhanced_metrics(hist, current_price, risk_profile)
-        
-        # Merge Enhanced logic if available
-        enhanced_recommendation = "HOLD"
-        enhanced_entry = current_price
-        enhanced_stop = current_price * 0.95
-        enhanced_exit = current_price * 1.05
-        
-        if enhanced_metrics:
-            enhanced_recommendation = enhanced_metrics['recommendation']
-            enhanced_entry = enhanced_metrics['suggested_entry']
-            enhanced_stop = enhanced_metrics['stop_loss']
-            enhanced_exit = enhanced_metrics['exit_price']
+        # Every risk profile from one surface evaluation; only this tail differs between profiles
+        enhanced_by_profile = calculate_enhanced_metrics_batch({ticker: hist}, {ticker: current_price}).get(ticker, {})
+        risk_profiles = {}
+        for risk_name in ALLOWED_LOSS:
+            enhanced_metrics = enhanced_by_profile.get(risk_name)
+            # Merge Enhanced logic if available
+            risk_profiles[risk_name] = {
+                'enhanced_recommendation': enhanced_metrics['recommendation'] if enhanced_metrics else "HOLD",
+                'enhanced_entry': round(enhanced_metrics['suggested_entry'] if enhanced_metrics else current_price, 2),
+                'enhanced_stop': round(enhanced_metrics['stop_loss'] if enhanced_metrics else current_price * 0.95, 2),
+                'enhanced_exit': round(enhanced_metrics['exit_price'] if enhanced_metrics else current_price * 1.05, 2)
+            }
+        selected = risk_profiles.get(risk_profile, risk_profiles['Medium'])
             
         return {
             'symbol': ticker,
@@ -256,11 +991,9 @@ def analyze_stock(ticker, current_data=None, risk_profile='Medium'):
             'signal_score': signal_score,
             'signal_factors': factors,
             'confidence': round(confidence, 1),
-            # Enhanced Metrics
-            'enhanced_recommendation': enhanced_recommendation,
-            'enhanced_entry': round(enhanced_entry, 2),
-            'enhanced_stop': round(enhanced_stop, 2),
-            'enhanced_exit': round(enhanced_exit, 2),
+            # Enhanced Metrics (for risk_profile; risk_profiles has them for every profile)
+            **selected,
+            'risk_profiles': risk_profiles,
             'historical_data': {
                 'dates': hist.index.strftime('%Y-%m-%d').tolist(),
                 'prices': hist['Close'].tolist(),
@@ -0,0 +1,110 @@
+import os
+import tempfile
+from unittest import mock
+import app
+from response_cache import StaleWhileRevalidate
+import snapshot_store
+
+def test_batch_signals_accepts_lowercase_risk():
+    print("🔍 Testing /api/v1/signals/batch risk profile handling")
+    print("=" * 60)
+
+    calls = []
+    fake_batch = lambda symbols, risk_profile: calls.append(risk_profile) or {
+        symbol: {'symbol': symbol, 'success': True} for symbol in symbols
+    }
+    with mock.patch.object(app, 'compute_batch_signals', fake_batch):
+        client = app.app.test_client()
+        # 'Analyze All' sends the radio id without 'Risk': low / medium / high / custom
+        for sent, expected in [('low', 'Low'), ('medium', 'Medium'), (' HIGH ', 'High'), ('Custom', 'Custom')]:
+            response = client.post('/api/v1/signals/batch', json={'tickers': ['RELIANCE'], 'risk_profile': sent})
+            assert response.status_code == 200, f"{sent!r}: {response.status_code}"
+            assert response.get_json()['risk_profile'] == expected
+        assert calls == ['Low', 'Medium', 'High', 'Custom']
+
+        response = client.post('/api/v1/signals/batch', json={'tickers': ['RELIANCE'], 'risk_profile': 'extreme'})
+        assert response.status_code == 400
+
+    print("✅ Lowercase risk profiles are accepted, unknown ones rejected")
+
+def test_top_stocks_rejects_unknown_source():
+    print("🔍 Testing /get_top_20_stocks source validation")
+    print("=" * 60)
+
+    requested = []
+    fake_get = lambda key, *args, **kwargs: requested.append(key) or (None, 'warming', None)
+    with mock.patch.object(app._top_stocks, 'get', fake_get):
+        client = app.app.test_client()
+        response = client.get('/get_top_20_stocks?source=not-a-source')
+        assert response.status_code == 400
+        assert response.get_json()['available_sources'] == app.AVAILABLE_SOURCES
+        assert requested == [], "an unknown source reached the cache"
+
+        assert client.get('/get_top_20_stocks?source=google').status_code == 200
+        assert requested == ['google']
+
+    print("✅ Unknown sources are rejected before they can create cache entries")
+
+def test_snapshot_names_are_sanitised():
+    print("🔍 Testing top-stock snapshot persistence and file names")
+    print("=" * 60)
+
+    with mock.patch.object(snapshot_store, 'SNAPSHOT_DIR', tempfile.mkdtemp()):
+        app._persist_top_stocks('../../elsewhere', [{'symbol': 'X'}], 0)
+        assert os.listdir(snapshot_store.SNAPSHOT_DIR) == [], "an unknown source was persisted"
+        app._persist_top_stocks('yahoo', [{'symbol': 'X'}], 0)
+        assert os.listdir(snapshot_store.SNAPSHOT_DIR) == ['top_stocks_yahoo.json.gz']
+
+        for name in ['../../etc/passwd', 'a b\x00c', '..']:
+            path = snapshot_store._snapshot_path(name)
+            assert os.path.dirname(path) == snapshot_store.SNAPSHOT_DIR, path
+            assert not os.path.basename(path).startswith('.'), path
+
+    print("✅ Only known sources are persisted, under whitelisted file names")
+
+def test_stream_keeps_last_good_signals():
+    print("🔍 Testing that an all-fallback stream does not replace the cached signals")
+    print("=" * 60)
+
+    good = [{'success': True, 'symbol': 'GOOD.NS', 'signal': 'BUY', 'signal_basis': 'technical'}]
+    fallback = [{'success': True, 'symbol': 'RELIANCE.NS', 'signal': 'HOLD', 'signal_basis': 'price_change'},
+                {'success': False, 'symbol': 'TCS.NS', 'signal': 'HOLD', 'signal_basis': 'fallback'}]
+    persisted = []
+    signals_cache = StaleWhileRevalidate('test-signals', lambda: None)
+    top_stocks = StaleWhileRevalidate('test-top', lambda source: None)
+    top_stocks.seed(app.DEFAULT_DATA_SOURCE, [{'symbol': 'RELIANCE.NS'}])
+
+    with mock.patch.object(app, '_all_signals', signals_cache), \
+            mock.patch.object(app, '_top_stocks', top_stocks), \
+            mock.patch.object(app, 'iter_all_signals', lambda stocks: iter(fallback)), \
+            mock.patch.object(app, '_persist_all_signals', lambda key, signals, at: persisted.append(signals)):
+        # Cold cache: the stream computes (only fallbacks) and must not cache or persist them
+        response = app.app.test_client().get('/get_all_signals?stream=ndjson')
+        assert len(response.get_data(as_text=True).splitlines()) == len(fallback) + 1
+        assert persisted == [] and signals_cache.peek('all')[0] is None
+
+    # The bulk loader never caches fallbacks: cold, the request gets uncached fallbacks
+    bulk_cache = StaleWhileRevalidate('test-bulk-signals', app.compute_all_signals,
+                                      on_update=lambda key, signals, at: persisted.append(signals))
+    with mock.patch.object(app, '_all_signals', bulk_cache), \
+            mock.patch.object(app, '_top_stocks', top_stocks), \
+            mock.patch.object(app, 'get_nifty_200_list', lambda: [{'symbol': 'RELIANCE.NS'}]), \
+            mock.patch.object(app, 'run_parallel', lambda fn, items, source=None: [None] * len(items)):
+        response = app.app.test_client().get('/get_all_signals')
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body['cache_status'] == 'fallback' and body['signals'][0]['symbol'] == 'RELIANCE.NS'
+        assert persisted == [] and bulk_cache.peek('all')[0] is None
+
+        # ...and warm, it keeps the last good set rather than overwrite it with fallbacks
+        bulk_cache.seed('all', good)
+        assert app.compute_all_signals() is None
+        assert bulk_cache.peek('all')[0] == good
+
+    print("✅ All-fallback results are served but neither cached nor persisted")
+
+if __name__ == "__main__":
+    test_batch_signals_accepts_lowercase_risk()
+    test_top_stocks_rejects_unknown_source()
+    test_snapshot_names_are_sanitised()
+    test_stream_keeps_last_good_signals()
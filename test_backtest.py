@@ -0,0 +1,117 @@
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import backtest
+import signal_sweep
+import technical_analysis
+from test_indicator_panel import make_histories
+
+def test_backtest_scores_match_analyze_universe():
+    print("🔍 Testing backtest signal scores against analyze_universe")
+    print("=" * 60)
+
+    histories = make_histories(count=40, bars=400, seed=11)
+    panel = technical_analysis.build_price_panel(histories)
+    scores = backtest.signal_scores(panel)
+    dates = panel['Close'].index
+
+    # Each row must be what analyze_universe reports when the history ends on that day
+    for row in [60, 250, len(dates) - 1]:
+        truncated = {ticker: hist[hist.index <= dates[row]] for ticker, hist in histories.items()}
+        expected = technical_analysis.analyze_universe(truncated)
+        for column, ticker in enumerate(panel['Close'].columns):
+            if ticker in expected:
+                assert scores[row, column] == expected[ticker]['signal_score'], f"{ticker} on row {row}"
+            else:
+                assert np.isnan(scores[row, column]), f"{ticker} scored on row {row} without enough history"
+
+    print("✅ Per-day scores match the single-day engine")
+
+def test_trade_simulation():
+    print("🔍 Testing entry/stop/exit simulation on a scripted price path")
+    print("=" * 60)
+
+    days = pd.date_range('2025-01-01', periods=14, freq='B')
+    #            0    1    2    3    4    5    6    7    8    9   10   11   12   13
+    opens = [100, 101, 101, 102, 103, 100, 96, 96, 96, 96, 96, 96, 96, 96]
+    highs = [101, 101, 102, 105, 103, 100, 97, 97, 97, 97, 97, 97, 97, 97]
+    lows = [99, 99.5, 100, 101, 99, 99, 95, 95, 95, 95, 95, 95, 95, 95]
+    closes = [100, 100.5, 101, 104, 100, 99.5, 96, 96, 96, 96, 96, 96, 96, 96]
+    panel = technical_analysis.build_price_panel({'TEST.NS': pd.DataFrame({
+        'Open': opens, 'High': highs, 'Low': lows, 'Close': closes, 'Volume': 1000
+    }, index=days, dtype=float)})
+
+    entry = np.full((14, 1), 100.0)
+    stop, target = entry * 0.98, entry * 1.04
+    buy = np.zeros((14, 1), dtype=bool)
+    buy[[0, 1, 4], 0] = True  # Day 1's signal falls inside the first trade
+
+    filled, fill_price, exit_day, exit_price, outcome = backtest.simulate_signal_trades(
+        panel, entry, stop, target, horizon=5)
+    trades = backtest.select_positions(buy, filled, exit_day) & filled
+
+    assert list(np.flatnonzero(trades[:, 0])) == [0, 4]
+    # Day 0: filled on day 1 at the 100 limit, target (104) reached on day 3
+    assert fill_price[0, 0] == 100 and exit_day[0, 0] == 3 and exit_price[0, 0] == 104 and outcome[0, 0] == 1
+    # Day 4: filled on day 5 at 100, day 6 opens below the stop (98) and exits at the open
+    assert fill_price[4, 0] == 100 and exit_day[4, 0] == 6 and exit_price[4, 0] == 96 and outcome[4, 0] == 2
+
+    print("✅ Fills, targets, stops and position overlap behave as scripted")
+
+def test_backtest_speed():
+    print("🔍 Timing a 200 ticker x 10 year backtest")
+    print("=" * 60)
+
+    panel = technical_analysis.build_price_panel(make_histories(count=200, bars=2520, seed=5))
+    start = time.perf_counter()
+    report = backtest.backtest_panel(panel)
+    elapsed = time.perf_counter() - start
+
+    assert report['trades'] > 0 and 0 <= report['max_drawdown'] <= 1
+    print(f"✅ {report['trades']} trades, hit rate {report['hit_rate']}, {elapsed:.2f}s")
+
+def test_signal_sweep():
+    print("🔍 Testing the signal sweep and named signal profiles")
+    print("=" * 60)
+
+    panel = technical_analysis.build_price_panel(make_histories(count=30, bars=600, seed=3))
+    grid = {'rsi': (20, 40), 'trend': (25,), 'macd': (10, 20), 'signal_score': (20, 40)}
+    serial = signal_sweep.run_sweep(panel, grid=grid, workers=1, min_trades=0)
+    pooled = signal_sweep.run_sweep(panel, grid=grid, workers=2, min_trades=0)
+    assert len(serial) == 8
+    assert [row['metrics'] for row in serial] == [row['metrics'] for row in pooled], "shared-memory workers disagree"
+
+    # A sweep row must be exactly what the full backtest reports for that profile
+    best = serial[0]
+    report = backtest.backtest_panel(panel, signal_profile=best['profile'])
+    for name, value in best['metrics'].items():
+        assert report[name] == value, f"{name}: {report[name]} != {value}"
+
+    original_path = technical_analysis.SIGNAL_PROFILES_PATH
+    technical_analysis.SIGNAL_PROFILES_PATH = os.path.join(tempfile.mkdtemp(), 'signal_profiles.json')
+    try:
+        signal_sweep.save_signal_profile('swept', best['profile'], best['metrics'])
+        assert technical_analysis.set_signal_profile('swept')
+        assert technical_analysis.get_signal_profile() == best['profile']
+        assert not technical_analysis.set_signal_profile('missing')
+        assert technical_analysis.get_signal_profile_name() == 'swept'
+    finally:
+        technical_analysis.set_signal_profile('default')
+        technical_analysis.SIGNAL_PROFILES_PATH = original_path
+
+    # Callers get a copy: editing it must not change the scoring defaults
+    profile = technical_analysis.get_signal_profile()
+    profile['signal_score'] = 99
+    profile['weights']['rsi'] = 0
+    assert technical_analysis.get_signal_profile() == technical_analysis.DEFAULT_SIGNAL_PROFILE
+    assert technical_analysis.DEFAULT_SIGNAL_PROFILE['weights']['rsi'] == technical_analysis.SIGNAL_WEIGHTS['rsi']
+
+    print(f"✅ Sweep ranks {len(serial)} profiles; best saved and loaded as a named profile")
+
+if __name__ == "__main__":
+    test_backtest_scores_match_analyze_universe()
+    test_trade_simulation()
+    test_backtest_speed()
+    test_signal_sweep()
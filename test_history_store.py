@@ -0,0 +1,100 @@
+import multiprocessing
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import history_store
+from test_indicator_panel import make_histories
+
+def _write_repeatedly(directory, hist, rounds, failures):
+    history_store.HISTORY_DIR = directory
+    for _ in range(rounds):
+        history_store.save_history('SYN1.NS', hist)
+        if history_store.load_history('SYN1.NS') is None:
+            failures.value += 1
+
+def test_concurrent_writer_processes():
+    print("🔍 Testing history store writers in several processes")
+    print("=" * 60)
+
+    original_dir = history_store.HISTORY_DIR
+    directory = tempfile.mkdtemp()
+    hist = make_histories(count=2, bars=300)['SYN1.NS']
+    context = multiprocessing.get_context('fork')
+    failures = context.Value('i', 0)
+    try:
+        workers = [context.Process(target=_write_repeatedly, args=(directory, hist, 25, failures)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        history_store.HISTORY_DIR = directory
+        stored = history_store.load_history('SYN1.NS')
+        assert failures.value == 0, f"{failures.value} reads found a dangling CURRENT"
+        assert stored is not None and len(stored) == len(hist)
+    finally:
+        history_store.HISTORY_DIR = original_dir
+
+    print("✅ Every published generation stayed readable across 4 writer processes")
+
+def _age_store(ticker):
+    """Make the stored generation look older than HISTORY_REFRESH_SECONDS"""
+    current = history_store._current_path(ticker)
+    old = os.path.getmtime(current) - history_store.HISTORY_REFRESH_SECONDS - 1
+    os.utime(current, (old, old))
+
+def test_redownload_keeps_stored_span():
+    print("🔍 Testing history re-downloads and upstream outages against a long store")
+    print("=" * 60)
+
+    dates = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=2600, tz='Asia/Kolkata')
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(5).normal(0, 0.01, len(dates))))
+    full = pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                         'Volume': np.full(len(dates), 1000, dtype='int64')}, index=dates)
+    calls = []
+    upstream = {'hist': full}
+
+    def download(ticker, period=None, start=None):
+        calls.append(('start', start) if start is not None else ('period', period))
+        hist = upstream['hist']
+        if hist is None:
+            return None
+        if start is None:
+            return history_store.slice_period(hist, period)
+        return hist[hist.index >= pd.Timestamp(start, tz=hist.index.tz)]
+
+    original_dir = history_store.HISTORY_DIR
+    history_store.HISTORY_DIR = tempfile.mkdtemp()
+    try:
+        assert len(history_store.get_history('LONG.NS', '10y', download)) == len(full)
+
+        # A dividend moves every earlier close: a '1y' caller's re-download keeps the 10 years
+        adjusted = full.copy()
+        adjusted['Close'] *= 0.98
+        upstream['hist'] = adjusted
+        _age_store('LONG.NS')
+        one_year = history_store.get_history('LONG.NS', '1y', download)
+        assert len(one_year) < 300 and one_year['Close'].iloc[0] == adjusted.loc[one_year.index[0], 'Close']
+        stored = history_store.load_history('LONG.NS')
+        assert len(stored) == len(full) and stored.index[0] == full.index[0]
+        assert calls[-1] == ('start', full.index[0].strftime('%Y-%m-%d')), calls
+
+        # Upstream outage (nothing returned, or an error): the stored bars are still served
+        upstream['hist'] = None
+        for period in ('1y', '10y'):
+            _age_store('LONG.NS')
+            served = history_store.get_history('LONG.NS', period, download)
+            assert served is not None and served.index[-1] == full.index[-1], period
+        _age_store('LONG.NS')
+        failing = lambda ticker, period=None, start=None: 1 / 0
+        assert len(history_store.get_history('LONG.NS', '1y', failing)) == len(one_year)
+        assert history_store.get_history('NEW.NS', '1y', download) is None
+    finally:
+        history_store.HISTORY_DIR = original_dir
+
+    print(f"✅ Re-download kept {len(full)} stored bars; outages served from disk ({len(calls)} downloads)")
+
+if __name__ == "__main__":
+    test_concurrent_writer_processes()
+    test_redownload_keeps_stored_span()
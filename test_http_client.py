@@ -0,0 +1,99 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+import http_client
+
+class _ScriptedHandler(BaseHTTPRequestHandler):
+    """Answers each GET with the next (status, headers) from the server's script"""
+
+    def do_GET(self):
+        self.server.hits.append(time.monotonic())
+        status, headers = self.server.script.pop(0) if self.server.script else (200, {})
+        body = b'{"ok": true}' if status == 200 else b'{}'
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def _serve(script):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _ScriptedHandler)
+    server.script, server.hits = list(script), []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/quote'
+
+def test_retries_transient_errors_and_honours_retry_after():
+    print("🔍 Testing HTTP retry/backoff on transient errors and the Retry-After header")
+    print("=" * 60)
+
+    # A fresh session per test so the module-level one is built with the patched settings
+    with mock.patch.object(http_client, '_session', None), \
+         mock.patch.object(http_client, 'HTTP_BACKOFF_FACTOR', 0.01):
+        # 503 then 502 are retried and the caller only sees the final 200
+        server, url = _serve([(503, {}), (502, {})])
+        try:
+            response = http_client.http_get(url, timeout=2)
+            assert response.status_code == 200 and response.json() == {'ok': True}
+            assert len(server.hits) == 3, f"expected 2 retries, saw {len(server.hits) - 1}"
+        finally:
+            server.shutdown()
+
+        # 429 with Retry-After waits the advertised time before the retry
+        server, url = _serve([(429, {'Retry-After': '1'})])
+        try:
+            response = http_client.http_get(url, timeout=2)
+            assert response.status_code == 200
+            assert len(server.hits) == 2
+            waited = server.hits[1] - server.hits[0]
+            assert waited >= 0.9, f"retried after {waited:.2f}s despite Retry-After: 1"
+        finally:
+            server.shutdown()
+
+        # Retries are bounded: once they run out the last error response is returned, not raised
+        server, url = _serve([(500, {})] * (http_client.HTTP_MAX_RETRIES + 2))
+        try:
+            response = http_client.http_get(url, timeout=2)
+            assert response.status_code == 500
+            assert len(server.hits) == http_client.HTTP_MAX_RETRIES + 1
+        finally:
+            server.shutdown()
+
+        # Client errors other than 429 are not retried
+        server, url = _serve([(404, {})])
+        try:
+            assert http_client.http_get(url, timeout=2).status_code == 404
+            assert len(server.hits) == 1
+        finally:
+            server.shutdown()
+
+    print(f"✅ Transient errors retried (max {http_client.HTTP_MAX_RETRIES}), Retry-After respected")
+
+def test_session_is_shared_and_timeouts_split():
+    print("🔍 Testing the shared pooled session and (connect, read) timeouts")
+    print("=" * 60)
+
+    with mock.patch.object(http_client, '_session', None):
+        session = http_client.get_session()
+        assert http_client.get_session() is session
+        yahoo = session.get_adapter('https://query1.finance.yahoo.com/v8/finance/chart/X')
+        assert yahoo._pool_maxsize == http_client.HOST_POOL_LIMITS['query1.finance.yahoo.com']
+        assert session.get_adapter('https://example.com/')._pool_maxsize == http_client.HTTP_POOL_MAXSIZE
+
+        with mock.patch.object(session, 'get') as get:
+            http_client.http_get('https://example.com/', timeout=1)
+            assert get.call_args.kwargs['timeout'] == (min(http_client.HTTP_CONNECT_TIMEOUT, 1), 1)
+            http_client.http_get('https://example.com/')
+            assert get.call_args.kwargs['timeout'] == (http_client.HTTP_CONNECT_TIMEOUT,
+                                                       http_client.HTTP_READ_TIMEOUT)
+
+    print("✅ One session per process, per-host pool limits and split timeouts")
+
+if __name__ == "__main__":
+    test_retries_transient_errors_and_honours_retry_after()
+    test_session_is_shared_and_timeouts_split()
@@ -0,0 +1,249 @@
+import tempfile
+import time
+from unittest import mock
+import numpy as np
+import pandas as pd
+import backtest
+import history_store
+import indicators
+import technical_analysis
+
+def make_histories(count=60, bars=260, seed=7):
+    """Synthetic OHLCV frames; every fifth ticker has a shorter (later-listed) history"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2025-06-02', periods=bars, freq='B', tz='Asia/Kolkata')
+    histories = {}
+    for i in range(count):
+        n = bars if i % 5 else int(rng.integers(40, bars))
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        histories[f'SYN{i}.NS'] = pd.DataFrame({
+            'Open': close,
+            'High': close * (1 + rng.uniform(0, 0.02, n)),
+            'Low': close * (1 - rng.uniform(0, 0.02, n)),
+            'Close': close,
+            'Volume': rng.integers(1000, 5000, n).astype('int64')
+        }, index=dates[-n:])
+    return histories
+
+def test_panel_matches_analyze_stock():
+    print("🔍 Testing vectorized panel engine against analyze_stock")
+    print("=" * 60)
+
+    histories = make_histories()
+    start = time.perf_counter()
+    panel_results = technical_analysis.analyze_universe(histories)
+    panel_ms = (time.perf_counter() - start) * 1000
+
+    original_fetch = technical_analysis.fetch_historical_data
+    fields = ['current_price', 'rsi', 'macd', 'macd_signal', 'sma_20', 'sma_50', 'atr',
+              'volatility', 'volume_ratio', 'signal', 'signal_score', 'confidence']
+    try:
+        for ticker, hist in histories.items():
+            technical_analysis.fetch_historical_data = lambda symbol, period='1y', hist=hist: hist.copy()
+            expected = technical_analysis.analyze_stock(ticker)
+            actual = panel_results.get(ticker)
+
+            if expected is None:
+                assert actual is None, f"{ticker}: panel scored a ticker with too little history"
+                continue
+
+            for field in fields:
+                assert actual[field] == expected[field], f"{ticker} {field}: {actual[field]} != {expected[field]}"
+    finally:
+        technical_analysis.fetch_historical_data = original_fetch
+
+    print(f"✅ {len(panel_results)} tickers match analyze_stock ({panel_ms:.1f} ms for the panel)")
+
+def test_panel_handles_missing_bars():
+    print("🔍 Testing the panel engine with a ticker missing bars (trading halt)")
+    print("=" * 60)
+
+    histories = make_histories(count=4, bars=260, seed=11)
+    halted = histories['SYN1.NS'].drop(histories['SYN1.NS'].index[[100, 240, 255]])
+    histories['SYN1.NS'] = halted
+    results = technical_analysis.analyze_universe(histories)
+
+    original_fetch = technical_analysis.fetch_historical_data
+    technical_analysis.fetch_historical_data = lambda symbol, period='1y': halted.copy()
+    try:
+        expected = technical_analysis.analyze_stock('SYN1.NS')
+    finally:
+        technical_analysis.fetch_historical_data = original_fetch
+
+    actual = results['SYN1.NS']
+    for field in ['rsi', 'macd', 'macd_signal', 'sma_20', 'sma_50', 'atr', 'volatility', 'volume_ratio',
+                  'signal', 'signal_score']:
+        assert actual[field] == expected[field], f"{field}: {actual[field]} != {expected[field]}"
+    assert actual['rsi'] == round(technical_analysis.calculate_rsi(halted).iloc[-1], 2)
+
+    # The backtest inputs see the same values on the halted ticker's last bar
+    inputs = backtest.signal_inputs(technical_analysis.build_price_panel(histories))
+    column = list(histories).index('SYN1.NS')
+    assert not np.isnan(inputs['sma_50'][-1, column]) and np.isnan(inputs['sma_50'][-5, column])
+
+    print(f"✅ Halted ticker matches analyze_stock: RSI {actual['rsi']}, signal {actual['signal']}")
+
+def test_incremental_state_matches_batch():
+    print("🔍 Testing incremental indicator state against full recomputation")
+    print("=" * 60)
+
+    original_dir = history_store.HISTORY_DIR
+    history_store.HISTORY_DIR = tempfile.mkdtemp()
+    try:
+        for ticker, hist in make_histories(count=10, bars=300).items():
+            # Build state on an older slice, persist it, then resume from disk with the newer bars
+            technical_analysis._indicator_states.clear()
+            technical_analysis.get_indicator_state(ticker, hist.iloc[:200])
+            technical_analysis._indicator_states.clear()
+
+            last = hist.iloc[-1]
+            live = technical_analysis.live_indicators(ticker, float(last['Close']), volume=float(last['Volume']),
+                                                      high=float(last['High']), low=float(last['Low']), hist=hist)
+            expected = {name: values[-1] for name, values in technical_analysis.calculate_indicator_panel(
+                technical_analysis.build_price_panel({ticker: hist})).items()}
+
+            assert live['bars'] == len(hist), f"{ticker}: state covers {live['bars']} of {len(hist)} bars"
+            for name, value in expected.items():
+                value = value[0]
+                if np.isnan(value):
+                    assert np.isnan(live[name]), f"{ticker} {name}: expected NaN, got {live[name]}"
+                else:
+                    assert abs(live[name] - value) <= 1e-9 * max(1.0, abs(value)), f"{ticker} {name}: {live[name]} != {value}"
+
+        # A shorter slice is served from a rebuilt state but never replaces the saved, longer one
+        full_bars = technical_analysis._indicator_states[ticker].bars
+        assert technical_analysis.get_indicator_state(ticker, hist.iloc[:200]).bars == 199
+        assert technical_analysis._indicator_states[ticker].bars == full_bars
+        assert history_store.load_state(ticker, 'indicators')['bars'] == full_bars
+    finally:
+        history_store.HISTORY_DIR = original_dir
+
+    state = technical_analysis._indicator_states[ticker]
+    start = time.perf_counter()
+    for _ in range(10000):
+        state.preview(101.0, 99.0, 100.0, 3000.0)
+    tick_us = (time.perf_counter() - start) / 10000 * 1e6
+
+    print(f"✅ Incremental state matches batch indicators ({tick_us:.1f} µs per tick)")
+
+def test_analyze_stock_applies_live_quote():
+    print("🔍 Testing analyze_stock with a live quote applied through the incremental state")
+    print("=" * 60)
+
+    hist = make_histories(count=1, bars=260, seed=5)['SYN0.NS']
+    last_close = float(hist['Close'].iloc[-1])
+    tick = last_close * 1.04
+    ticked = hist.copy()
+    ticked.iloc[-1, ticked.columns.get_loc('Close')] = tick
+    ticked.iloc[-1, ticked.columns.get_loc('High')] = max(float(hist['High'].iloc[-1]), tick)
+    fields = ['current_price', 'rsi', 'macd', 'macd_signal', 'sma_20', 'sma_50', 'atr', 'volume_ratio', 'signal']
+
+    def analyze(frame, current_data=None):
+        with mock.patch.object(technical_analysis, 'fetch_historical_data', lambda symbol, period='1y': frame.copy()):
+            return technical_analysis.analyze_stock('LIVE.NS', current_data=current_data)
+
+    with mock.patch.object(history_store, 'HISTORY_DIR', tempfile.mkdtemp()):
+        technical_analysis._indicator_states.pop('LIVE.NS', None)
+        indicators.clear_indicator_cache()
+        stored = analyze(hist)
+        unchanged = analyze(hist, {'current_price': last_close})
+        live = analyze(hist, {'current_price': tick})
+        expected = analyze(ticked)
+        assert 'LIVE.NS' in technical_analysis._indicator_states, "the live path did not use the incremental state"
+
+    for field in fields:
+        for name, actual, reference in [('unchanged', unchanged, stored), ('tick', live, expected)]:
+            if field == 'signal':
+                assert actual[field] == reference[field], f"{name} {field}: {actual[field]} != {reference[field]}"
+            else:
+                assert abs(actual[field] - reference[field]) <= 0.011, f"{name} {field}: {actual[field]} != {reference[field]}"
+    assert live['rsi'] != stored['rsi']
+
+    print(f"✅ Live tick moved RSI {stored['rsi']} -> {live['rsi']}, matching a full recomputation")
+
+def test_indicator_registry():
+    print("🔍 Testing the indicator registry planner and cache")
+    print("=" * 60)
+
+    hist = make_histories(count=1, bars=260)['SYN0.NS']
+    close = hist['Close']
+
+    # The definitions the three modules used to carry separately
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    true_range = pd.concat([hist['High'] - hist['Low'], (hist['High'] - close.shift()).abs(),
+                            (hist['Low'] - close.shift()).abs()], axis=1).max(axis=1)
+    expected = {
+        'rsi': 100 - (100 / (1 + gain / loss)),
+        'sma_50': close.rolling(window=50).mean(),
+        'atr': true_range.rolling(window=14).mean(),
+        'returns': close.pct_change()
+    }
+
+    order = indicators.plan(['rsi', 'returns', 'atr'])
+    assert order.count('close_diff') == 1 and order.count('prev_close') == 1, order
+    assert order.index('close_diff') < order.index('rsi') and order.index('prev_close') < order.index('atr')
+    assert indicators.required_bars(['rsi']) == 15 and indicators.required_bars(['sma_200']) == 200
+
+    indicators.clear_indicator_cache()
+    computed = indicators.compute_indicators(hist, list(expected), ticker='SYN0.NS')
+    for name, series in expected.items():
+        pd.testing.assert_series_equal(computed[name], series, check_names=False)
+
+    # Same history: served from the cache, intermediates included
+    before = indicators.indicator_cache_stats()
+    again = indicators.compute_indicators(hist, ['rsi', 'close_diff'], ticker='SYN0.NS')
+    assert again['rsi'] is computed['rsi']
+    assert indicators.indicator_cache_stats()['hits'] == before['hits'] + 1
+
+    # The last bar still forming (same timestamp, new price) invalidates the entry
+    moved = hist.copy()
+    moved.iloc[-1, moved.columns.get_loc('Close')] *= 1.05
+    assert indicators.compute_indicators(moved, ['rsi'], ticker='SYN0.NS')['rsi'] is not computed['rsi']
+
+    # Re-adjusted history (dividend/split): same bars, earlier closes moved
+    adjusted = hist.copy()
+    adjusted.iloc[:-5, adjusted.columns.get_loc('Close')] *= 0.98
+    pd.testing.assert_series_equal(indicators.compute_indicators(adjusted, ['sma_50'], ticker='SYN0.NS')['sma_50'],
+                                   adjusted['Close'].rolling(window=50).mean(), check_names=False)
+
+    # A missing last-bar volume still hits the cache on the second call
+    no_volume = hist.copy()
+    no_volume.iloc[-1, no_volume.columns.get_loc('Volume')] = np.nan
+    first = indicators.compute_indicators(no_volume, ['rsi'], ticker='SYN9.NS')['rsi']
+    assert indicators.compute_indicators(no_volume.copy(), ['rsi'], ticker='SYN9.NS')['rsi'] is first
+
+    # A run of gains with no losses is fully overbought (not gain / 1)
+    rising = pd.DataFrame({'Close': np.arange(100.0, 130.0)})
+    assert indicators.compute_indicators(rising, ['rsi'])['rsi'].iloc[-1] == 100
+
+    print(f"✅ Registry matches the reference formulas; plan for rsi+returns+atr: {order}")
+
+def test_expected_return_surface_is_exact():
+    print("🔍 Testing the Enhanced Logic surface against the scalar normal CDF")
+    print("=" * 60)
+
+    mu = np.array([0.001, -0.002, 0.0])
+    sigma = np.array([0.015, 0.03, 0.008])
+    losses = tuple(technical_analysis.ALLOWED_LOSS.values())
+    surface = technical_analysis.expected_return_surface(mu, sigma, allowed_losses=losses)
+
+    worst = 0.0
+    for i in range(len(mu)):
+        for j, loss in enumerate(losses):
+            for k, target in enumerate(technical_analysis.ENHANCED_TARGETS):
+                expected = ((1 - technical_analysis.calculate_normal_cdf(target, mu[i], sigma[i])) * target
+                            - technical_analysis.calculate_normal_cdf(-loss, mu[i], sigma[i]) * loss)
+                worst = max(worst, abs(surface[i, j, k] - expected))
+    assert worst <= 1e-15, f"surface differs from math.erf by {worst}"
+
+    print(f"✅ Surface matches the scalar CDF (max difference {worst:.1e})")
+
+if __name__ == "__main__":
+    test_panel_matches_analyze_stock()
+    test_panel_handles_missing_bars()
+    test_incremental_state_matches_batch()
+    test_analyze_stock_applies_live_quote()
+    test_indicator_registry()
+    test_expected_return_surface_is_exact()
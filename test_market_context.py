@@ -0,0 +1,107 @@
+import threading
+from unittest import mock
+import numpy as np
+import pandas as pd
+import market_context
+import market_data
+from market_context import MarketDataContext
+from market_data import get_analyst_recommendations, get_market_sentiment
+
+def make_history(bars=260):
+    """Synthetic daily bars ending today"""
+    index = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=bars)
+    close = 100 + np.cumsum(np.random.default_rng(7).normal(0, 1, bars))
+    return pd.DataFrame({
+        'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+        'Volume': np.full(bars, 1_000_000.0)
+    }, index=index)
+
+def test_context_fetches_once_and_slices():
+    print("🔍 Testing MarketDataContext single fetch and history slicing")
+    print("=" * 60)
+
+    hist = make_history()
+    fetches, info_calls = [], []
+    gate = threading.Event()
+
+    def fake_fetch(symbol, period='1y'):
+        fetches.append((symbol, period))
+        gate.wait(5)
+        return hist
+
+    class FakeTicker:
+        def __init__(self, symbol):
+            info_calls.append(symbol)
+
+        @property
+        def info(self):
+            return {'shortName': 'Reliance', 'sector': 'Energy', 'currency': 'INR'}
+
+    with mock.patch.object(market_context, 'fetch_historical_data', side_effect=fake_fetch), \
+            mock.patch.object(market_context.yf, 'Ticker', FakeTicker), \
+            mock.patch.object(market_context.rate_limiter, 'acquire'), \
+            mock.patch.object(market_data, 'get_yahoo_analyst_data', return_value=None):
+        context = MarketDataContext('RELIANCE')
+        assert context.symbol == 'RELIANCE.NS' and MarketDataContext('RELIANCE.NS').symbol == 'RELIANCE.NS'
+
+        # Threads serving one request share a single history load and a single info call
+        results = []
+        workers = [threading.Thread(target=lambda: (results.append(context.history('3mo')),
+                                                    context.info())) for _ in range(6)]
+        for worker in workers:
+            worker.start()
+        gate.set()
+        for worker in workers:
+            worker.join()
+        assert fetches == [('RELIANCE.NS', market_context.CONTEXT_HISTORY_PERIOD)]
+        assert info_calls == ['RELIANCE.NS'] and len(results) == 6
+
+        # Slices are the trailing window of the one full-period frame
+        full, month, week = context.history(), context.history('1mo'), context.history('5d')
+        assert len(full) == len(hist) and len(week) < len(month) < len(results[0]) < len(full)
+        assert week.index[-1] == hist.index[-1] and week.index[0] >= hist.index[-1] - pd.Timedelta(days=5)
+        assert month['Close'].equals(hist['Close'].iloc[-len(month):])
+        # An unknown period falls back to the whole window rather than failing
+        assert len(context.history('ytd')) == len(hist)
+
+        # Each caller gets its own frame: added columns do not leak to other consumers
+        month['derived'] = 1.0
+        assert 'derived' not in context.history('1mo') and 'derived' not in hist
+
+        quote = context.quote()
+        assert quote['symbol'] == 'RELIANCE.NS' and quote['name'] == 'Reliance' and quote['currency'] == 'INR'
+        assert quote['current_price'] == round(hist['Close'].iloc[-1], 2)
+
+        # Several analysis stages reading the context cost no extra upstream calls
+        recommendations = get_analyst_recommendations('RELIANCE', context=context)
+        sentiment = get_market_sentiment('RELIANCE', context=context)
+        assert recommendations and sentiment
+        assert len(fetches) == 1 and len(info_calls) == 1
+
+    print(f"✅ One history load and one info call served {len(results) + 6} reads")
+
+def test_context_failures_are_cached():
+    print("🔍 Testing MarketDataContext when upstream calls fail")
+    print("=" * 60)
+
+    fetches, info_calls = [], []
+
+    def failing_ticker(symbol):
+        info_calls.append(symbol)
+        raise ConnectionError('upstream down')
+
+    with mock.patch.object(market_context, 'fetch_historical_data',
+                           side_effect=lambda symbol, period: fetches.append(symbol)), \
+            mock.patch.object(market_context.yf, 'Ticker', side_effect=failing_ticker), \
+            mock.patch.object(market_context.rate_limiter, 'acquire'):
+        context = MarketDataContext('NOPE')
+        assert context.history() is None and context.history('5d') is None
+        assert context.info() == {} and context.info() == {}
+        assert context.quote() is None
+        assert len(fetches) == 1 and len(info_calls) == 1, "a failed load was retried within the request"
+
+    print("✅ Failed loads answer None/{} once per request without retrying upstream")
+
+if __name__ == "__main__":
+    test_context_fetches_once_and_slices()
+    test_context_failures_are_cached()
@@ -0,0 +1,81 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import rate_limiter
+from request_pipeline import StagedPipeline
+
+def test_stages_run_concurrently_with_fallbacks():
+    print("🔍 Testing staged pipeline concurrency, deadlines and fallbacks")
+    print("=" * 60)
+
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def stage(value, delay):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        try:
+            time.sleep(delay)
+            return value
+        finally:
+            with lock:
+                running[0] -= 1
+
+    def broken():
+        raise ValueError('upstream exploded')
+
+    pipeline = StagedPipeline('test', pool=ThreadPoolExecutor(max_workers=4))
+    pipeline.add('slow', stage, 'slow-result', 0.3, fallback='slow-fallback', deadline=2)
+    pipeline.add('late', stage, 'late-result', 1.0, fallback={'late': 'fallback'}, deadline=0.2)
+    pipeline.add('broken', broken, fallback=[])
+    pipeline.add('fast', stage, 'fast-result', delay=0.05, fallback=None)
+
+    started = time.monotonic()
+    results = pipeline.start().results()
+    elapsed = time.monotonic() - started
+
+    # Every stage answers, in registration order, with its result or its own fallback
+    assert list(results) == ['slow', 'late', 'broken', 'fast']
+    assert results == {'slow': 'slow-result', 'late': {'late': 'fallback'}, 'broken': [], 'fast': 'fast-result'}
+    assert peak[0] >= 3, f"stages ran one at a time (peak concurrency {peak[0]})"
+
+    # Latency is the slowest stage that made its deadline, not the sum and not the late stage
+    assert elapsed < 0.6, f"results() took {elapsed:.2f}s"
+
+    assert pipeline.degraded() == ['late', 'broken']
+    timings = pipeline.timings()
+    assert [timings[name]['status'] for name in results] == ['ok', 'timeout', 'error', 'ok']
+    assert timings['late']['elapsed'] < 0.6 and timings['slow']['elapsed'] >= 0.3
+
+    print(f"✅ 4 stages collected in {elapsed:.2f}s; degraded: {pipeline.degraded()}")
+
+def test_stages_inherit_priority_and_start_once():
+    print("🔍 Testing staged pipeline priority inheritance and idempotent start")
+    print("=" * 60)
+
+    calls, priorities = [], []
+
+    def stage(name):
+        calls.append(name)
+        priorities.append(rate_limiter.current_priority())
+        return name
+
+    pipeline = StagedPipeline('test-priority', pool=ThreadPoolExecutor(max_workers=2))
+    pipeline.add('a', stage, 'a').add('b', stage, 'b')
+    with rate_limiter.request_priority(rate_limiter.PRIORITY_BACKGROUND):
+        pipeline.start()
+        pipeline.start()
+    assert pipeline.results() == {'a': 'a', 'b': 'b'}
+    assert sorted(calls) == ['a', 'b'], "start() submitted the stages twice"
+    assert priorities == [rate_limiter.PRIORITY_BACKGROUND] * 2
+
+    # results() starts a pipeline that was never started explicitly
+    lazy = StagedPipeline('test-lazy', pool=ThreadPoolExecutor(max_workers=1)).add('only', stage, 'x')
+    assert lazy.results() == {'only': 'x'} and lazy.degraded() == []
+
+    print("✅ Stages ran once each at the caller's background priority")
+
+if __name__ == "__main__":
+    test_stages_run_concurrently_with_fallbacks()
+    test_stages_inherit_priority_and_start_once()
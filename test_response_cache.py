@@ -0,0 +1,90 @@
+import threading
+import time
+from response_cache import ResponseCache, StaleWhileRevalidate, get_cache_stats
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_response_cache_lru_and_ttl():
+    print("🔍 Testing ResponseCache LRU eviction, byte bound and TTL expiry")
+    print("=" * 60)
+
+    cache = ResponseCache('test-lru', max_entries=3, max_bytes=1000, ttl=60)
+    for key in 'abc':
+        cache.set(key, {'symbol': key})
+    assert cache.get('a') == {'symbol': 'a'}  # 'a' is now the most recently used
+
+    cache.set('d', {'symbol': 'd'})
+    assert cache.get('b') is None, "the least recently used entry should have been evicted"
+    assert [cache.get(key) is not None for key in 'acd'] == [True, True, True]
+
+    # A payload over the whole byte budget is refused; large ones push older entries out
+    assert not cache.set('huge', 'x' * 2000)
+    assert cache.set('big', 'x' * 995)
+    assert len(cache) == 1 and cache.get('big') is not None
+
+    # Expired entries read as missing and are dropped
+    cache.set('short', 1, ttl=0.05)
+    assert cache.get('short') == 1
+    time.sleep(0.1)
+    assert cache.get('short', 'gone') == 'gone'
+
+    stats = cache.stats()
+    assert stats['evictions'] >= 4 and stats['rejected'] == 1 and stats['expirations'] == 1
+    assert stats['bytes'] <= stats['max_bytes'] and stats['entries'] == len(cache)
+    assert get_cache_stats()['test-lru'] == stats
+
+    print(f"✅ LRU, byte bound and TTL hold: {stats}")
+
+def test_stale_while_revalidate():
+    print("🔍 Testing stale-while-revalidate serving and background refresh")
+    print("=" * 60)
+
+    loads, updates = [], []
+    gate = threading.Event()
+    values = {'nse': ['v1', 'v2', None]}
+
+    def loader(source):
+        loads.append(source)
+        gate.wait(5)
+        return values[source].pop(0)
+
+    swr = StaleWhileRevalidate('test-swr', loader, soft_ttl=0.1, retry_after=60,
+                               on_update=lambda key, value, at: updates.append(value))
+
+    # Cold: nothing to serve, the first load runs in the background
+    assert swr.get('nse', 'nse')[:2] == (None, 'warming')
+    gate.set()
+    assert _wait_for(lambda: swr.peek('nse')[0] == 'v1')
+    assert swr.get('nse', 'nse')[:2] == ('v1', 'fresh')
+
+    # Past the soft TTL the old value is served at once while one refresh runs
+    gate.clear()
+    time.sleep(0.15)
+    started = time.perf_counter()
+    assert swr.get('nse', 'nse')[:2] == ('v1', 'stale')
+    assert swr.get('nse', 'nse')[:2] == ('v1', 'stale')
+    assert time.perf_counter() - started < 0.05, "get() waited on the loader"
+    assert loads == ['nse', 'nse'], "a second refresh started while one was running"
+    gate.set()
+    assert _wait_for(lambda: swr.peek('nse')[:2] == ('v2', 'fresh'))
+    assert _wait_for(lambda: updates == ['v1', 'v2'])
+
+    # A failed (empty) refresh keeps serving the last good value, flagged as not being refreshed
+    time.sleep(0.15)
+    assert swr.get('nse', 'nse')[:2] == ('v2', 'stale')
+    assert _wait_for(lambda: swr.stats()['refresh_failures'] == 1)
+    assert swr.get('nse', 'nse')[:2] == ('v2', 'stale-error') and len(loads) == 3
+
+    # wait=True on a cold key loads in the caller instead of answering 'warming'
+    values['bse'] = ['b1']
+    assert swr.get('bse', 'bse', wait=True)[:2] == ('b1', 'fresh')
+
+    print(f"✅ Stale values served without waiting; {swr.stats()['refreshes']} background refreshes")
+
+if __name__ == "__main__":
+    test_response_cache_lru_and_ttl()
+    test_stale_while_revalidate()
@@ -0,0 +1,214 @@
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import MappingProxyType
+from unittest import mock
+import rate_limiter
+# Imported first so their module-level setup does not see the VERCEL flag below
+import snapshot_store
+import multi_source_data
+
+# Importing the manager starts its scheduler unless running serverless; keep tests off the network
+with mock.patch.dict(os.environ, {'VERCEL': '1'}):
+    import realtime_data_manager as rdm
+from realtime_data_manager import IST, MarketSnapshot, SnapshotScheduler
+
+WEDNESDAY = datetime(2026, 10, 14, tzinfo=IST)
+FRIDAY = WEDNESDAY + timedelta(days=2)
+SATURDAY = WEDNESDAY + timedelta(days=3)
+MONDAY = WEDNESDAY + timedelta(days=5)
+
+def _at(day, hour, minute=0):
+    return day.replace(hour=hour, minute=minute)
+
+def _snapshot(updated_at, symbols=('A.NS',), is_fallback=False):
+    """Snapshot stamped like fetch_realtime_data does (naive local time)"""
+    stocks = [{'symbol': symbol, 'market_cap': 100 - i} for i, symbol in enumerate(symbols)]
+    return MarketSnapshot(rdm._freeze(stocks), tuple(symbols[:20]),
+                          updated_at.astimezone().replace(tzinfo=None), False, is_fallback)
+
+def test_market_hours():
+    print("🔍 Testing NSE market-hours alignment")
+    print("=" * 60)
+
+    assert rdm.is_market_open(_at(WEDNESDAY, 9, 15)) and rdm.is_market_open(_at(WEDNESDAY, 15, 29))
+    assert not rdm.is_market_open(_at(WEDNESDAY, 9, 14)) and not rdm.is_market_open(_at(WEDNESDAY, 15, 30))
+    assert not rdm.is_market_open(_at(SATURDAY, 11))
+    # Times in other zones are converted to IST first (04:30 UTC is 10:00 IST)
+    assert rdm.is_market_open(datetime(2026, 10, 14, 4, 30, tzinfo=timezone.utc))
+
+    assert rdm.next_market_open(_at(WEDNESDAY, 8)) == _at(WEDNESDAY, 9, 15)
+    assert rdm.next_market_open(_at(WEDNESDAY, 10)) == _at(WEDNESDAY + timedelta(days=1), 9, 15)
+    assert rdm.next_market_open(_at(FRIDAY, 16)) == _at(MONDAY, 9, 15)
+    assert rdm.last_market_close(_at(WEDNESDAY, 16)) == _at(WEDNESDAY, 15, 30)
+    assert rdm.last_market_close(_at(MONDAY, 10)) == _at(FRIDAY, 15, 30)
+    assert rdm.last_market_close(_at(SATURDAY, 12)) == _at(FRIDAY, 15, 30)
+
+    print("✅ Session bounds, weekends and time zones handled")
+
+def test_cadence_and_backoff():
+    print("🔍 Testing scheduler cadence, failure backoff and off-hours sleeps")
+    print("=" * 60)
+
+    original = rdm.get_snapshot()
+    scheduler = SnapshotScheduler(refresh=lambda: None, interval=60, max_backoff=300, off_hours_sleep=3600)
+    try:
+        # Market open: the regular interval
+        assert scheduler.next_delay(_at(WEDNESDAY, 11)) == 60
+
+        # Failures back off exponentially up to the cap, whatever the time of day
+        delays = []
+        for failures in range(1, 6):
+            scheduler.consecutive_failures = failures
+            delays.append(scheduler.next_delay(_at(SATURDAY, 12)))
+        assert delays == [60, 120, 240, 300, 300], delays
+        scheduler.consecutive_failures = 0
+
+        # Closed with a snapshot taken after the close: sleep towards the next open
+        rdm.publish_snapshot(_snapshot(_at(FRIDAY, 15, 35)))
+        assert scheduler.next_delay(_at(SATURDAY, 12)) == 3600
+        assert scheduler.next_delay(_at(MONDAY, 9)) == 15 * 60
+        assert scheduler.next_delay(_at(MONDAY, 9, 15) - timedelta(seconds=0.2)) == 1.0
+
+        # Closed with a snapshot from before the close (or only the fallback list): refresh now
+        rdm.publish_snapshot(_snapshot(_at(FRIDAY, 15)))
+        assert scheduler.next_delay(_at(SATURDAY, 12)) == 0.0
+        rdm.publish_snapshot(_snapshot(_at(FRIDAY, 16), is_fallback=True))
+        assert scheduler.next_delay(_at(SATURDAY, 12)) == 0.0
+    finally:
+        rdm.publish_snapshot(original)
+
+    print(f"✅ Backoff delays {delays}, off-hours sleeps capped and aligned to the open")
+
+def test_run_once_and_loop():
+    print("🔍 Testing scheduler refreshes, failure counting and the background loop")
+    print("=" * 60)
+
+    original = rdm.get_snapshot()
+    outcomes, priorities = [None, None, 'ok'], []
+
+    def refresh():
+        priorities.append(rate_limiter.current_priority())
+        result = outcomes.pop(0) if outcomes else 'ok'
+        if result is None:
+            return None
+        snapshot = _snapshot(datetime.now(IST))
+        rdm.publish_snapshot(snapshot)
+        return snapshot
+
+    scheduler = SnapshotScheduler(refresh=refresh, interval=0.02, max_backoff=0.05)
+    try:
+        with mock.patch.object(rdm, 'is_market_open', return_value=True):
+            assert scheduler.run_once() is None and scheduler.consecutive_failures == 1
+            assert scheduler.run_once() is None and scheduler.consecutive_failures == 2
+            assert scheduler.run_once() is rdm.get_snapshot() and scheduler.consecutive_failures == 0
+            assert scheduler.last_run is not None
+            assert priorities == [rate_limiter.PRIORITY_BACKGROUND] * 3, "refresh ran at interactive priority"
+
+        # Market closed and the snapshot is newer than the last close: no upstream call
+        with mock.patch.object(rdm, 'is_market_open', return_value=False):
+            assert scheduler.run_once() is rdm.get_snapshot() and len(priorities) == 3
+
+        # The loop keeps refreshing on its cadence, survives a raising refresh and stops on request
+        outcomes[:] = ['ok', 'raise', 'ok']
+
+        def flaky_refresh():
+            if outcomes and outcomes[0] == 'raise':
+                outcomes.pop(0)
+                raise ConnectionError('upstream down')
+            return refresh()
+
+        scheduler.refresh = flaky_refresh
+        with mock.patch.object(rdm, 'is_market_open', return_value=True):
+            scheduler.start()
+            thread = scheduler._thread
+            scheduler.start()
+            assert scheduler._thread is thread, "start() launched a second loop"
+            deadline = time.monotonic() + 5
+            while len(priorities) < 8 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            scheduler.stop()
+            thread.join(2)
+        assert len(priorities) >= 8 and not thread.is_alive()
+        assert scheduler.consecutive_failures == 0 and not scheduler.status()['running']
+    finally:
+        scheduler.stop()
+        rdm.publish_snapshot(original)
+
+    print(f"✅ {len(priorities)} background refreshes; failures counted and reset")
+
+def test_snapshot_publish_is_atomic():
+    print("🔍 Testing snapshot build, atomic publish and warm start")
+    print("=" * 60)
+
+    original = rdm.get_snapshot()
+    universe = [f'S{i}.NS' for i in range(30)]
+    fetched = [{'symbol': symbol, 'market_cap': (i + 1) * 1e9, 'current_price': 10.0 + i}
+               for i, symbol in enumerate(universe)]
+    fetched.append({'symbol': 'NOCAP.NS', 'market_cap': 0})
+    responses = [fetched, []]
+
+    with mock.patch.object(snapshot_store, 'SNAPSHOT_DIR', tempfile.mkdtemp()), \
+            mock.patch.object(rdm, 'get_major_nifty_stocks', return_value=universe + ['NOCAP.NS']), \
+            mock.patch.object(rdm, 'get_multiple_stocks_multi_source', side_effect=lambda symbols: responses.pop(0)):
+        try:
+            before = rdm.get_snapshot()
+            snapshot = rdm.fetch_realtime_data()
+            assert rdm.get_snapshot() is snapshot and not snapshot.is_fallback
+            assert snapshot.top_20 == tuple(universe[::-1][:20]), "top 20 is not ordered by market cap"
+            assert len(snapshot.stocks) == 30 and 'NOCAP.NS' not in snapshot.stocks
+            assert rdm.top_20_stocks == list(snapshot.top_20) and rdm.real_time_stock_data is snapshot.stocks
+            # Readers holding the previous snapshot keep a consistent, unchanged view
+            assert before is not snapshot and rdm.get_snapshot() is not before
+
+            # Published snapshots are read-only
+            for mapping, key in ((snapshot.stocks, 'X'), (snapshot.stocks['S0.NS'], 'current_price')):
+                try:
+                    mapping[key] = 0
+                    assert False, "a published snapshot was mutated"
+                except TypeError:
+                    pass
+
+            # A failed refresh publishes nothing
+            assert rdm.fetch_realtime_data() is None and rdm.get_snapshot() is snapshot
+
+            # The next process warm-starts from the persisted copy
+            rdm.initialize_fallback()
+            assert rdm.get_snapshot().is_fallback
+            assert rdm.load_persisted_snapshot()
+            warm = rdm.get_snapshot()
+            assert warm.top_20 == snapshot.top_20 and set(warm.stocks) == set(snapshot.stocks)
+            assert abs((warm.updated_at - snapshot.updated_at).total_seconds()) < 1
+
+            # Concurrent readers never see a half-published snapshot
+            torn, stop = [], threading.Event()
+
+            def reader():
+                while not stop.is_set():
+                    current = rdm.get_snapshot()
+                    if len(current.top_20) != min(20, len(current.stocks)):
+                        torn.append(current)
+
+            readers = [threading.Thread(target=reader) for _ in range(4)]
+            for thread in readers:
+                thread.start()
+            for size in range(1, 200):
+                symbols = tuple(f'R{i}.NS' for i in range(size % 40 + 1))
+                rdm.publish_snapshot(_snapshot(datetime.now(IST), symbols))
+            stop.set()
+            for thread in readers:
+                thread.join()
+            assert torn == []
+        finally:
+            rdm.publish_snapshot(original)
+
+    assert isinstance(snapshot.stocks, MappingProxyType)
+    print(f"✅ Published {len(snapshot.stocks)} stocks atomically; top: {snapshot.top_20[0]}")
+
+if __name__ == "__main__":
+    test_market_hours()
+    test_cadence_and_backoff()
+    test_run_once_and_loop()
+    test_snapshot_publish_is_atomic()
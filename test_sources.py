@@ -0,0 +1,337 @@
+import tempfile
+import threading
+import time
+from unittest import mock
+import rate_limiter
+import snapshot_store
+import multi_source_data
+from multi_source_data import FanOutExecutor, MultiSourceDataFetcher, YahooFinanceSource
+from source_health import CircuitBreaker, SourceHealthMonitor
+
+def test_fanout_deadline_and_source_cap():
+    print("🔍 Testing the fan-out executor's deadline and per-source cap")
+    print("=" * 60)
+
+    # Deadline: stragglers come back as None, calls not started yet are cancelled
+    executor = FanOutExecutor(max_workers=2)
+    started = []
+
+    def work(delay):
+        started.append(delay)
+        time.sleep(delay)
+        return delay
+
+    began = time.monotonic()
+    results = executor.map(work, [0.01, 0.5, 0.02, 0.6, 0.7], deadline=0.2)
+    elapsed = time.monotonic() - began
+    assert results == [0.01, None, 0.02, None, None], results
+    assert elapsed < 0.45, f"map waited {elapsed:.2f}s past its deadline"
+    time.sleep(0.6)
+    assert 0.7 not in started, "a call queued past the deadline still ran"
+
+    # Cap: calls queued for a saturated source wait without holding pool threads
+    executor = FanOutExecutor(max_workers=3, source_limits={'slow': 1})
+    release = threading.Event()
+    in_flight, peak = [0], [0]
+    lock = threading.Lock()
+
+    def slow(i):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        release.wait(5)
+        with lock:
+            in_flight[0] -= 1
+        return i
+
+    slow_futures = [executor.submit(slow, i, source='slow') for i in range(4)]
+    assert executor.map(lambda i: i * 10, range(6), source='fast', deadline=2) == [0, 10, 20, 30, 40, 50]
+    release.set()
+    assert [future.result(timeout=5) for future in slow_futures] == [0, 1, 2, 3]
+    assert peak[0] == 1, f"{peak[0]} calls ran at once against a source capped at 1"
+
+    # The same cap applies around single upstream calls, re-entrantly for a submitted call
+    def try_slot():
+        with executor.source_slot('slow', timeout=0.05) as acquired:
+            return acquired
+
+    with executor.source_slot('slow') as acquired:
+        assert acquired
+        assert executor.submit(try_slot).result(timeout=5) is False
+    assert executor.submit(try_slot, source='slow').result(timeout=5) is True
+
+    print(f"✅ Deadline dropped 3 stragglers after {elapsed:.2f}s; 'slow' never exceeded 1 call in flight")
+
+def test_busy_source_is_not_a_source_failure():
+    print("🔍 Testing that a saturated per-source cap skips the source without failing it")
+    print("=" * 60)
+
+    fetcher = MultiSourceDataFetcher()
+    calls = []
+
+    class CountingSource:
+        def fetch_stock_data(self, symbol, timeout=10):
+            calls.append(symbol)
+            return {'symbol': symbol}
+
+    executor = FanOutExecutor(max_workers=2, source_limits={'alpha_vantage': 1})
+    with mock.patch.object(fetcher, 'executor', executor), \
+            mock.patch.dict(fetcher.sources, {'alpha_vantage': CountingSource()}):
+        with executor.source_slot('alpha_vantage'):
+            # Another thread's call finds the only slot taken and gives up after its timeout
+            skipped = executor.submit(fetcher._timed_fetch, 'alpha_vantage', 'IBM', 0.05).result(timeout=5)
+        assert skipped is None and calls == []
+        assert fetcher._timed_fetch('alpha_vantage', 'IBM', 1) == {'symbol': 'IBM'}
+
+    breaker = fetcher.breakers['alpha_vantage'].snapshot()
+    assert breaker['consecutive_failures'] == 0, breaker
+    print("✅ A busy source was skipped, then served the next call")
+
+def test_rate_limit_wait_is_not_a_source_failure():
+    print("🔍 Testing that our own rate limit does not trip a source's breaker")
+    print("=" * 60)
+
+    fetcher = MultiSourceDataFetcher()
+    original = rate_limiter._buckets.get('alpha_vantage')
+    empty = rate_limiter.TokenBucket(rate=0.001, capacity=1)
+    empty.tokens = 0
+    rate_limiter._buckets['alpha_vantage'] = empty
+    try:
+        # Far more waits than the breaker's failure threshold; the source is never called
+        for _ in range(fetcher.breakers['alpha_vantage'].failure_threshold + 3):
+            assert fetcher._timed_fetch('alpha_vantage', 'IBM', 0.01) is None
+    finally:
+        if original is None:
+            rate_limiter._buckets.pop('alpha_vantage', None)
+        else:
+            rate_limiter._buckets['alpha_vantage'] = original
+
+    breaker = fetcher.breakers['alpha_vantage'].snapshot()
+    assert breaker['state'] == CircuitBreaker.CLOSED and breaker['consecutive_failures'] == 0, breaker
+    health = fetcher.health.build_snapshot()['sources']['alpha_vantage']
+    assert health['last_failure'] is None, health
+    assert empty.timed_out > 0
+
+    print(f"✅ {empty.timed_out} limiter timeouts, breaker still closed, no health failures")
+
+def test_circuit_breaker_skips_failing_source():
+    print("🔍 Testing the circuit breaker around a failing source")
+    print("=" * 60)
+
+    calls = []
+
+    class FlakySource:
+        healthy = False
+
+        def fetch_stock_data(self, symbol, timeout=10):
+            calls.append(symbol)
+            return {'symbol': symbol} if self.healthy else None
+
+    fetcher = MultiSourceDataFetcher()
+    source = FlakySource()
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=0.2)
+    with mock.patch.dict(fetcher.sources, {'alpha_vantage': source}), \
+            mock.patch.dict(fetcher.breakers, {'alpha_vantage': breaker}):
+        for _ in range(3):
+            assert fetcher._timed_fetch('alpha_vantage', 'IBM', 1) is None
+        assert breaker.state == CircuitBreaker.OPEN and breaker.times_opened == 1
+
+        # Open: calls are refused without reaching the source
+        assert fetcher._timed_fetch('alpha_vantage', 'IBM', 1) is None
+        assert len(calls) == 3 and not fetcher.is_source_available('alpha_vantage')
+
+        # After the cooldown exactly one probe goes through; a failed probe re-opens at once
+        time.sleep(0.25)
+        assert breaker.allow_request() and not breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN and breaker.times_opened == 2
+
+        # A successful probe closes the circuit again
+        time.sleep(0.25)
+        source.healthy = True
+        assert fetcher._timed_fetch('alpha_vantage', 'IBM', 1) == {'symbol': 'IBM'}
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.consecutive_failures == 0
+
+    print(f"✅ Breaker opened after 3 failures, probed once per cooldown, closed on success ({len(calls)} calls)")
+
+def test_source_health_snapshot():
+    print("🔍 Testing the source health snapshot and idle-source probes")
+    print("=" * 60)
+
+    probed = []
+    monitor = SourceHealthMonitor(['fast', 'flaky', 'idle'], probe=probed.append,
+                                  describe=lambda name: {'name': name.title()},
+                                  probe_after=60, window=10)
+    for latency in (0.1, 0.2, 0.3, 0.4, 2.0):
+        monitor.record('fast', True, latency)
+    for success in (True, False, False, True):
+        monitor.record('flaky', success, 0.5)
+
+    # Served from memory: building the first snapshot never probes a source
+    snapshot = monitor.get_snapshot()
+    assert probed == []
+    fast, flaky, idle = (snapshot['sources'][name] for name in ('fast', 'flaky', 'idle'))
+    assert fast['name'] == 'Fast' and fast['error_rate'] == 0 and fast['sample_size'] == 5
+    assert fast['latency_p50'] == 0.3 and fast['latency_p99'] == 2.0
+    assert fast['last_success'] is not None and fast['last_failure'] is None
+    assert flaky['error_rate'] == 0.5 and flaky['last_failure'] is not None
+    assert idle['error_rate'] is None and idle['latency_p50'] is None and idle['last_success'] is None
+
+    # Readers get the published snapshot until the next refresh replaces it
+    monitor.record('idle', False, 1.0)
+    assert monitor.get_snapshot() is snapshot
+    monitor.refresh()
+    assert probed == [], "a source with recent traffic was probed"
+    assert monitor.get_snapshot()['sources']['idle']['error_rate'] == 1.0
+
+    # Only sources quiet for longer than probe_after are probed; a failing probe is contained
+    monitor._last_activity['idle'] -= 120
+    monitor.probe = lambda name: (probed.append(name), 1 / 0)
+    monitor.refresh()
+    assert probed == ['idle']
+
+    # The fetcher's endpoint reads the snapshot without touching any source
+    fetcher = MultiSourceDataFetcher()
+    fetcher.health.record('yahoo', True, 0.25)
+    with mock.patch.object(fetcher.health, 'start') as start, \
+            mock.patch.object(YahooFinanceSource, 'fetch_stock_data', side_effect=AssertionError('network')):
+        sources = fetcher.check_all_sources()
+    start.assert_called_once()
+    assert set(sources) == set(fetcher.sources)
+    assert sources['yahoo']['latency_p50'] == 0.25 and sources['yahoo']['available']
+    assert sources['yahoo']['circuit']['state'] == CircuitBreaker.CLOSED
+
+    print(f"✅ Snapshot served from memory: {fast['latency_p50']}s p50, {flaky['error_rate']:.0%} flaky errors")
+
+def test_concurrent_quote_fetches_are_coalesced():
+    print("🔍 Testing single-flight coalescing of identical quote fetches")
+    print("=" * 60)
+
+    fetcher = MultiSourceDataFetcher()
+    calls, results = [], []
+    release = threading.Event()
+
+    def slow_fetch(symbol, source=None, timeout=10, hedged=None):
+        calls.append(symbol)
+        release.wait(5)
+        if symbol == 'BROKEN':
+            raise ValueError("upstream error")
+        return {'symbol': symbol}
+
+    def fetch(symbol):
+        try:
+            results.append(fetcher.fetch_stock_data(symbol, source='yahoo'))
+        except ValueError as e:
+            results.append(e)
+
+    with mock.patch.object(fetcher, '_fetch_stock_data', slow_fetch):
+        threads = [threading.Thread(target=fetch, args=(symbol,)) for symbol in ['IBM'] * 5 + ['BROKEN'] * 3]
+        for thread in threads:
+            thread.start()
+        # Hold the leaders until every follower is waiting on them
+        deadline = time.monotonic() + 5
+        while fetcher.single_flight.coalesced_count < 6 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(calls) == ['BROKEN', 'IBM'], calls
+        quotes = [result for result in results if isinstance(result, dict)]
+        errors = [result for result in results if isinstance(result, ValueError)]
+        assert len(quotes) == 5 and all(quote is quotes[0] for quote in quotes)
+        assert len(errors) == 3 and all(error is errors[0] for error in errors)
+        assert fetcher.single_flight.in_flight() == 0
+
+        # Nothing is cached once the call completes
+        fetcher.fetch_stock_data('IBM', source='yahoo')
+        assert calls.count('IBM') == 2
+
+    print(f"✅ 8 concurrent fetches made {len(calls) - 1} upstream calls; results and errors shared")
+
+def test_hedged_fetch():
+    print("🔍 Testing hedged source races")
+    print("=" * 60)
+
+    hang = threading.Event()
+
+    class FakeSource:
+        def __init__(self, delay=0.0, data=True, hangs=False):
+            self.delay, self.data, self.hangs = delay, data, hangs
+            self.calls = 0
+
+        def fetch_stock_data(self, symbol, timeout=10):
+            self.calls += 1
+            if self.hangs:
+                hang.wait(10)  # e.g. Ticker.info, which takes no timeout
+            time.sleep(self.delay)
+            return {'symbol': symbol, 'current_price': 100.0} if self.data else None
+
+    def race(sources, budget, timeout=5):
+        fetcher = MultiSourceDataFetcher()
+        with mock.patch.dict(fetcher.sources, sources), \
+                mock.patch.object(fetcher, 'get_hedge_delay', lambda source, timeout=10: budget):
+            began = time.monotonic()
+            result = fetcher._fetch_hedged('IBM', list(sources), timeout)
+            return result, time.monotonic() - began
+
+    try:
+        # The primary overruns its budget: the next source is fired and wins the race
+        slow, fast = FakeSource(delay=1.0), FakeSource()
+        result, elapsed = race({'yahoo': slow, 'google': fast}, budget=0.1)
+        assert result['source'] == 'google' and elapsed < 0.6, (result, elapsed)
+
+        # The primary fails fast: the next source starts at once instead of after the budget
+        failing, backup = FakeSource(data=False), FakeSource()
+        result, elapsed = race({'yahoo': failing, 'google': backup}, budget=5)
+        assert result['source'] == 'google' and elapsed < 1, (result, elapsed)
+        assert failing.calls == backup.calls == 1
+
+        # Every source hangs: the race gives up at the overall timeout
+        result, elapsed = race({'yahoo': FakeSource(hangs=True), 'google': FakeSource(hangs=True)},
+                               budget=0.05, timeout=0.3)
+        assert result is None and elapsed < 1, (result, elapsed)
+    finally:
+        hang.set()
+
+    print(f"✅ Hedge won after the budget, fast failures fell through, hung sources gave up in {elapsed:.2f}s")
+
+def test_sector_lookup_is_cached_and_persisted():
+    print("🔍 Testing the per-symbol sector cache behind batched Yahoo quotes")
+    print("=" * 60)
+
+    looked_up = []
+
+    class FakeTicker:
+        def __init__(self, symbol):
+            looked_up.append(symbol)
+            self.info = {'sector': 'Energy'} if symbol == 'RELIANCE.NS' else {}
+
+    with mock.patch.object(snapshot_store, 'SNAPSHOT_DIR', tempfile.mkdtemp()), \
+            mock.patch.object(multi_source_data.yf, 'Ticker', FakeTicker):
+        source = YahooFinanceSource()
+        assert source.get_sector('RELIANCE.NS') is None
+        source.schedule_sector_lookup(['RELIANCE.NS', 'NOSECTOR.NS'], timeout=1).join()
+        assert source.get_sector('RELIANCE.NS') == 'Energy'
+        assert source.get_sector('NOSECTOR.NS') is None
+
+        # Symbols already looked up (even without a sector) are not fetched again
+        assert source.schedule_sector_lookup(['RELIANCE.NS', 'NOSECTOR.NS']) is None
+        source.remember_sector('TCS.NS', {'sector': 'Technology'})
+        assert source.get_sector('TCS.NS') == 'Technology'
+
+        # A new process starts from the persisted map
+        assert YahooFinanceSource().get_sector('RELIANCE.NS') == 'Energy'
+        assert looked_up == ['RELIANCE.NS', 'NOSECTOR.NS']
+
+    print("✅ Sectors are looked up once per symbol and kept on disk")
+
+if __name__ == "__main__":
+    test_fanout_deadline_and_source_cap()
+    test_busy_source_is_not_a_source_failure()
+    test_rate_limit_wait_is_not_a_source_failure()
+    test_circuit_breaker_skips_failing_source()
+    test_source_health_snapshot()
+    test_concurrent_quote_fetches_are_coalesced()
+    test_hedged_fetch()
+    test_sector_lookup_is_cached_and_persisted()
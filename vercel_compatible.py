@@ -3,25 +3,21 @@ import requests
 from datetime import datetime, timedelta
 import json
 import time
+from response_cache import ResponseCache
 
-# Vercel-compatible cache (in-memory for single request)
-_vercel_cache = {}
-_cache_timestamp = {}
+# Vercel-compatible cache (bounded, in-memory per instance)
+_vercel_cache = ResponseCache('vercel', ttl=timedelta(minutes=5).total_seconds())
+STOCK_CACHE_TTL = timedelta(minutes=1).total_seconds()
 
 def get_vercel_compatible_stocks():
     """Get stocks in Vercel-compatible way (no background threads)"""
-    global _vercel_cache, _cache_timestamp
-    
-    current_time = datetime.now()
     cache_key = "top_stocks"
     
     # Check if we have fresh cached data (5 minutes)
-    if (cache_key in _cache_timestamp and 
-        cache_key in _vercel_cache and
-        current_time - _cache_timestamp[cache_key] < timedelta(minutes=5)):
-        
+    cached = _vercel_cache.get(cache_key)
+    if cached is not None:
         print("✅ Using Vercel-compatible cached data")
-        return _vercel_cache[cache_key]
+        return cached
     
     print("🔄 Fetching fresh data for Vercel...")
     
@@ -82,8 +78,7 @@ def get_vercel_compatible_stocks():
         top_stocks = sorted_stocks[:20]
         
         # Cache the results
-        _vercel_cache[cache_key] = top_stocks
-        _cache_timestamp[cache_key] = current_time
+        _vercel_cache.set(cache_key, top_stocks)
         
         print(f"✅ Vercel data ready: {len(top_stocks)} stocks")
         return top_stocks
@@ -109,14 +104,11 @@ def get_vercel_stock_data(symbol, risk_level='moderate'):
     try:
         # Check cache first
         cache_key = f"stock_{symbol}"
-        current_time = datetime.now()
+        cached = _vercel_cache.get(cache_key)
         
-        if (cache_key in _cache_timestamp and 
-            cache_key in _vercel_cache and
-            current_time - _cache_timestamp[cache_key] < timedelta(minutes=1)):
-            
+        if cached is not None:
             print(f"✅ Using cached data for {symbol}")
-            return _vercel_cache[cache_key]
+            return cached
         
         print(f"🔄 Fetching fresh data for {symbol} on Vercel...")
         
@@ -156,8 +148,7 @@ def get_vercel_stock_data(symbol, risk_level='moderate'):
         }
         
         # Cache the result
-        _vercel_cache[cache_key] = stock_data
-        _cache_timestamp[cache_key] = current_time
+        _vercel_cache.set(cache_key, stock_data, ttl=STOCK_CACHE_TTL)
         
         return stock_data
         
@@ -216,7 +207,9 @@ def get_vercel_emergency_fallback(symbol):
 
 def clear_vercel_cache():
     """Clear Vercel cache (useful for testing)"""
-    global _vercel_cache, _cache_timestamp
-    _vercel_cache = {}
-    _cache_timestamp = {}
+    _vercel_cache.clear()
     print("🗑️ Vercel cache cleared")
+
+def get_vercel_cache_stats():
+    """Hit/miss/eviction counters for the Vercel cache"""
+    return _vercel_cache.stats()